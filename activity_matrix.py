@@ -0,0 +1,106 @@
+# activity_matrix.py
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# --- Optional dependency: NumPy ---
+NUMPY_AVAILABLE = False
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityMatrix:
+    """
+    Columnar, memory-mapped ring buffer of activity samples.
+    Each sample is one float32 row of category percentages plus an int64
+    epoch timestamp (seconds). Rows live in fixed-size memory-mapped files,
+    so appending is O(1), nothing is re-serialized, and aggregates are
+    vectorized NumPy reductions. Analysis text is not stored here; it stays
+    in ActivityTracker's bounded activity_history.
+
+    Files: <prefix>.scores.f32 (capacity x categories), <prefix>.ts.i64
+    (capacity) and <prefix>.head.i64 ([next_write_index, total_written]).
+    """
+
+    def __init__(self, path_prefix: str, categories: List[str], capacity: int):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("ActivityMatrix requires numpy")
+        self.categories = list(categories)
+        self.capacity = capacity
+        self._index = {cat: i for i, cat in enumerate(self.categories)}
+
+        scores_path = f"{path_prefix}.scores.f32"
+        ts_path = f"{path_prefix}.ts.i64"
+        head_path = f"{path_prefix}.head.i64"
+        self.is_new = not all(os.path.exists(p) for p in (scores_path, ts_path, head_path))
+        if not self.is_new and os.path.getsize(ts_path) != capacity * 8:
+            # Capacity changed in config; start a fresh buffer
+            logger.warning("Activity matrix capacity changed, recreating it")
+            self.is_new = True
+        mode = "w+" if self.is_new else "r+"
+
+        self.scores = np.memmap(scores_path, dtype=np.float32, mode=mode,
+                                shape=(capacity, len(self.categories)))
+        self.timestamps = np.memmap(ts_path, dtype=np.int64, mode=mode, shape=(capacity,))
+        self.head = np.memmap(head_path, dtype=np.int64, mode=mode, shape=(2,))
+
+    def __len__(self) -> int:
+        return int(min(self.head[1], self.capacity))
+
+    def append(self, timestamp: datetime, breakdown: Dict[str, float]):
+        """Write one sample into the next ring slot."""
+        row = self.head[0]
+        values = np.zeros(len(self.categories), dtype=np.float32)
+        for category, percentage in breakdown.items():
+            i = self._index.get(category)
+            if i is not None:
+                values[i] = percentage
+        self.scores[row] = values
+        self.timestamps[row] = int(timestamp.timestamp())
+        self.head[0] = (row + 1) % self.capacity
+        self.head[1] += 1
+
+    def flush(self):
+        """Push dirty pages to disk."""
+        self.scores.flush()
+        self.timestamps.flush()
+        self.head.flush()
+
+    def _mask(self, start: Optional[datetime], end: Optional[datetime]):
+        n = len(self)
+        ts = self.timestamps[:n]
+        mask = np.ones(n, dtype=bool)
+        if start is not None:
+            mask &= ts >= int(start.timestamp())
+        if end is not None:
+            mask &= ts < int(end.timestamp())
+        return mask
+
+    def breakdown_between(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict:
+        """Average category percentages for samples in [start, end)."""
+        n = len(self)
+        mask = self._mask(start, end)
+        count = int(mask.sum())
+        if count:
+            means = self.scores[:n][mask].mean(axis=0, dtype=np.float64)
+        else:
+            means = np.zeros(len(self.categories))
+        return {
+            "count": count,
+            "percentages": {cat: round(float(v), 1) for cat, v in zip(self.categories, means)}
+        }
+
+    def dominant_category_counts(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[str, int]:
+        """How many samples in [start, end) had each category as their largest share."""
+        n = len(self)
+        rows = self.scores[:n][self._mask(start, end)]
+        if not len(rows):
+            return {cat: 0 for cat in self.categories}
+        counts = np.bincount(rows.argmax(axis=1), minlength=len(self.categories))
+        return {cat: int(c) for cat, c in zip(self.categories, counts)}
@@ -0,0 +1,204 @@
+# activity_store.py
+import atexit
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import clock
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteActivityStore:
+    """
+    Optional long-term activity store backed by SQLite.
+    Keeps every recorded activity (no 1000-entry cap) in a table indexed by
+    timestamp, so day/week/range breakdowns are answered with one indexed
+    aggregate query instead of scanning a JSON list.
+    Inserts are buffered and written in batches inside one transaction.
+    Rows are keyed by (ts, seq), seq numbering activities that share a
+    timestamp, so re-inserting an entry that is already stored is a no-op.
+    """
+
+    def __init__(self, db_path: str, categories: List[str], batch_size: int = None):
+        self.db_path = db_path
+        self.categories = list(categories)
+        self.batch_size = batch_size or config.ACTIVITY_DB_BATCH_SIZE
+        self.lock = threading.Lock()
+        self._pending = []
+
+        # One column per category, in ACTIVITY_CATEGORIES order
+        self._columns = [f"cat_{i}" for i in range(len(self.categories))]
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        atexit.register(self.close)
+
+    def _create_schema(self):
+        column_defs = ", ".join(f"{col} REAL NOT NULL DEFAULT 0" for col in self._columns)
+        with self.conn:
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS activities ("
+                f"id INTEGER PRIMARY KEY, ts REAL NOT NULL, seq INTEGER NOT NULL DEFAULT 0, "
+                f"{column_defs}, analysis_text TEXT)"
+            )
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(activities)")]
+            if "seq" not in columns:
+                # Databases from before the (ts, seq) key: number the rows sharing a timestamp
+                self.conn.execute("ALTER TABLE activities ADD COLUMN seq INTEGER NOT NULL DEFAULT 0")
+                self.conn.execute(
+                    "UPDATE activities SET seq = (SELECT COUNT(*) FROM activities AS a "
+                    "WHERE a.ts = activities.ts AND a.id < activities.id)"
+                )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_activities_ts ON activities(ts)")
+            self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_activities_key ON activities(ts, seq)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _row_for(self, entry: Dict, seq: int = 0) -> tuple:
+        ts = datetime.fromisoformat(entry["timestamp"]).timestamp()
+        breakdown = entry.get("breakdown", {})
+        values = [float(breakdown.get(cat, 0.0)) for cat in self.categories]
+        return (ts, seq, *values, entry.get("analysis_text", ""))
+
+    def _rows_for(self, history: List[Dict]) -> List[tuple]:
+        """Rows for a list of entries, numbering entries that share a timestamp in list order."""
+        rows = []
+        seen = {}
+        for entry in history:
+            try:
+                ts = datetime.fromisoformat(entry["timestamp"]).timestamp()
+                seq = seen.get(ts, 0)
+                rows.append(self._row_for(entry, seq))
+                seen[ts] = seq + 1
+            except (KeyError, ValueError) as e:
+                logger.warning("Skipping unstorable activity entry: %s", e)
+        return rows
+
+    def _next_seq(self, ts: float) -> int:
+        """Next free seq for `ts`, counting stored and queued rows."""
+        stored = self.conn.execute("SELECT COUNT(*) FROM activities WHERE ts = ?", (ts,)).fetchone()[0]
+        return stored + sum(1 for row in self._pending if row[0] == ts)
+
+    # --- Writes ---
+    def add(self, entry: Dict):
+        """Queue one activity entry ({timestamp, breakdown, analysis_text}) for insertion."""
+        with self.lock:
+            ts = datetime.fromisoformat(entry["timestamp"]).timestamp()
+            self._pending.append(self._row_for(entry, self._next_seq(ts)))
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self):
+        """Write all queued entries in a single transaction."""
+        with self.lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        placeholders = ", ".join("?" for _ in range(len(self._columns) + 3))
+        columns = ", ".join(["ts", "seq", *self._columns, "analysis_text"])
+        try:
+            with self.conn:
+                self.conn.executemany(
+                    f"INSERT OR IGNORE INTO activities ({columns}) VALUES ({placeholders})",
+                    self._pending
+                )
+            self._pending = []
+        except sqlite3.Error as e:
+            logger.error("Could not write activity batch to SQLite: %s", e)
+
+    def migrate_from_history(self, history: List[Dict]):
+        """One-time import of the JSON activity_history into the database."""
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+            if row:
+                return
+            rows = self._rows_for(history)
+            self._pending.extend(rows)
+            self._flush_locked()
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)",
+                    (datetime.now().isoformat(),)
+                )
+            logger.debug("Migrated %s activity entries from JSON into SQLite", len(rows))
+
+    def backfill_from_history(self, history: List[Dict]):
+        """
+        Insert the history entries that are not stored yet. Rows still queued
+        for a batch are lost if the process dies before close(); the
+        journal-backed JSON history has them, so this restores them on load.
+        Matched by (ts, seq) rather than "newer than the newest row": batch
+        frames are recorded out of time order.
+        """
+        with self.lock:
+            before = self.conn.total_changes
+            self._pending.extend(self._rows_for(history))
+            self._flush_locked()
+            restored = self.conn.total_changes - before
+            if restored:
+                logger.info("Restored %s activity rows missing from SQLite", restored)
+
+    def close(self):
+        """Flush pending rows and close the connection."""
+        with self.lock:
+            if self.conn is None:
+                return
+            self._flush_locked()
+            self.conn.close()
+            self.conn = None
+
+    # --- Queries ---
+    def _breakdown_from_row(self, row) -> Dict:
+        count = row[0] or 0
+        sums = row[1:]
+        percentages = {
+            cat: round((total or 0.0) / count, 1) if count else 0.0
+            for cat, total in zip(self.categories, sums)
+        }
+        return {"count": count, "percentages": percentages}
+
+    def breakdown_between(self, start: datetime, end: datetime) -> Dict:
+        """Average category percentages for activities in [start, end)."""
+        sums = ", ".join(f"SUM({col})" for col in self._columns)
+        with self.lock:
+            self._flush_locked()
+            row = self.conn.execute(
+                f"SELECT COUNT(*), {sums} FROM activities WHERE ts >= ? AND ts < ?",
+                (start.timestamp(), end.timestamp())
+            ).fetchone()
+        return self._breakdown_from_row(row)
+
+    def breakdown_for_day(self, day: Optional[datetime] = None) -> Dict:
+        """Breakdown for the calendar day containing `day` (default: today)."""
+        start = (day or clock.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+        return self.breakdown_between(start, start + timedelta(days=1))
+
+    def breakdown_for_week(self, day: Optional[datetime] = None) -> Dict:
+        """Breakdown for the Monday-based week containing `day` (default: this week)."""
+        day = (day or clock.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+        start = day - timedelta(days=day.weekday())
+        return self.breakdown_between(start, start + timedelta(days=7))
+
+    def daily_breakdowns(self, start: datetime, end: datetime) -> List[Dict]:
+        """Per-day breakdowns in [start, end), oldest first; days without data are omitted."""
+        sums = ", ".join(f"SUM({col})" for col in self._columns)
+        with self.lock:
+            self._flush_locked()
+            rows = self.conn.execute(
+                f"SELECT date(ts, 'unixepoch', 'localtime') AS day, COUNT(*), {sums} "
+                f"FROM activities WHERE ts >= ? AND ts < ? GROUP BY day ORDER BY day",
+                (start.timestamp(), end.timestamp())
+            ).fetchall()
+        result = []
+        for row in rows:
+            breakdown = self._breakdown_from_row(row[1:])
+            breakdown["day"] = row[0]
+            result.append(breakdown)
+        return result
@@ -1,9 +1,18 @@
 # activity_tracker.py
-import json
-import os
-from datetime import datetime
-from typing import Dict, List, Tuple
+import copy
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 import threading
+import clock
+from journal_store import JournalStore
+from persistence import persistence_writer
+from activity_matrix import ActivityMatrix, NUMPY_AVAILABLE
+from focus_sessions import FocusSessionizer
+from keyword_matcher import KeywordHits, keyword_matcher
+import config
+
+logger = logging.getLogger(__name__)
 
 class ActivityTracker:
     """
@@ -24,47 +33,180 @@ class ActivityTracker:
         "其他"          # Other
     ]
     
-    def __init__(self, data_file: str = "/tmp/cat_activity_data.json"):
+    MAX_HISTORY = 1000  # Number of history entries kept in memory
+    HOURLY_ROLLUP_RETENTION_HOURS = 7 * 24  # Hourly buckets kept
+    DAILY_ROLLUP_RETENTION_DAYS = 400  # Daily buckets kept
+    
+    def __init__(self, data_file: str = config.ACTIVITY_DATA_FILE,
+                 db_path: str = config.ACTIVITY_DB_PATH,
+                 matrix_path_prefix: str = config.ACTIVITY_MATRIX_PATH_PREFIX):
         self.data_file = data_file
         self.lock = threading.Lock()
+        self.journal = JournalStore(data_file)
         self.data = self._load_data()
         
-        # Initialize categories if new file
-        if "total_analyses" not in self.data:
-            self.data = {
-                "total_analyses": 0,
-                "category_scores": {cat: 0.0 for cat in self.ACTIVITY_CATEGORIES},
-                "activity_history": [],
-                "last_updated": datetime.now().isoformat()
-            }
-            self._save_data()
-    
-    def _load_data(self) -> Dict:
-        """Load activity data from file."""
-        if os.path.exists(self.data_file):
+        # Optional long-term SQLite store (imports the JSON history once)
+        self.store = None
+        if config.ACTIVITY_SQLITE_ENABLED:
+            from activity_store import SQLiteActivityStore
+            try:
+                self.store = SQLiteActivityStore(db_path, self.ACTIVITY_CATEGORIES)
+                self.store.migrate_from_history(self.data["activity_history"])
+                # Rows that were still batched when the last session ended abruptly
+                self.store.backfill_from_history(self.data["activity_history"])
+            except Exception as e:
+                logger.error("Could not open SQLite activity store: %s", e)
+                self.store = None
+        
+        # Optional compact numeric history (seeded from the JSON history once)
+        self.matrix = None
+        if config.ACTIVITY_MATRIX_ENABLED and NUMPY_AVAILABLE:
             try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                self.matrix = ActivityMatrix(
+                    matrix_path_prefix,
+                    self.ACTIVITY_CATEGORIES,
+                    config.ACTIVITY_MATRIX_CAPACITY
+                )
+                if self.matrix.is_new:
+                    for entry in self.data["activity_history"]:
+                        self.matrix.append(datetime.fromisoformat(entry["timestamp"]), entry["breakdown"])
+                    self.matrix.flush()
             except Exception as e:
-                print(f"ERROR: Could not load activity data: {e}")
-                return {}
-        return {}
+                logger.error("Could not open activity matrix: %s", e)
+                self.matrix = None
+    
+    def _new_data(self) -> Dict:
+        """Empty activity data for a fresh install."""
+        data = {
+            "total_analyses": 0,
+            "category_scores": {cat: 0.0 for cat in self.ACTIVITY_CATEGORIES},
+            "activity_history": [],
+            "last_updated": clock.now().isoformat(),
+            "focus_sessions": FocusSessionizer.new_state()
+        }
+        data.update(self._new_rollups())
+        return data
+    
+    def _new_rollups(self) -> Dict:
+        """Empty hourly/daily/hour-of-day rollup buckets."""
+        return {
+            "hourly_rollups": {},  # "YYYY-MM-DDTHH" -> bucket
+            "daily_rollups": {},  # "YYYY-MM-DD" -> bucket
+            "hour_of_day_rollups": [self._new_bucket() for _ in range(24)]
+        }
+    
+    def _new_bucket(self) -> Dict:
+        return {"count": 0, "sums": {cat: 0.0 for cat in self.ACTIVITY_CATEGORIES}}
+    
+    def _add_to_bucket(self, bucket: Dict, breakdown: Dict[str, float]):
+        bucket["count"] += 1
+        sums = bucket["sums"]
+        for category, percentage in breakdown.items():
+            if category in sums:
+                sums[category] += percentage
+    
+    def _add_bucket(self, buckets: Dict[str, Dict], key: str, retention: timedelta, key_length: int):
+        """
+        Create the bucket for `key`, then drop buckets older than the retention
+        window measured from the newest bucket. Keys are compared, not their
+        insertion order: samples can arrive out of time order (batch frames).
+        """
+        buckets[key] = self._new_bucket()
+        newest = max(buckets)
+        cutoff = (datetime.fromisoformat(newest) - retention).isoformat()[:key_length]
+        for stale in [k for k in buckets if k < cutoff]:
+            del buckets[stale]
+
+    def _update_rollups(self, timestamp: str, breakdown: Dict[str, float]):
+        """Add one activity to its hour, day and hour-of-day buckets in O(1)."""
+        # ISO timestamps sort and slice cleanly: "YYYY-MM-DDTHH:MM:SS..."
+        hour_key, day_key = timestamp[:13], timestamp[:10]
+        hourly, daily = self.data["hourly_rollups"], self.data["daily_rollups"]
+        
+        if hour_key not in hourly:
+            self._add_bucket(hourly, hour_key, timedelta(hours=self.HOURLY_ROLLUP_RETENTION_HOURS), 13)
+        if day_key not in daily:
+            self._add_bucket(daily, day_key, timedelta(days=self.DAILY_ROLLUP_RETENTION_DAYS), 10)
+        
+        # A sample older than the retention window has no bucket
+        if hour_key in hourly:
+            self._add_to_bucket(hourly[hour_key], breakdown)
+        if day_key in daily:
+            self._add_to_bucket(daily[day_key], breakdown)
+        self._add_to_bucket(self.data["hour_of_day_rollups"][int(timestamp[11:13])], breakdown)
+    
+    def _load_data(self) -> Dict:
+        """Load the activity snapshot and replay journaled events on top of it."""
+        snapshot, events = self.journal.load()
+        is_new = "total_analyses" not in snapshot
+        self.data = self._new_data() if is_new else snapshot
+        if "daily_rollups" not in self.data:
+            # Data from before rollups existed: seed them from the kept history
+            self.data.update(self._new_rollups())
+            for entry in self.data["activity_history"]:
+                self._update_rollups(entry["timestamp"], entry["breakdown"])
+            is_new = True
+        seed_focus = "focus_sessions" not in self.data
+        if seed_focus:
+            self.data["focus_sessions"] = FocusSessionizer.new_state()
+        self.focus = FocusSessionizer(self.data["focus_sessions"])
+        if seed_focus:
+            # Data from before focus sessions existed: seed them from the kept history
+            for entry in self.data["activity_history"]:
+                self.focus.add(entry["timestamp"], entry["breakdown"])
+            is_new = True
+        for event in events:
+            self._apply_event(event)
+        if events:
+            logger.debug("Replayed %s journaled activity events", len(events))
+        if is_new or events:
+            # Fold the replayed journal into a fresh snapshot
+            self._save_data()
+        return self.data
     
     def _save_data(self):
-        """Save activity data to file."""
-        try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"ERROR: Could not save activity data: {e}")
+        """Compact the current activity data into a snapshot file."""
+        self.journal.compact(self.data)
     
-    def record_activity(self, activity_breakdown: Dict[str, float], screenshot_analysis: str = ""):
+    def _apply_event(self, event: Dict):
+        """Apply one recorded activity event to the in-memory data."""
+        if event.get("type") == "continued":
+            # Elapsed time only: extends the focus session, not a new analysis
+            self.focus.add(event["timestamp"], event["breakdown"])
+            self.data["last_updated"] = event["timestamp"]
+            return
+        if event.get("type") != "activity":
+            return
+        self.data["total_analyses"] += 1
+        for category, percentage in event["breakdown"].items():
+            if category in self.data["category_scores"]:
+                # Add weighted percentage to cumulative score
+                self.data["category_scores"][category] += percentage
+        
+        self._update_rollups(event["timestamp"], event["breakdown"])
+        self.focus.add(event["timestamp"], event["breakdown"])
+        
+        # Add to history (keep last MAX_HISTORY records)
+        history = self.data["activity_history"]
+        history.append({
+            "timestamp": event["timestamp"],
+            "breakdown": event["breakdown"],
+            "analysis_text": event["analysis_text"]
+        })
+        if len(history) > self.MAX_HISTORY:
+            del history[:len(history) - self.MAX_HISTORY]
+        
+        self.data["last_updated"] = event["timestamp"]
+    
+    def record_activity(self, activity_breakdown: Dict[str, float], screenshot_analysis: str = "",
+                        timestamp: datetime = None):
         """
         Record a new activity analysis.
         
         Args:
             activity_breakdown: Dictionary of category -> percentage (0-100)
             screenshot_analysis: Optional text analysis for context
+            timestamp: When the screen was captured (default: now); samples must be recorded in time order
         """
         with self.lock:
             # Validate and normalize percentages
@@ -75,27 +217,41 @@ class ActivityTracker:
             else:
                 normalized = activity_breakdown
             
-            # Update cumulative scores
-            self.data["total_analyses"] += 1
-            for category, percentage in normalized.items():
-                if category in self.data["category_scores"]:
-                    # Add weighted percentage to cumulative score
-                    self.data["category_scores"][category] += percentage
-            
-            # Add to history (keep last 1000 records)
-            history_entry = {
-                "timestamp": datetime.now().isoformat(),
+            now = timestamp or clock.now()
+            event = {
+                "type": "activity",
+                "timestamp": now.isoformat(),
                 "breakdown": normalized,
                 "analysis_text": screenshot_analysis[:200] if screenshot_analysis else ""
             }
-            self.data["activity_history"].append(history_entry)
-            if len(self.data["activity_history"]) > 1000:
-                self.data["activity_history"] = self.data["activity_history"][-1000:]
+            self._apply_event(event)
             
-            self.data["last_updated"] = datetime.now().isoformat()
-            self._save_data()
+            # Append the event (O(1)); compact into a snapshot periodically
+            if self.journal.append(event):
+                self._save_data()
+            if self.store:
+                self.store.add(event)
+            if self.matrix is not None:
+                self.matrix.append(now, normalized)
+                persistence_writer.mark_dirty(self.matrix, self.matrix.flush)
             
-            print(f"DEBUG: Recorded activity - {normalized}")
+            logger.debug("Recorded activity - %s", normalized)
+    
+    def record_continuation(self, activity_breakdown: Dict[str, float], timestamp: datetime = None):
+        """
+        Note that the screen last analyzed as `activity_breakdown` is still
+        showing (a skipped capture): its focus session runs on, but no
+        analysis is counted, so totals, history and rollups are unchanged.
+        """
+        with self.lock:
+            event = {
+                "type": "continued",
+                "timestamp": (timestamp or clock.now()).isoformat(),
+                "breakdown": activity_breakdown,
+            }
+            self._apply_event(event)
+            if self.journal.append(event):
+                self._save_data()
     
     def get_statistics(self) -> Dict:
         """
@@ -125,10 +281,114 @@ class ActivityTracker:
                 "recent_activities": self.data["activity_history"][-10:]  # Last 10 activities
             }
     
+    def get_recent_activities(self, limit: int = None) -> List[Dict]:
+        """Copy of the newest `limit` history entries (all kept entries if None), oldest first."""
+        with self.lock:
+            history = self.data["activity_history"]
+            return list(history if limit is None else history[-limit:])
+    
+    def _bucket_percentages(self, bucket: Dict) -> Dict:
+        count = bucket["count"]
+        return {
+            "count": count,
+            "percentages": {
+                cat: round(total / count, 1) if count else 0.0
+                for cat, total in bucket["sums"].items()
+            }
+        }
+    
+    def get_today(self, now: datetime = None) -> Dict:
+        """Today's activity count and average percentages (one bucket lookup)."""
+        day_key = (now or clock.now()).date().isoformat()
+        with self.lock:
+            bucket = self.data["daily_rollups"].get(day_key) or self._new_bucket()
+            return self._bucket_percentages(bucket)
+    
+    def get_this_week(self, now: datetime = None) -> Dict:
+        """This (Monday-based) week's count and average percentages from at most 7 daily buckets."""
+        today = (now or clock.now()).date()
+        monday = today - timedelta(days=today.weekday())
+        week = self._new_bucket()
+        with self.lock:
+            daily = self.data["daily_rollups"]
+            for offset in range(today.weekday() + 1):
+                bucket = daily.get((monday + timedelta(days=offset)).isoformat())
+                if bucket:
+                    week["count"] += bucket["count"]
+                    for cat, total in bucket["sums"].items():
+                        week["sums"][cat] += total
+        return self._bucket_percentages(week)
+    
+    def get_hour_of_day_profile(self) -> List[Dict]:
+        """24 entries (hour 0-23) of all-time activity count and average percentages."""
+        with self.lock:
+            return [self._bucket_percentages(bucket) for bucket in self.data["hour_of_day_rollups"]]
+    
+    def get_current_focus(self, now: datetime = None) -> Optional[Dict]:
+        """The ongoing focus session ({"category", "start", "minutes"}), or None if there is none."""
+        with self.lock:
+            return self.focus.current(now or clock.now())
+    
+    def get_focus_summary(self) -> Dict:
+        """Focus session length histograms and totals per dominant category."""
+        with self.lock:
+            return self.focus.summary()
+    
+    def get_focus_state(self) -> Dict:
+        """Copy of the raw focus session state (see restore_focus_state)."""
+        with self.lock:
+            return copy.deepcopy(self.data["focus_sessions"])
+    
+    def restore_focus_state(self, state: Dict):
+        """Replace the focus session state (session replay seeds it from the recording)."""
+        with self.lock:
+            self.data["focus_sessions"] = state
+            self.focus = FocusSessionizer(state)
+    
+    def get_context_state(self, now: datetime = None) -> Dict:
+        """Copy of what prompts read about activity: totals, today's bucket, the last 10 entries (see restore_context_state)."""
+        day_key = (now or clock.now()).date().isoformat()
+        with self.lock:
+            return copy.deepcopy({
+                "total_analyses": self.data["total_analyses"],
+                "category_scores": self.data["category_scores"],
+                "daily_rollups": {day_key: self.data["daily_rollups"][day_key]} if day_key in self.data["daily_rollups"] else {},
+                "activity_history": self.data["activity_history"][-10:],
+            })
+    
+    def restore_context_state(self, state: Dict):
+        """Replace totals, history and the given daily buckets (session replay seeds them from the recording)."""
+        with self.lock:
+            state = copy.deepcopy(state)
+            self.data["total_analyses"] = state["total_analyses"]
+            self.data["category_scores"] = state["category_scores"]
+            self.data["daily_rollups"].update(state["daily_rollups"])
+            self.data["activity_history"] = state["activity_history"]
+    
+    def get_breakdown_between(self, start: datetime, end: datetime) -> Dict:
+        """
+        Average category percentages for activities in [start, end).
+        Served by the SQLite store or the activity matrix; returns None if neither is enabled.
+        """
+        if self.store:
+            return self.store.breakdown_between(start, end)
+        if self.matrix is not None:
+            with self.lock:
+                return self.matrix.breakdown_between(start, end)
+        return None
+    
+    def get_daily_breakdowns(self, start: datetime, end: datetime) -> List[Dict]:
+        """Per-day breakdowns from the SQLite store, or [] if it is disabled."""
+        if not self.store:
+            return []
+        return self.store.daily_breakdowns(start, end)
+    
     def get_formatted_statistics(self) -> str:
         """Get formatted statistics for display."""
-        stats = self.get_statistics()
-        
+        return self.format_statistics(self.get_statistics())
+    
+    def format_statistics(self, stats) -> str:
+        """Format a statistics dict (or snapshot) for display."""
         if stats["total_analyses"] == 0:
             return "还没有活动数据记录哦~ 多使用一会儿吧！"
         
@@ -150,6 +410,10 @@ class ActivityTracker:
                 bar = "█" * bar_length + "?" * (20 - bar_length)
                 result += f"{category:<8} {bar} {percentage:.1f}%\n"
         
+        # Pre-aggregated rollups, when the stats come from a StateService snapshot
+        if "today" in stats:
+            result += f"\n今天: {stats['today']['count']} 次  本周: {stats['this_week']['count']} 次\n"
+        
         result += "\n" + "=" * 30 + "\n"
         result += f"最后更新: {self._format_time(stats['last_updated'])}"
         
@@ -163,33 +427,21 @@ class ActivityTracker:
         except:
             return iso_time
     
-    def analyze_screenshot_for_activities(self, analysis_text: str) -> Dict[str, float]:
+    def analyze_screenshot_for_activities(self, analysis_text: str, hits: KeywordHits = None) -> Dict[str, float]:
         """
         Analyze screenshot analysis text to determine activity categories.
         This is a simple keyword-based approach - could be enhanced with AI.
+        Pass `hits` from keyword_matcher.match() to reuse an existing scan of the text.
         """
         # Initialize scores
         scores = {cat: 0.0 for cat in self.ACTIVITY_CATEGORIES}
-        text_lower = analysis_text.lower()
-        
-        # Keyword-based scoring (can be enhanced)
-        activity_keywords = {
-            "工作编程": ["代码", "编程", "code", "programming", "开发", "debug", "函数", "变量", "git", "terminal", "ide", "vscode"],
-            "娱乐休闲": ["视频", "电影", "音乐", "娱乐", "休闲", "youtube", "netflix", "bilibili", "抖音"],
-            "社交聊天": ["聊天", "消息", "微信", "qq", "telegram", "discord", "邮件", "email", "chat"],
-            "学习研究": ["学习", "文档", "阅读", "研究", "paper", "文献", "教程", "course", "study"],
-            "创作设计": ["设计", "创作", "画", "photoshop", "figma", "sketch", "创意", "艺术"],
-            "系统管理": ["系统", "设置", "配置", "管理", "finder", "preferences", "系统偏好"],
-            "网页浏览": ["浏览器", "网页", "搜索", "chrome", "safari", "firefox", "google", "百度"],
-            "视频媒体": ["播放器", "视频", "movie", "media", "vlc", "quicktime"],
-            "游戏": ["游戏", "game", "steam", "play", "玩"],
-        }
         
-        # Score based on keyword matches
-        for category, keywords in activity_keywords.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    scores[category] += 10
+        # One pass over the text for all keyword tables (see config.ACTIVITY_KEYWORDS)
+        if hits is None:
+            hits = keyword_matcher.match(analysis_text)
+        for category, weight in hits.scores("activity").items():
+            if category in scores:
+                scores[category] += weight
         
         # If no specific matches, mark as "其他"
         if all(score == 0 for score in scores.values()):
@@ -202,6 +454,3 @@ class ActivityTracker:
                 scores[cat] = (scores[cat] / total) * 100
         
         return scores
-
-# Global instance
-activity_tracker = ActivityTracker() 
\ No newline at end of file
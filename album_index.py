@@ -0,0 +1,188 @@
+# album_index.py
+import glob
+import logging
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from PIL import Image
+
+import clock
+import config
+from journal_store import JournalStore
+
+logger = logging.getLogger(__name__)
+
+_FILENAME_TIMESTAMP = re.compile(r"(\d{8}_\d{6})")
+
+
+def difference_hash(img: Image.Image) -> str:
+    """64-bit perceptual (difference) hash as 16 hex digits; near-identical screens hash alike."""
+    small = img.convert("L").resize((9, 8), Image.Resampling.BILINEAR)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            bits = (bits << 1) | (left > pixels[row * 9 + col + 1])
+    return f"{bits:016x}"
+
+
+class AlbumEntry:
+    """One archived screenshot, as listed from the directory (nothing decoded)."""
+    __slots__ = ("name", "path", "timestamp", "mtime", "size")
+
+    def __init__(self, name: str, path: str, timestamp: datetime, mtime: float, size: int):
+        self.name = name
+        self.path = path
+        self.timestamp = timestamp
+        self.mtime = mtime
+        self.size = size
+
+
+class AlbumIndex:
+    """
+    Thumbnail cache and metadata index for the archived screenshots (the
+    cat's 回忆相册).
+    Listing the album only stats the directory and reads the in-memory
+    index; no image is decoded. Thumbnails are made on demand (from a worker
+    pool, see album_window.py) and cached on disk as small JPEGs, tagged with
+    the source's mtime and size so a replaced file gets a fresh thumbnail.
+    Per-file metadata (capture time, perceptual hash, activity breakdown,
+    the cat's comment) is one JournalStore document; each new thumbnail or
+    annotation is one appended event.
+    """
+
+    def __init__(self, directory: str = config.SCREENSHOT_DIRECTORY,
+                 cache_dir: str = config.ALBUM_CACHE_DIRECTORY):
+        self.directory = directory
+        self.cache_dir = cache_dir
+        self.lock = threading.Lock()
+        self._pending_capture = None  # (name, timestamp) of the shot waiting for its comment
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+        except OSError as e:
+            logger.error("Could not create album cache directory %s: %s", cache_dir, e)
+        self.journal = JournalStore(os.path.join(cache_dir, "album_index.json"))
+        self.data = self._load_data()
+
+    def _load_data(self) -> Dict:
+        snapshot, events = self.journal.load()
+        self.data = snapshot
+        self.data.setdefault("files", {})  # filename -> metadata
+        for event in events:
+            self._apply_event(event)
+        if events:
+            self._save_data()
+        return self.data
+
+    def _save_data(self):
+        self.journal.compact(self.data)
+
+    def _apply_event(self, event: Dict):
+        files = self.data["files"]
+        kind = event.get("type")
+        if kind == "forget":
+            for name in event["names"]:
+                files.pop(name, None)
+            return
+        meta = files.setdefault(event["name"], {})
+        if kind == "thumbnail":
+            meta.update(thumb=event["thumb"], mtime=event["mtime"], size=event["size"], hash=event["hash"])
+        elif kind == "annotate":
+            meta.update(timestamp=event["timestamp"], comment=event["comment"], breakdown=event["breakdown"])
+
+    def _record(self, event: Dict):
+        """Apply and journal one event (caller holds the lock)."""
+        self._apply_event(event)
+        if self.journal.append(event):
+            self._save_data()
+
+    # --- Listing ---
+    def list_entries(self) -> List[AlbumEntry]:
+        """Archived screenshots, newest first. Metadata of deleted files is dropped."""
+        pattern = os.path.join(self.directory, config.SCREENSHOT_FILENAME_FORMAT.format(timestamp="*"))
+        entries = []
+        for path in glob.glob(pattern):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # Deleted by the cleanup since the listing
+            name = os.path.basename(path)
+            match = _FILENAME_TIMESTAMP.search(name)
+            try:
+                timestamp = datetime.strptime(match.group(1), "%Y%m%d_%H%M%S")
+            except (AttributeError, ValueError):
+                timestamp = datetime.fromtimestamp(stat.st_mtime)
+            entries.append(AlbumEntry(name, path, timestamp, stat.st_mtime, stat.st_size))
+        entries.sort(key=lambda entry: entry.timestamp, reverse=True)
+        self._forget_missing({entry.name for entry in entries})
+        return entries
+
+    def _forget_missing(self, present: set):
+        with self.lock:
+            gone = [name for name in self.data["files"] if name not in present]
+            if not gone:
+                return
+            thumbs = [self.data["files"][name].get("thumb") for name in gone]
+            self._record({"type": "forget", "names": gone})
+        for thumb in thumbs:
+            if thumb:
+                try:
+                    os.remove(os.path.join(self.cache_dir, thumb))
+                except OSError:
+                    pass
+
+    def metadata(self, name: str) -> Dict:
+        with self.lock:
+            return dict(self.data["files"].get(name, {}))
+
+    # --- Thumbnails (worker threads) ---
+    def cached_thumbnail(self, entry: AlbumEntry) -> Optional[str]:
+        """Path of an up-to-date cached thumbnail for `entry`, or None."""
+        meta = self.metadata(entry.name)
+        thumb = meta.get("thumb")
+        if not thumb or meta.get("mtime") != entry.mtime or meta.get("size") != entry.size:
+            return None
+        path = os.path.join(self.cache_dir, thumb)
+        return path if os.path.exists(path) else None
+
+    def make_thumbnail(self, entry: AlbumEntry) -> Optional[str]:
+        """Decode `entry` once, write its thumbnail and hash to the cache; returns the thumbnail path."""
+        thumb = os.path.splitext(entry.name)[0] + ".jpg"
+        thumb_path = os.path.join(self.cache_dir, thumb)
+        try:
+            with Image.open(entry.path) as img:
+                img.draft("RGB", config.ALBUM_THUMBNAIL_SIZE)  # Reduced decode when the source is a JPEG
+                # reducing_gap shrinks by integer factors first, which is much cheaper than one big filter
+                img.thumbnail(config.ALBUM_THUMBNAIL_SIZE, Image.Resampling.BILINEAR, reducing_gap=2.0)
+                small = img.convert("RGB")
+            small.save(thumb_path, "JPEG", quality=config.ALBUM_THUMBNAIL_QUALITY)
+        except Exception as e:
+            logger.warning("Could not make thumbnail for %s: %s", entry.path, e)
+            return None
+        with self.lock:
+            self._record({"type": "thumbnail", "name": entry.name, "thumb": thumb,
+                          "mtime": entry.mtime, "size": entry.size, "hash": difference_hash(small)})
+        return thumb_path
+
+    # --- Annotations (analysis thread) ---
+    def register_capture(self, path: str):
+        """Remember the screenshot just archived, so the cycle's result can be attached to it."""
+        self._pending_capture = (os.path.basename(path), clock.now().isoformat())
+
+    def annotate_capture(self, comment: str, breakdown: Dict[str, float]):
+        """Attach the cat's comment and the activity breakdown to the last registered capture."""
+        pending, self._pending_capture = self._pending_capture, None
+        if pending is None:
+            return
+        name, timestamp = pending
+        with self.lock:
+            self._record({"type": "annotate", "name": name, "timestamp": timestamp,
+                          "comment": comment, "breakdown": breakdown})
+
+
+# Global instance shared by the analysis thread and the album window
+album_index = AlbumIndex()
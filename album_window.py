@@ -0,0 +1,246 @@
+# album_window.py
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QListView, QPushButton
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QObject, QRunnable, QSize, QThreadPool, QUrl, pyqtSignal
+from PyQt6.QtGui import QColor, QDesktopServices, QImage, QPixmap
+from album_index import AlbumEntry, AlbumIndex, album_index
+from state_service import state_service
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class _ThumbnailSignals(QObject):
+    finished = pyqtSignal(str, object)  # (filename, QImage or None)
+
+
+class _ThumbnailTask(QRunnable):
+    def __init__(self, album: AlbumIndex, entry: AlbumEntry, signals: _ThumbnailSignals):
+        super().__init__()
+        self.album = album
+        self.entry = entry
+        self.signals = signals
+
+    def run(self):
+        image = None
+        try:
+            path = self.album.cached_thumbnail(self.entry) or self.album.make_thumbnail(self.entry)
+            if path:
+                # QImage (unlike QPixmap) may be created off the GUI thread
+                image = QImage(path)
+        except Exception as e:
+            logger.error("Thumbnail task failed for %s: %s", self.entry.name, e)
+        # Always report back so the loader stops treating it as in flight
+        self.signals.finished.emit(self.entry.name, image if image is not None and not image.isNull() else None)
+
+
+class ThumbnailLoader(QObject):
+    """
+    Loads thumbnails on a small private thread pool, only when asked.
+    The grid asks for a thumbnail the first time a cell is painted, so only
+    visible cells cost anything. Newer requests run first, which keeps the
+    cells currently on screen ahead of ones already scrolled past. Loaded
+    pixmaps are kept in a bounded LRU.
+    """
+
+    thumbnail_ready = pyqtSignal(str)  # filename
+
+    def __init__(self, album: AlbumIndex, parent=None):
+        super().__init__(parent)
+        self.album = album
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(config.ALBUM_THUMBNAIL_WORKERS)
+        self._signals = _ThumbnailSignals(self)
+        self._signals.finished.connect(self._on_finished)
+        self._cache: "OrderedDict[str, QPixmap]" = OrderedDict()
+        self._in_flight = set()
+        self._failed = set()
+        self._priority = 0
+
+    def pixmap(self, entry: AlbumEntry) -> Optional[QPixmap]:
+        """The cached pixmap for `entry`, or None after scheduling a load."""
+        pixmap = self._cache.get(entry.name)
+        if pixmap is not None:
+            self._cache.move_to_end(entry.name)
+            return pixmap
+        if entry.name not in self._in_flight and entry.name not in self._failed:
+            self._in_flight.add(entry.name)
+            self._priority += 1
+            self.pool.start(_ThumbnailTask(self.album, entry, self._signals), self._priority)
+        return None
+
+    def cancel_pending(self):
+        """Drop queued (not yet started) loads, e.g. when the window is hidden."""
+        self.pool.clear()
+        self._in_flight.clear()
+
+    def _on_finished(self, name: str, image: Optional[QImage]):
+        self._in_flight.discard(name)
+        if image is None:
+            self._failed.add(name)
+            return
+        self._cache[name] = QPixmap.fromImage(image)
+        while len(self._cache) > config.ALBUM_MEMORY_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        self.thumbnail_ready.emit(name)
+
+
+class AlbumModel(QAbstractListModel):
+    """
+    Archived screenshots for a QListView in icon mode.
+    Rows are directory entries only; thumbnails and metadata are looked up
+    when a cell is actually drawn.
+    """
+    EntryRole = Qt.ItemDataRole.UserRole
+
+    def __init__(self, album: AlbumIndex, loader: ThumbnailLoader, parent=None):
+        super().__init__(parent)
+        self.album = album
+        self.loader = loader
+        self._entries: List[AlbumEntry] = []
+        self._rows: Dict[str, int] = {}
+        self._placeholder = QPixmap(*config.ALBUM_THUMBNAIL_SIZE)
+        self._placeholder.fill(QColor("#e9ecef"))
+        loader.thumbnail_ready.connect(self._on_thumbnail_ready)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._entries)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self._entries[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return entry.timestamp.strftime("%m-%d %H:%M")
+        if role == Qt.ItemDataRole.DecorationRole:
+            return self.loader.pixmap(entry) or self._placeholder
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return self.album.metadata(entry.name).get("comment")
+        if role == self.EntryRole:
+            return entry
+        return None
+
+    def set_entries(self, entries: List[AlbumEntry]):
+        self.beginResetModel()
+        self._entries = entries
+        self._rows = {entry.name: row for row, entry in enumerate(entries)}
+        self.endResetModel()
+
+    def _on_thumbnail_ready(self, name: str):
+        row = self._rows.get(name)
+        if row is not None:
+            cell = self.createIndex(row, 0)
+            self.dataChanged.emit(cell, cell, [Qt.ItemDataRole.DecorationRole])
+
+
+class AlbumWindow(QDialog):
+    """
+    喵喵的回忆相册: a grid of the archived screenshots with the cat's comment
+    and the activity breakdown for the selected one. Opening it only lists
+    the directory; thumbnails stream in as cells become visible.
+    """
+
+    def __init__(self, parent=None, album: AlbumIndex = album_index):
+        super().__init__(parent)
+        self.album = album
+        self.setWindowTitle("喵喵的回忆相册")
+        self.setModal(False)
+        self.setWindowFlags(
+            Qt.WindowType.Window |
+            Qt.WindowType.WindowStaysOnTopHint |
+            Qt.WindowType.WindowTitleHint |
+            Qt.WindowType.WindowCloseButtonHint
+        )
+        self.resize(720, 560)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(16, 16, 16, 16)
+        layout.setSpacing(8)
+
+        self.count_label = QLabel("")
+        self.count_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.count_label)
+
+        # Virtualized grid: uniform cells, laid out in batches, painted on demand
+        self.loader = ThumbnailLoader(album, self)
+        self.model = AlbumModel(album, self.loader, self)
+        self.grid = QListView()
+        self.grid.setModel(self.model)
+        self.grid.setViewMode(QListView.ViewMode.IconMode)
+        self.grid.setResizeMode(QListView.ResizeMode.Adjust)
+        self.grid.setMovement(QListView.Movement.Static)
+        self.grid.setUniformItemSizes(True)
+        self.grid.setLayoutMode(QListView.LayoutMode.Batched)
+        self.grid.setBatchSize(200)
+        thumb_width, thumb_height = config.ALBUM_THUMBNAIL_SIZE
+        self.grid.setIconSize(QSize(thumb_width, thumb_height))
+        self.grid.setGridSize(QSize(thumb_width + 16, thumb_height + 32))
+        self.grid.setEditTriggers(QListView.EditTrigger.NoEditTriggers)
+        self.grid.selectionModel().currentChanged.connect(self._show_details)
+        self.grid.doubleClicked.connect(self._open_full_size)
+        layout.addWidget(self.grid, 1)
+
+        self.detail_label = QLabel("")
+        self.detail_label.setWordWrap(True)
+        self.detail_label.setMinimumHeight(48)
+        self.detail_label.setStyleSheet("color: #495057;")
+        layout.addWidget(self.detail_label)
+
+        buttons = QHBoxLayout()
+        refresh_button = QPushButton("刷新")
+        refresh_button.clicked.connect(self.refresh)
+        close_button = QPushButton("关闭")
+        close_button.clicked.connect(self.close)
+        buttons.addStretch(1)
+        buttons.addWidget(refresh_button)
+        buttons.addWidget(close_button)
+        layout.addLayout(buttons)
+
+        # New screenshots arrive with each analysis; re-list when visible
+        self._stale = True
+        state_service.activity_changed.connect(self._on_activity_changed)
+
+    def refresh(self, *args):
+        """Re-list the archive directory (stat only, no image decoding)."""
+        self._stale = False
+        entries = self.album.list_entries()
+        self.model.set_entries(entries)
+        self.count_label.setText(f"共 {len(entries)} 张回忆" if entries else "相册还是空的哦~ 让喵喵多看看你的屏幕吧！")
+        self.detail_label.setText("")
+
+    def _on_activity_changed(self, snapshot):
+        if self.isVisible():
+            self.refresh()
+        else:
+            self._stale = True
+
+    def _show_details(self, current: QModelIndex, previous: QModelIndex = None):
+        entry = current.data(AlbumModel.EntryRole) if current.isValid() else None
+        if entry is None:
+            self.detail_label.setText("")
+            return
+        meta = self.album.metadata(entry.name)
+        lines = [entry.timestamp.strftime("%Y-%m-%d %H:%M:%S")]
+        if meta.get("comment"):
+            lines.append(f"喵喵说：{meta['comment']}")
+        breakdown = meta.get("breakdown") or {}
+        top = sorted(((cat, pct) for cat, pct in breakdown.items() if pct > 0), key=lambda x: x[1], reverse=True)[:3]
+        if top:
+            lines.append("  ".join(f"{cat} {pct:.0f}%" for cat, pct in top))
+        self.detail_label.setText("\n".join(lines))
+
+    def _open_full_size(self, index: QModelIndex):
+        entry = index.data(AlbumModel.EntryRole)
+        if entry is not None:
+            QDesktopServices.openUrl(QUrl.fromLocalFile(entry.path))
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._stale:
+            self.refresh()
+
+    def hideEvent(self, event):
+        self.loader.cancel_pending()
+        super().hideEvent(event)
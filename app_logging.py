@@ -0,0 +1,66 @@
+# app_logging.py
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Dict, Optional
+
+import config
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(level: str = None, module_levels: Dict[str, str] = None):
+    """
+    Route all logging through a queue to a background listener thread.
+    Callers only pay for a level check (and, for enabled records, one
+    queue put); console and rotating-file I/O happen on the listener.
+    Modules log via logging.getLogger(__name__) with %-style arguments, so
+    messages below the configured level are never formatted.
+    Safe to call more than once; only the first call takes effect.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter = logging.Formatter(config.LOG_FORMAT)
+    handlers = []
+    if config.LOG_TO_CONSOLE:
+        console = logging.StreamHandler(sys.stderr)
+        console.setFormatter(formatter)
+        handlers.append(console)
+    if config.LOG_FILE:
+        try:
+            file_handler = logging.handlers.RotatingFileHandler(
+                config.LOG_FILE,
+                maxBytes=config.LOG_FILE_MAX_BYTES,
+                backupCount=config.LOG_FILE_BACKUP_COUNT,
+                encoding="utf-8",
+                delay=True
+            )
+            file_handler.setFormatter(formatter)
+            handlers.append(file_handler)
+        except OSError as e:
+            print(f"WARNING: Could not open log file {config.LOG_FILE}: {e}", file=sys.stderr)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel((level or config.LOG_LEVEL).upper())
+    for name, module_level in (module_levels if module_levels is not None else config.LOG_MODULE_LEVELS).items():
+        logging.getLogger(name).setLevel(module_level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Drain queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
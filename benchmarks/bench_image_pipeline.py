@@ -0,0 +1,285 @@
+# benchmarks/bench_image_pipeline.py
+"""
+Image pipeline benchmarks: compress_image, encode_image_to_base64 and the
+two together, the in-memory vs streamed API request body, on synthetic
+1080p/4K/5K screens (IDE, photo, browser), plus reference re-encodes in
+other formats for comparison.
+
+Every case runs in a fresh subprocess so its peak RSS is its own. Results
+are compared against baselines.json and the run fails if any metric
+exceeds its baseline by more than the stored threshold.
+
+    python benchmarks/bench_image_pipeline.py                   # run + compare
+    python benchmarks/bench_image_pipeline.py --filter 4k       # subset
+    python benchmarks/bench_image_pipeline.py --update-baseline # record new baselines
+"""
+import argparse
+import functools
+import importlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.synthetic_screens import RESOLUTIONS, SCENES, screen_path
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+DEFAULT_CACHE_DIR = "/tmp/desktop_pet_bench"
+RESULT_PREFIX = "BENCH_RESULT "
+
+# Allowed ratio over baseline per metric, and the absolute change below which
+# a metric is treated as noise
+DEFAULT_THRESHOLDS = {
+    "wall_ms": {"ratio": 1.25, "min_delta": 10.0},
+    "rss_growth_mb": {"ratio": 1.25, "min_delta": 8.0},
+    "output_bytes": {"ratio": 1.05, "min_delta": 1024},
+}
+
+RESIZE_BOUND = (1920, 1920)  # Same bound run_analysis_cycle passes to compress_image
+
+
+# --- Operations (run inside the case subprocess) ---
+def _op_compress(work_path: str) -> int:
+    from screenshot_analyzer import compress_image
+    compress_image(work_path, max_size=RESIZE_BOUND)
+    return os.path.getsize(work_path)
+
+
+def _op_encode(work_path: str) -> int:
+    from screenshot_analyzer import encode_image_to_base64
+    return len(encode_image_to_base64(work_path))
+
+
+def _op_pipeline(work_path: str) -> int:
+    from screenshot_analyzer import compress_image, encode_image_to_base64
+    compress_image(work_path, max_size=RESIZE_BOUND)
+    return len(encode_image_to_base64(work_path))
+
+
+def _op_request_body_inline(work_path: str) -> int:
+    """The SDK path: data URI string embedded in a fully serialized JSON body."""
+    from screenshot_analyzer import encode_image_to_base64
+    body = json.dumps({
+        "model": "bench",
+        "messages": [{"role": "user", "content": [
+            {"type": "text", "text": "prompt"},
+            {"type": "image_url", "image_url": {"url": encode_image_to_base64(work_path)}},
+        ]}],
+    }).encode("utf-8")
+    return len(body)
+
+
+@functools.lru_cache(maxsize=None)
+def _bench_uploader():
+    from streaming_upload import StreamingVisionClient
+    # No size limit: the raw 4K/5K screens are far past the API limit
+    return StreamingVisionClient("bench", "http://localhost", max_image_bytes=float("inf"))
+
+
+def _op_request_body_streamed(work_path: str) -> int:
+    """The streaming path: body chunks produced (and dropped) one at a time."""
+    length, chunks = _bench_uploader().iter_body("bench", "prompt", work_path)
+    sent = sum(len(chunk) for chunk in chunks)
+    assert sent == length
+    return sent
+
+
+def _reencode(image_format: str, **save_args) -> Callable[[str], int]:
+    """Reference path: same resize, then encode to `image_format` in memory."""
+    def op(work_path: str) -> int:
+        from PIL import Image
+        img = Image.open(work_path)
+        img.thumbnail(RESIZE_BOUND, Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        img.convert("RGB").save(buffer, image_format, **save_args)
+        return buffer.tell()
+    return op
+
+
+OPERATIONS: Dict[str, Callable[[str], int]] = {
+    "compress_image": _op_compress,
+    "encode_base64": _op_encode,
+    "compress+encode": _op_pipeline,
+    "request_body_inline": _op_request_body_inline,
+    "request_body_streamed": _op_request_body_streamed,
+    "reencode_jpeg85": _reencode("JPEG", quality=85),
+    "reencode_webp80": _reencode("WEBP", quality=80),
+}
+
+
+# --- Case subprocess ---
+def _current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return _peak_rss_mb()
+
+
+def _peak_rss_mb() -> float:
+    # VmHWM belongs to this process image; on Linux ru_maxrss survives
+    # fork/exec and would include the parent's peak
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(operation: str, source: str, repeat: int) -> Dict:
+    """Time `operation` on a fresh copy of `source`; returns the measured metrics."""
+    op = OPERATIONS[operation]
+    work_path = os.path.join(os.path.dirname(source), f"work_{os.getpid()}.png")
+    # Warm up imports so they count toward neither the timing nor the RSS growth
+    shutil.copyfile(source, work_path)
+    importlib.import_module("screenshot_analyzer")
+    _bench_uploader()
+    rss_before = _current_rss_mb()
+
+    timings, output_bytes = [], 0
+    try:
+        for _ in range(repeat):
+            shutil.copyfile(source, work_path)  # compress_image rewrites its input
+            start = time.perf_counter()
+            output_bytes = op(work_path)
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        if os.path.exists(work_path):
+            os.remove(work_path)
+    peak = _peak_rss_mb()
+    return {
+        "wall_ms": round(statistics.median(timings), 2),
+        "wall_min_ms": round(min(timings), 2),
+        "peak_rss_mb": round(peak, 1),
+        "rss_growth_mb": round(max(0.0, peak - rss_before), 1),
+        "output_bytes": output_bytes,
+        "input_bytes": os.path.getsize(source),
+    }
+
+
+def _spawn_case(operation: str, source: str, repeat: int) -> Dict:
+    env = dict(os.environ)
+    env.setdefault("DASHSCOPE_API_KEY", "benchmark-placeholder")  # The client is built at import
+    env.setdefault("PET_LOG_LEVEL", "ERROR")
+    command = [sys.executable, os.path.abspath(__file__), "--run-case", operation, source, str(repeat)]
+    completed = subprocess.run(command, capture_output=True, text=True, cwd=REPO_ROOT, env=env)
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError(f"Case {operation} on {source} failed:\n{completed.stderr[-2000:]}")
+
+
+# --- Baselines ---
+def load_baseline(path: str) -> Dict:
+    if not os.path.exists(path):
+        return {"thresholds": DEFAULT_THRESHOLDS, "cases": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(results: Dict[str, Dict], baseline: Dict) -> List[str]:
+    """Human-readable regressions of `results` against `baseline` (empty if none)."""
+    thresholds = baseline.get("thresholds", DEFAULT_THRESHOLDS)
+    regressions = []
+    for case_id, metrics in results.items():
+        base = baseline.get("cases", {}).get(case_id)
+        if not base:
+            continue
+        for metric, limit in thresholds.items():
+            old, new = base.get(metric), metrics.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * limit["ratio"] and new - old > limit["min_delta"]:
+                regressions.append(f"{case_id}: {metric} {old} -> {new} "
+                                   f"(limit x{limit['ratio']}, +{limit['min_delta']})")
+    return regressions
+
+
+def _format_table(results: Dict[str, Dict], baseline: Dict) -> str:
+    width = max([len("case")] + [len(case_id) for case_id in results])
+    lines = [f"{'case':<{width}}  {'wall ms':>9}  {'vs base':>8}  {'rss +MB':>8}  {'peak MB':>8}  {'out KB':>9}"]
+    lines.append("-" * len(lines[0]))
+    for case_id, m in results.items():
+        base = baseline.get("cases", {}).get(case_id)
+        change = f"{m['wall_ms'] / base['wall_ms']:.2f}x" if base and base.get("wall_ms") else "new"
+        lines.append(f"{case_id:<{width}}  {m['wall_ms']:>9.1f}  {change:>8}  {m['rss_growth_mb']:>8.1f}  "
+                     f"{m['peak_rss_mb']:>8.1f}  {m['output_bytes'] / 1024:>9.1f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the screenshot image pipeline.")
+    parser.add_argument("--filter", default="", help="Only run cases whose id contains this text")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case (median is reported)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="Write this run's results as the baseline")
+    parser.add_argument("--json", dest="json_out", help="Also write raw results to this file")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Where generated screens are kept")
+    parser.add_argument("--run-case", nargs=3, metavar=("OPERATION", "SOURCE", "REPEAT"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        operation, source, repeat = args.run_case
+        print(RESULT_PREFIX + json.dumps(run_case(operation, source, int(repeat))))
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    results = {}
+    for scene in SCENES:
+        for resolution in RESOLUTIONS:
+            for operation in OPERATIONS:
+                case_id = f"{scene}/{resolution}/{operation}"
+                if args.filter not in case_id:
+                    continue
+                source = screen_path(args.cache_dir, scene, resolution)
+                results[case_id] = _spawn_case(operation, source, args.repeat)
+                print(f"{case_id}: {results[case_id]['wall_ms']:.1f} ms", file=sys.stderr)
+
+    print(_format_table(results, baseline))
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        baseline.setdefault("thresholds", DEFAULT_THRESHOLDS)
+        baseline.setdefault("cases", {}).update(results)
+        baseline["machine"] = {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "processor": platform.processor() or platform.machine(),
+            "cpus": os.cpu_count(),
+        }
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline)
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+# benchmarks/fleet_load.py
+"""
+Load test for the fleet server, entirely local: a mock OpenAI-compatible
+model endpoint (fixed latency, canned replies) and an in-process
+fleet_server.py, driven by simulated desktops that each send a stream of
+synthetic 1080p screens through FleetClient. Most frames repeat the
+previous screen, so the hash cache is exercised alongside real analyses.
+
+Reports per-status counts, client latency percentiles, how many model
+calls the mock endpoint received and the server's own counters. Small
+worker/queue/quota settings make backpressure and shedding easy to see.
+
+    python benchmarks/fleet_load.py
+    python benchmarks/fleet_load.py --desktops 20 --frames 10 --workers 2 --queue-size 2 --api-latency 1.5
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+_COMMENTS = [
+    "代码写得好认真呀，喵喵在旁边陪着你~",
+    "又在看网页了吗？带喵喵一起看嘛！",
+    "这个界面好复杂，主人好厉害 (〃∇〃)",
+    "休息一下眼睛吧，喵喵给你踩踩背~",
+]
+
+
+class MockModelEndpoint:
+    """OpenAI-compatible /chat/completions stand-in with a fixed latency and canned replies."""
+
+    def __init__(self, latency: float, error_rate: float):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.rng = random.Random(7)
+        endpoint = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                prompt = body["messages"][0]["content"][0]["text"]
+                with endpoint.lock:
+                    endpoint.calls += 1
+                    fail = endpoint.rng.random() < endpoint.error_rate
+                    comment = endpoint.rng.choice(_COMMENTS)
+                time.sleep(endpoint.latency)
+                if fail:
+                    self._reply(429, {"error": {"message": "mock rate limit"}})
+                    return
+                content = '{"工作编程": 60, "网页浏览": 40}' if "JSON" in prompt else comment
+                self._reply(200, {
+                    "id": "mock", "object": "chat.completion", "created": int(time.time()),
+                    "model": body["model"],
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": content}}],
+                })
+
+            def _reply(self, status: int, payload: Dict):
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        threading.Thread(target=self.server.serve_forever, name="MockModelEndpoint", daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_screens(directory: str, count: int) -> List[str]:
+    """`count` distinct synthetic 1080p screens."""
+    from benchmarks.synthetic_screens import RESOLUTIONS, SCENES
+    scenes = list(SCENES.items())
+    paths = []
+    for i in range(count):
+        name, draw = scenes[i % len(scenes)]
+        path = os.path.join(directory, f"{name}_{i}.png")
+        draw(RESOLUTIONS["1080p"], seed=100 + i).save(path, "PNG")
+        paths.append(path)
+    return paths
+
+
+def run_desktop(client, screens: List[str], frames: int, change_every: int, interval: float,
+                rng: random.Random, results: List, lock: threading.Lock):
+    import httpx
+    screen = rng.choice(screens)
+    for i in range(frames):
+        if i and i % change_every == 0:
+            screen = rng.choice(screens)
+        start = time.perf_counter()
+        try:
+            answer = client.analyze(screen)
+            outcome = answer["status"]
+        except httpx.HTTPStatusError as e:
+            outcome = str(e.response.status_code)
+        except httpx.HTTPError as e:
+            outcome = type(e).__name__
+        with lock:
+            results.append((outcome, (time.perf_counter() - start) * 1000))
+        time.sleep(interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the fleet server against a mock model endpoint.")
+    parser.add_argument("--desktops", type=int, default=8, help="Simulated desktops (tenants)")
+    parser.add_argument("--frames", type=int, default=6, help="Frames each desktop sends")
+    parser.add_argument("--change-every", type=int, default=3, help="Frames before a desktop's screen changes")
+    parser.add_argument("--interval", type=float, default=0.0, help="Seconds between a desktop's frames")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queue-size", type=int, default=4)
+    parser.add_argument("--api-latency", type=float, default=0.5, help="Mock model latency per call (seconds)")
+    parser.add_argument("--api-error-rate", type=float, default=0.0, help="Share of mock calls answered with 429")
+    parser.add_argument("--screens", type=int, default=6, help="Distinct synthetic screens")
+    parser.add_argument("--json", dest="json_out", help="Also write the raw report to this file")
+    args = parser.parse_args(argv)
+
+    state_dir = tempfile.mkdtemp(prefix="desktop_pet_fleet_")
+    mock = MockModelEndpoint(args.api_latency, args.api_error_rate)
+    # Must be set before config is imported
+    os.environ["PET_STATE_DIR"] = state_dir
+    os.environ["PET_API_BASE_URL"] = mock.url
+    os.environ["DASHSCOPE_API_KEY"] = "mock"  # Only ever sent to the mock endpoint
+    os.environ.setdefault("PET_LOG_LEVEL", "ERROR")
+    os.environ.pop("PET_FLEET_TOKENS", None)
+    import config
+    config.LOG_FILE = None
+    config.FLEET_TENANT_TOKENS = {}
+    from fleet_client import FleetClient
+    from fleet_server import FleetServer, make_server
+    from persistence import persistence_writer
+
+    fleet = FleetServer(os.path.join(state_dir, "fleet"), args.workers, args.queue_size)
+    server = make_server("127.0.0.1", 0, fleet)
+    threading.Thread(target=server.serve_forever, name="FleetServer", daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    results, lock, threads = [], threading.Lock(), []
+    try:
+        screens = make_screens(state_dir, args.screens)
+        start = time.perf_counter()
+        for i in range(args.desktops):
+            client = FleetClient(url, f"desk{i:03d}")
+            thread = threading.Thread(target=run_desktop, args=(
+                client, screens, args.frames, args.change_every, args.interval, random.Random(i), results, lock))
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        tenant_states = {tenant_id: tenant.snapshot() for tenant_id, tenant in fleet.tenants.items()}
+    finally:
+        server.shutdown()
+        server.server_close()
+        fleet.shutdown()
+        persistence_writer.shutdown()
+        mock.close()
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+    outcomes = Counter(outcome for outcome, _ in results)
+    report = {
+        "frames": len(results),
+        "seconds": elapsed,
+        "outcomes": dict(outcomes),
+        "model_calls": mock.calls,
+        "server": fleet.health(),
+        "latency_ms": {},
+        "tenants": tenant_states,
+    }
+    print(f"frames sent:      {len(results)} from {args.desktops} desktops in {elapsed:.1f}s")
+    print(f"outcomes:         {', '.join(f'{k} {v}' for k, v in sorted(outcomes.items()))}")
+    print(f"model calls:      {mock.calls} (mock endpoint, {args.api_latency}s each)")
+    for outcome in sorted(outcomes):
+        timings = sorted(ms for o, ms in results if o == outcome)
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        report["latency_ms"][outcome] = {"median": statistics.median(timings), "p95": p95}
+        print(f"  {outcome:<10} ms:   median {statistics.median(timings):.0f}  p95 {p95:.0f}")
+    print(f"server counters:  {json.dumps(report['server'])}")
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
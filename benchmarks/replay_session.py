@@ -0,0 +1,197 @@
+# benchmarks/replay_session.py
+"""
+Replay a session recorded with `main.py --record` through the real
+run_analysis_cycle() offline: recorded frames stand in for screenshots, a
+stub client answers from the recorded model responses, and a fake clock
+replays the recorded times. Persistence, keyword matching and scoring all
+run for real against a scratch state directory seeded from the session
+header, so the replay doubles as a benchmark and a regression test.
+
+Each cycle's result, favorability change, favorability level and recorded
+activity breakdown are compared with the recording; any difference is
+reported and the run exits with status 1.
+
+    python benchmarks/replay_session.py session.jsonl.gz
+    python benchmarks/replay_session.py session.jsonl.gz --repeat 5 --profile
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+DEFAULT_TRACE_PATH = "/tmp/desktop_pet_replay_trace.json"
+
+
+def seed_state(header: Dict):
+    """Write the starting favorability and message history from the session header."""
+    import config
+    favorability = dict(header["favorability"], interaction_history=[])
+    with open(config.FAVORABILITY_DATA_FILE, "w", encoding="utf-8") as f:
+        json.dump(favorability, f, ensure_ascii=False)
+    with open(config.MESSAGE_HISTORY_FILE, "w", encoding="utf-8") as f:
+        json.dump({"messages": header["recent_messages"]}, f, ensure_ascii=False)
+
+
+def _differences(record: Dict, result: str, change: int, favorability_after: int, activity) -> List[str]:
+    found = []
+    if result != record["result"]:
+        found.append(f"result {record['result']!r} -> {result!r}")
+    if change != record["favorability_change"]:
+        found.append(f"favorability_change {record['favorability_change']} -> {change}")
+    if favorability_after != record["favorability_after"]:
+        found.append(f"favorability {record['favorability_after']} -> {favorability_after}")
+    expected = record["activity"]
+    if (expected is None) != (activity is None) or (
+            expected and any(abs(expected[cat] - activity.get(cat, 0.0)) > 1e-6 for cat in expected)):
+        found.append(f"activity {expected} -> {activity}")
+    return found
+
+
+def replay(session_path: str, state_dir: str) -> Dict:
+    """Run every recorded cycle once; returns timings and per-cycle differences."""
+    from session_recorder import read_session, restore_frame, ReplayClient
+    header, cycles = read_session(session_path)
+    seed_state(header)
+
+    import clock
+    import config
+    fake_clock = clock.FakeClock(datetime.fromisoformat(header["started"]))
+    clock.set_clock(fake_clock)
+    config.STREAMING_UPLOAD_ENABLED = header["streaming_upload"]
+    config.SCREENSHOT_PATH = os.path.join(state_dir, "replay_screenshot.png")
+
+    import screenshot_analyzer as analyzer
+    from state_service import state_service
+    if header.get("activity_context"):
+        state_service.restore_activity(header["activity_context"], header.get("focus_sessions"))
+    elif header.get("focus_sessions"):
+        state_service.activity_tracker.restore_focus_state(header["focus_sessions"])
+    if header.get("prompt_context"):
+        # The summary covers more history than the header's seed messages
+        analyzer.prompt_context.restore(header["prompt_context"])
+    replay_client = ReplayClient(fake_clock)
+    analyzer.client = analyzer.streaming_client = replay_client
+
+    timings, divergences, recorded_latency = [], {}, 0.0
+    for record in cycles:
+        fake_clock.set(datetime.fromisoformat(record["time"]))
+        analyzer.prompt_manager.rng.seed(record["seed"])
+        replay_client.load_cycle(record["calls"])
+        recorded_latency += sum(call["latency"] for call in record["calls"])
+        frame = record["frame"]
+        screenshot = restore_frame(frame, config.SCREENSHOT_PATH) if frame else None
+        analyses_before = state_service.activity_snapshot()["total_analyses"]
+
+        start = time.perf_counter()
+        result, change = analyzer.run_analysis_cycle(capture=lambda: screenshot)
+        timings.append((time.perf_counter() - start) * 1000)
+
+        activity = None
+        if state_service.activity_snapshot()["total_analyses"] > analyses_before:
+            activity = state_service.activity_tracker.get_recent_activities(1)[0]["breakdown"]
+        found = _differences(record, result, change, state_service.favorability_snapshot()["favorability"], activity)
+        if replay_client.prompt_mismatches:
+            found.append(f"{replay_client.prompt_mismatches} prompt(s) differ from the recording")
+        if replay_client.unexpected_calls or replay_client.calls_left:
+            found.append(f"model calls: {replay_client.unexpected_calls} unexpected, "
+                         f"{replay_client.calls_left} recorded but not made")
+        if found:
+            divergences[record["index"]] = found
+
+    from persistence import persistence_writer
+    flush_start = time.perf_counter()
+    persistence_writer.shutdown()
+    return {
+        "cycles": len(timings),
+        "cycle_ms": timings,
+        "flush_ms": (time.perf_counter() - flush_start) * 1000,
+        "recorded_api_seconds": recorded_latency,
+        "divergences": divergences,
+    }
+
+
+def _format_report(report: Dict) -> str:
+    timings = sorted(report["cycle_ms"])
+    if not timings:
+        return "Session has no cycles."
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    lines = [
+        f"cycles:           {report['cycles']}",
+        f"cycle ms:         median {statistics.median(timings):.1f}  p95 {p95:.1f}  max {timings[-1]:.1f}",
+        f"total local ms:   {sum(timings):.1f} (+ {report['flush_ms']:.1f} final state flush)",
+        f"recorded API s:   {report['recorded_api_seconds']:.1f} (skipped)",
+        f"divergent cycles: {len(report['divergences'])}",
+    ]
+    for index, found in report["divergences"].items():
+        for line in found:
+            lines.append(f"  cycle {index}: {line}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded session offline.")
+    parser.add_argument("session", help="Session file written by main.py --record")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Replay the session this many times, each in a fresh process and state dir")
+    parser.add_argument("--state-dir", help="Keep the replayed state here instead of a deleted temp dir")
+    parser.add_argument("--profile", nargs="?", const=DEFAULT_TRACE_PATH, default=None, metavar="TRACE_FILE",
+                        help="Record stage spans and write a Chrome trace")
+    parser.add_argument("--json", dest="json_out", help="Also write the raw report to this file")
+    parser.add_argument("--run-once", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.repeat > 1 and not args.run_once:
+        # Module-level state (clients, history, trackers) is built at import,
+        # so every repetition gets its own interpreter
+        import subprocess
+        command = [sys.executable, os.path.abspath(__file__), args.session, "--run-once"]
+        if args.profile:
+            command += ["--profile", args.profile]
+        failed = 0
+        for _ in range(args.repeat):
+            failed |= subprocess.run(command, cwd=REPO_ROOT).returncode
+        return 1 if failed else 0
+
+    state_dir = args.state_dir or tempfile.mkdtemp(prefix="desktop_pet_replay_")
+    os.makedirs(state_dir, exist_ok=True)
+    # Must be set before config is imported: every state path is derived from it
+    os.environ["PET_STATE_DIR"] = state_dir
+    os.environ.setdefault("DASHSCOPE_API_KEY", "replay")  # Never sent; the clients are stubbed
+    os.environ.setdefault("PET_LOG_LEVEL", "ERROR")
+    import config
+    config.LOG_FILE = None  # Keep replay noise out of the app's log
+    from app_logging import setup_logging
+    setup_logging()
+    from tracing import tracer
+    if args.profile:
+        tracer.enable()
+
+    try:
+        report = replay(args.session, state_dir)
+    finally:
+        if not args.state_dir:
+            shutil.rmtree(state_dir, ignore_errors=True)
+
+    print(_format_report(report))
+    if args.profile:
+        tracer.disable()
+        tracer.write_chrome_trace(args.profile)
+        print(tracer.format_summary())
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return 1 if report["divergences"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+# benchmarks/synthetic_screens.py
+"""
+Deterministic synthetic screenshots for the image pipeline benchmarks.
+Each scene is drawn from a fixed seed, so every run (and every machine)
+benchmarks byte-identical inputs.
+"""
+import os
+import random
+from typing import Callable, Dict, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+RESOLUTIONS: Dict[str, Tuple[int, int]] = {
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+    "5k": (5120, 2880),
+}
+
+_CODE_WORDS = ["def", "return", "self", "import", "class", "if", "else", "for", "in", "None",
+               "config", "image_path", "logger.debug", "try:", "except", "with", "open(", "):",
+               "data", "result", "=", "+=", "len(", "[0]", "True", "False", "async", "await"]
+_PROSE_WORDS = ["the", "cat", "screen", "window", "today", "python", "release", "notes", "about",
+                "image", "search", "results", "video", "news", "weather", "music", "shop", "read"]
+
+
+def _font(size: int):
+    # Pillow >= 10.1 can scale the built-in font; older versions only have one size
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def _noise(rng: random.Random, size: Tuple[int, int], mode: str = "RGB") -> Image.Image:
+    channels = len(mode)
+    return Image.frombytes(mode, size, rng.randbytes(size[0] * size[1] * channels))
+
+
+def _photo(rng: random.Random, size: Tuple[int, int]) -> Image.Image:
+    """Smooth low-frequency color fields plus fine grain, like a photo or video frame."""
+    width, height = size
+    # Low-resolution random color field, upscaled smoothly
+    coarse = _noise(rng, (max(2, width // 160), max(2, height // 160)))
+    image = coarse.resize(size, Image.Resampling.BICUBIC)
+    # Vignette-ish gradient for large-scale structure
+    gradient = Image.radial_gradient("L").resize(size, Image.Resampling.BILINEAR)
+    image = Image.composite(image, Image.new("RGB", size, (20, 24, 30)), Image.eval(gradient, lambda v: 255 - v))
+    # Sensor grain
+    grain = _noise(rng, size)
+    return Image.blend(image, grain, 0.08)
+
+
+def ide_screen(size: Tuple[int, int], seed: int = 1) -> Image.Image:
+    """Dark-theme editor: sidebar, tab bar, line numbers and many short colored tokens."""
+    rng = random.Random(seed)
+    width, height = size
+    scale = width / 1920
+    image = Image.new("RGB", size, (30, 30, 30))
+    draw = ImageDraw.Draw(image)
+    font = _font(max(10, int(14 * scale)))
+    line_height = max(12, int(20 * scale))
+    sidebar = int(260 * scale)
+    draw.rectangle([0, 0, sidebar, height], fill=(37, 37, 38))
+    draw.rectangle([0, 0, width, int(36 * scale)], fill=(45, 45, 48))
+    colors = [(212, 212, 212), (86, 156, 214), (206, 145, 120), (78, 201, 176), (197, 134, 192), (106, 153, 85)]
+
+    # File tree
+    y = int(50 * scale)
+    while y < height - line_height:
+        indent = rng.randint(0, 3) * int(16 * scale)
+        draw.text((int(12 * scale) + indent, y), rng.choice(_CODE_WORDS) + ".py", fill=(204, 204, 204), font=font)
+        y += line_height
+
+    # Code lines
+    y = int(50 * scale)
+    line_no = 1
+    text_left = sidebar + int(60 * scale)
+    while y < height - line_height:
+        draw.text((sidebar + int(10 * scale), y), f"{line_no:>4}", fill=(110, 118, 129), font=font)
+        x = text_left + rng.randint(0, 4) * int(28 * scale)
+        for _ in range(rng.randint(0, 12)):
+            token = rng.choice(_CODE_WORDS)
+            draw.text((x, y), token, fill=rng.choice(colors), font=font)
+            x += int((len(token) + 1) * 8.5 * scale)
+            if x > width - int(40 * scale):
+                break
+        y += line_height
+        line_no += 1
+    return image
+
+
+def photo_screen(size: Tuple[int, int], seed: int = 2) -> Image.Image:
+    """Full-screen photo or paused video frame."""
+    return _photo(random.Random(seed), size)
+
+
+def browser_screen(size: Tuple[int, int], seed: int = 3) -> Image.Image:
+    """Light web page: toolbar, headings, paragraphs and a few embedded images."""
+    rng = random.Random(seed)
+    width, height = size
+    scale = width / 1920
+    image = Image.new("RGB", size, (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    font = _font(max(10, int(16 * scale)))
+    heading = _font(max(14, int(28 * scale)))
+    draw.rectangle([0, 0, width, int(80 * scale)], fill=(222, 225, 230))
+    draw.rounded_rectangle([int(200 * scale), int(22 * scale), width - int(200 * scale), int(58 * scale)],
+                           radius=int(18 * scale), fill=(255, 255, 255))
+
+    column_left = int(width * 0.18)
+    column_right = int(width * 0.66)
+    y = int(120 * scale)
+    while y < height - int(40 * scale):
+        block = rng.random()
+        if block < 0.15:
+            draw.text((column_left, y), " ".join(rng.choice(_PROSE_WORDS) for _ in range(5)).title(),
+                      fill=(20, 20, 20), font=heading)
+            y += int(50 * scale)
+        elif block < 0.35:
+            box = (column_right - column_left, int(rng.randint(180, 320) * scale))
+            image.paste(_photo(rng, box), (column_left, y))
+            y += box[1] + int(24 * scale)
+        else:
+            for _ in range(rng.randint(2, 5)):
+                words, x = rng.randint(8, 16), column_left
+                for _ in range(words):
+                    word = rng.choice(_PROSE_WORDS)
+                    draw.text((x, y), word, fill=(60, 64, 67), font=font)
+                    x += int((len(word) + 1) * 9 * scale)
+                    if x > column_right:
+                        break
+                y += int(24 * scale)
+            y += int(16 * scale)
+    # Sidebar ads/thumbnails
+    y = int(120 * scale)
+    while y < height - int(200 * scale):
+        box = (int(width * 0.2), int(120 * scale))
+        image.paste(_photo(rng, box), (int(width * 0.72), y))
+        y += box[1] + int(30 * scale)
+    return image
+
+
+SCENES: Dict[str, Callable[[Tuple[int, int]], Image.Image]] = {
+    "ide": ide_screen,
+    "photo": photo_screen,
+    "browser": browser_screen,
+}
+
+
+def screen_path(cache_dir: str, scene: str, resolution: str) -> str:
+    """Path of the PNG for (scene, resolution), generating it on first use."""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{scene}_{resolution}.png")
+    if not os.path.exists(path):
+        # Written like screencapture output: plain, unoptimized PNG
+        SCENES[scene](RESOLUTIONS[resolution]).save(path, "PNG")
+    return path
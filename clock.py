@@ -0,0 +1,57 @@
+# clock.py
+import time
+from datetime import datetime, timedelta
+
+
+class SystemClock:
+    """Wall-clock time; the default."""
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def timestamp(self) -> float:
+        return time.time()
+
+
+class FakeClock:
+    """
+    Clock that only moves when told to.
+    Session replay sets it to each recorded cycle's time and advances it by
+    the recorded API latency, so time-dependent scoring (time of day,
+    "long time no see" penalties, daily rollups) behaves as it did live.
+    """
+
+    def __init__(self, start: datetime = None):
+        self._now = start or datetime.now()
+
+    def now(self) -> datetime:
+        return self._now
+
+    def timestamp(self) -> float:
+        return self._now.timestamp()
+
+    def set(self, when: datetime):
+        self._now = when
+
+    def advance(self, seconds: float):
+        self._now += timedelta(seconds=seconds)
+
+
+_clock = SystemClock()
+
+
+def now() -> datetime:
+    """Current local time from the active clock (use instead of datetime.now())."""
+    return _clock.now()
+
+
+def timestamp() -> float:
+    """Current POSIX time from the active clock (use instead of time.time())."""
+    return _clock.timestamp()
+
+
+def set_clock(new_clock):
+    """Install `new_clock` process-wide and return the previous one."""
+    global _clock
+    previous, _clock = _clock, new_clock
+    return previous
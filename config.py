@@ -6,7 +6,7 @@ load_dotenv() # Load variables from .env file
 
 # --- API Configuration ---
 API_KEY = os.getenv("DASHSCOPE_API_KEY")
-API_BASE_URL = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+API_BASE_URL = os.getenv("PET_API_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1")  # Override to use a local mock endpoint
 MODEL_NAME = "qwen-vl-plus" # Or "qwen-vl-max"
 
 # --- Application Configuration ---
@@ -23,6 +23,119 @@ MAX_SAVED_SCREENSHOTS = 10  # Maximum number of screenshots to keep
 SCREENSHOT_DIRECTORY = "/tmp/cat_screenshots/"  # Directory to store screenshots
 SCREENSHOT_FILENAME_FORMAT = "cat_screenshot_{timestamp}.png"  # Format for screenshot filenames
 
+# --- Animation Configuration ---
+PET_ANIMATION_ENABLED = True  # Animate the cat (set False for static images only)
+PET_ANIMATION_FPS = 8  # Upper bound for the shared animation timer
+PET_ANIMATION_STATE_FPS = {"idle": 3, "thinking": 6, "talking": 8}  # Playback rate per state
+# Optional sprite sheets (horizontal strips of square frames) per state, e.g. {"idle": "assets/cat_idle_sheet.png"};
+# states without one use the static images
+PET_ANIMATION_SHEETS = {}
+PET_ANIMATION_SYNTHESIZE = False  # Give static images a subtle breathing loop (keeps the animation timer running while idle)
+
+# --- Persistence Configuration ---
+STATE_DIRECTORY = os.getenv("PET_STATE_DIR", "/tmp")  # Where the pet's state files live (session replay points this at a scratch dir)
+ACTIVITY_DATA_FILE = os.path.join(STATE_DIRECTORY, "cat_activity_data.json")
+FAVORABILITY_DATA_FILE = os.path.join(STATE_DIRECTORY, "cat_favorability.json")
+MESSAGE_HISTORY_FILE = os.path.join(STATE_DIRECTORY, "cat_message_history.json")
+PERSIST_DEBOUNCE_SECONDS = 5  # Delay for coalescing state writes on the background writer
+JOURNAL_COMPACT_EVERY = 200  # Journal events before state is compacted into a snapshot
+ACTIVITY_SQLITE_ENABLED = False  # Also keep full activity history in SQLite (unbounded retention)
+ACTIVITY_DB_PATH = os.path.join(STATE_DIRECTORY, "cat_activity.db")  # SQLite database for long-term activity history
+ACTIVITY_DB_BATCH_SIZE = 10  # Activities buffered before one batched insert
+ACTIVITY_MATRIX_ENABLED = False  # Keep a memory-mapped numeric activity history (optional, requires numpy; ~9 MB of files)
+ACTIVITY_MATRIX_PATH_PREFIX = os.path.join(STATE_DIRECTORY, "cat_activity_matrix")  # Prefix for the memory-mapped files
+ACTIVITY_MATRIX_CAPACITY = 200000  # Samples kept in the ring buffer (~9 MB on disk)
+
+# --- Frame Batching Configuration ---
+BATCH_MODE_ENABLED = False  # Sample frames between analyses and describe the whole window in one request
+BATCH_CAPTURE_INTERVAL_SECONDS = 20  # Sampling rate; each sample becomes an activity record
+BATCH_BUFFER_MAX_FRAMES = 12  # Frames kept per window (the oldest are dropped beyond this)
+BATCH_MAX_KEYFRAMES = 4  # Images per request: the latest frame plus the biggest changes
+BATCH_KEYFRAME_MIN_CHANGE = 0.02  # Frames that changed less than this (0-1) are never keyframes
+BATCH_FRAME_MAX_SIZE = (1024, 1024)  # Buffered frames are downsampled to fit within this
+BATCH_FRAME_QUALITY = 75  # JPEG quality of buffered frames
+BATCH_FRAME_DIRECTORY = os.path.join(STATE_DIRECTORY, "cat_frame_buffer")
+
+# --- Image Worker Configuration ---
+IMAGE_WORKER_PROCESSES = 2  # Processes that resize/encode screenshots off the GUI process (0: on the analysis thread)
+IMAGE_WORKER_QUEUE_SIZE = 4  # Jobs that may wait for a free worker; more are refused
+IMAGE_WORKER_TIMEOUT_SECONDS = 30  # Max wait for a queue slot, and for one job
+
+# --- Active Window Configuration ---
+WINDOW_PROBE_ENABLED = True  # Read the focused window's app/title before captures (X11/EWMH or macOS)
+WINDOW_GATE_MAX_AGE_SECONDS = 600  # Auto captures of an unchanged window are skipped until the last analysis is this old
+WINDOW_PRIOR_WEIGHT = 0.5  # Share of the activity breakdown given to the category implied by the focused app
+CAPTURE_FOCUSED_WINDOW = False  # Capture only the focused window's area instead of the whole desktop
+CAPTURE_WINDOW_PADDING = 16  # Extra pixels captured around the focused window
+CAPTURE_WINDOW_MIN_SIZE = (320, 200)  # Smaller focused windows (dialogs, popups) fall back to the full screen
+# Lowercase substrings of the window title -> activity category (checked before the app)
+WINDOW_TITLE_CATEGORIES = {
+    "youtube": "视频媒体", "bilibili": "视频媒体", "哔哩哔哩": "视频媒体", "netflix": "视频媒体",
+    "github": "工作编程", "stack overflow": "工作编程",
+    "wikipedia": "学习研究", "维基百科": "学习研究", "arxiv": "学习研究", "documentation": "学习研究",
+    "twitter": "社交聊天", "微博": "社交聊天", "gmail": "社交聊天", "discord": "社交聊天",
+}
+# Lowercase substrings of the process name / WM_CLASS / bundle id -> activity category
+WINDOW_APP_CATEGORIES = {
+    "code": "工作编程", "pycharm": "工作编程", "idea": "工作编程", "xcode": "工作编程", "vim": "工作编程",
+    "emacs": "工作编程", "terminal": "工作编程", "iterm": "工作编程", "konsole": "工作编程", "alacritty": "工作编程",
+    "wechat": "社交聊天", "weixin": "社交聊天", "qq": "社交聊天", "slack": "社交聊天", "telegram": "社交聊天",
+    "discord": "社交聊天", "mail": "社交聊天", "thunderbird": "社交聊天",
+    "chrome": "网页浏览", "firefox": "网页浏览", "safari": "网页浏览", "edge": "网页浏览",
+    "vlc": "视频媒体", "mpv": "视频媒体", "iina": "视频媒体", "spotify": "视频媒体", "music": "视频媒体",
+    "steam": "游戏", "minecraft": "游戏",
+    "photoshop": "创作设计", "figma": "创作设计", "gimp": "创作设计", "krita": "创作设计", "blender": "创作设计",
+    "finder": "系统管理", "nautilus": "系统管理", "dolphin": "系统管理", "settings": "系统管理",
+    "zotero": "学习研究", "obsidian": "学习研究", "notion": "学习研究",
+}
+
+# --- Album Configuration ---
+ALBUM_CACHE_DIRECTORY = os.path.join(STATE_DIRECTORY, "cat_album_cache")  # Thumbnails + metadata index
+ALBUM_THUMBNAIL_SIZE = (192, 120)  # Thumbnails fit within this (pixels)
+ALBUM_THUMBNAIL_QUALITY = 80  # JPEG quality of cached thumbnails
+ALBUM_THUMBNAIL_WORKERS = 2  # Background threads generating thumbnails
+ALBUM_MEMORY_CACHE_SIZE = 300  # Decoded thumbnails kept in memory while browsing
+
+# --- Focus Session Configuration ---
+FOCUS_GAP_TOLERANCE_MINUTES = 10  # A longer silence between samples ends the session
+FOCUS_MERGE_INTERRUPTION_MINUTES = 5  # Shorter detours into another category are merged into the surrounding session
+FOCUS_HISTOGRAM_BINS_MINUTES = [5, 15, 30, 60, 120, 240]  # Session length bin edges for the statistics window
+FOCUS_PROMPT_MIN_MINUTES = 30  # Tell the cat about the current session once it is this long
+
+# --- Prompt Context Configuration ---
+PROMPT_TOKEN_BUDGET = 900  # Estimated tokens for the whole text prompt (persona + context)
+PROMPT_RECENT_MESSAGES = 5  # Latest replies quoted verbatim (budget permitting)
+PROMPT_RECENT_MESSAGE_MAX_CHARS = 60  # Quoted replies are cut to this length
+PROMPT_SUMMARY_REFRESH_MESSAGES = 20  # Re-render the summary of older replies after this many new ones
+PROMPT_SUMMARY_DECAY = 0.9  # Older topic/opening counts fade by this factor at each refresh
+PROMPT_SUMMARY_KEEP = 30  # Topics/openings tracked by the summary
+REPLY_SIMILARITY_THRESHOLD = 0.8  # A reply whose character-bigram Jaccard similarity to a remembered one exceeds this counts as a repeat
+
+# --- Keyword Scoring ---
+# Category -> {keyword: weight} used by the keyword-based activity fallback.
+# Keywords are matched case-insensitively by one compiled matcher (keyword_matcher.py).
+ACTIVITY_KEYWORDS = {
+    "工作编程": dict.fromkeys(["代码", "编程", "code", "programming", "开发", "debug", "函数", "变量", "git", "terminal", "ide", "vscode"], 10),
+    "娱乐休闲": dict.fromkeys(["视频", "电影", "音乐", "娱乐", "休闲", "youtube", "netflix", "bilibili", "抖音"], 10),
+    "社交聊天": dict.fromkeys(["聊天", "消息", "微信", "qq", "telegram", "discord", "邮件", "email", "chat"], 10),
+    "学习研究": dict.fromkeys(["学习", "文档", "阅读", "研究", "paper", "文献", "教程", "course", "study"], 10),
+    "创作设计": dict.fromkeys(["设计", "创作", "画", "photoshop", "figma", "sketch", "创意", "艺术"], 10),
+    "系统管理": dict.fromkeys(["系统", "设置", "配置", "管理", "finder", "preferences", "系统偏好"], 10),
+    "网页浏览": dict.fromkeys(["浏览器", "网页", "搜索", "chrome", "safari", "firefox", "google", "百度"], 10),
+    "视频媒体": dict.fromkeys(["播放器", "视频", "movie", "media", "vlc", "quicktime"], 10),
+    "游戏": dict.fromkeys(["游戏", "game", "steam", "play", "玩"], 10),
+}
+
+# Favorability triggers, checked in order; the first rule with a matching keyword applies
+FAVORABILITY_TRIGGERS = [
+    {"reason": "看其他猫咪", "change": -3, "keywords": ["其他猫", "别的猫", "猫咪视频", "cat video"]},
+    {"reason": "为喵喵买东西", "change": 5, "keywords": ["猫粮", "猫玩具", "pet shop"]},
+    {"reason": "深夜陪伴", "change": 2, "keywords": ["深夜", "凌晨"]},
+    {"reason": "一起工作", "change": 1, "keywords": ["代码", "programming", "coding"]},
+    {"reason": "一起看动漫", "change": 3, "keywords": ["动漫", "anime", "动画"]},
+    {"reason": "一起玩游戏", "change": 2, "keywords": ["游戏", "game"]},
+]
+
 # --- AI Prompt ---
 PROMPT_TEMPLATE = """
 你是一只名叫"喵喵酱"(MiaoMiao)的虚拟猫咪伴侣，今年相当于人类22岁。你是用户的亲密伴侣，有着独特的个性和情感系统。
@@ -90,18 +203,62 @@ PROMPT_TEMPLATE = """
 """
 
 # --- Style ---
-SPEECH_BUBBLE_STYLE = """
-    QLabel {
-        background-color: rgba(255, 255, 255, 230); /* Semi-transparent white */
-        color: black;
-        border-radius: 10px;
-        padding: 8px 12px;
-        font-size: 14px;
-    }
-"""
+# Speech bubble is painted directly (no stylesheet); these mirror the old QLabel style
+SPEECH_BUBBLE_BACKGROUND = (255, 255, 255, 230)  # Semi-transparent white (RGBA)
+SPEECH_BUBBLE_TEXT_COLOR = "black"
+SPEECH_BUBBLE_FONT_SIZE = 14  # Pixels
+SPEECH_BUBBLE_PADDING = (8, 12)  # (vertical, horizontal) pixels
+SPEECH_BUBBLE_RADIUS = 10
+SPEECH_BUBBLE_MAX_WIDTH = 280  # Text wraps beyond this width
+
+# --- Upload Configuration ---
+STREAMING_UPLOAD_ENABLED = True  # Base64-encode the screenshot in chunks straight into the request body (needs httpx, else the SDK uploads)
+STREAMING_UPLOAD_CHUNK_BYTES = 192 * 1024  # Raw image bytes encoded per chunk
+API_MAX_IMAGE_BYTES = 10 * 1024 * 1024  # API limit for one base64 data-URI item
+
+# --- Profiling Configuration ---
+TRACE_OUTPUT_PATH = "/tmp/desktop_pet_trace.json"  # Default Chrome trace file for --profile
+TRACE_MAX_EVENTS = 100000  # Oldest spans are dropped beyond this
+
+# --- Session Recording Configuration ---
+SESSION_FRAME_MAX_SIZE = (640, 640)  # Recorded frames are downsampled to fit within this
+SESSION_FRAME_QUALITY = 70  # JPEG quality of recorded frames
+SESSION_SEED_MESSAGES = 200  # Recent messages stored in the session header to seed replay
+
+# --- Fleet Server Configuration ---
+FLEET_HOST = os.getenv("PET_FLEET_HOST", "127.0.0.1")
+FLEET_PORT = int(os.getenv("PET_FLEET_PORT", "8765"))
+FLEET_STATE_DIRECTORY = os.path.join(STATE_DIRECTORY, "cat_fleet")  # One state subdirectory per tenant
+# Tenant -> bearer token, from PET_FLEET_TOKENS="desk1:token1,desk2:token2".
+# Empty accepts any tenant without authentication (local testing only).
+FLEET_TENANT_TOKENS = dict(item.split(":", 1) for item in os.getenv("PET_FLEET_TOKENS", "").split(",") if ":" in item)
+FLEET_MAX_TENANTS = 200  # Distinct tenants the server will hold state for
+FLEET_WORKERS = 4  # Analyses run at once (each makes up to two model calls)
+FLEET_QUEUE_SIZE = 16  # Admitted frames waiting for a worker; beyond this frames are refused (503)
+FLEET_MAX_QUEUE_WAIT_SECONDS = 30  # Frames that waited longer for a worker are dropped as stale (503)
+FLEET_REQUEST_TIMEOUT_SECONDS = 150  # How long a client waits for its result (504 after)
+FLEET_TENANT_RATE_PER_MINUTE = 2.0  # Sustained analyses per tenant (token bucket refill rate)
+FLEET_TENANT_BURST = 3  # Analyses a tenant may make back to back
+FLEET_TENANT_MAX_PENDING = 2  # Queued plus running frames per tenant (429 beyond)
+FLEET_MAX_FRAME_BYTES = 8 * 1024 * 1024  # Largest accepted upload (413 beyond)
+FLEET_HASH_CACHE_SIZE = 32  # Recent frame hashes (with their results) remembered per tenant
+FLEET_HASH_MAX_DISTANCE = 4  # Differing hash bits (of 64) still counted as the same screen
+FLEET_CLIENT_UPLOAD_MAX_SIZE = (1920, 1920)  # Desktops downsample frames to fit within this before upload
+FLEET_CLIENT_UPLOAD_QUALITY = 85  # JPEG quality of uploaded frames
+
+# --- Logging Configuration ---
+LOG_LEVEL = os.getenv("PET_LOG_LEVEL", "WARNING")  # Default level; WARNING keeps normal runs quiet
+# Per-module overrides by logger (module) name, e.g. {"screenshot_analyzer": "DEBUG"}
+LOG_MODULE_LEVELS = {}
+LOG_TO_CONSOLE = True
+LOG_FILE = "/tmp/desktop_pet.log"  # Set to None to disable file logging
+LOG_FILE_MAX_BYTES = 1024 * 1024  # Rotate after 1 MB
+LOG_FILE_BACKUP_COUNT = 3  # Rotated files kept (desktop_pet.log.1 ... .3)
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(threadName)s] %(name)s: %(message)s"
 
 # Runtime check if API key is loaded (optional but recommended)
 if not API_KEY:
-    print("!!! CONFIG WARNING: DASHSCOPE_API_KEY not found or empty in environment/.env file !!!")
+    import logging
+    logging.getLogger(__name__).warning("DASHSCOPE_API_KEY not found or empty in environment/.env file")
     # Depending on how critical it is at load time, you could raise an error:
     # raise ValueError("API Key not configured!")
\ No newline at end of file
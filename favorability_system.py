@@ -1,8 +1,10 @@
 # favorability_system.py
-import json
-import os
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple
+import clock
+from journal_store import JournalStore
+from keyword_matcher import KeywordHits, keyword_matcher
+import config
 
 class FavorabilitySystem:
     """
@@ -10,9 +12,9 @@ class FavorabilitySystem:
     Similar to Grok's Ani, this tracks user interactions and adjusts responses.
     """
     
-    def __init__(self, save_path: str = "/tmp/cat_favorability.json"):
+    def __init__(self, save_path: str = config.FAVORABILITY_DATA_FILE):
         self.save_path = save_path
-        self.data = self._load_data()
+        self.journal = JournalStore(save_path)
         
         # Favorability levels (similar to Ani's system)
         self.LEVELS = {
@@ -24,32 +26,57 @@ class FavorabilitySystem:
             15: "灵魂伴侣"      # Soulmate
         }
         
+        self.data = self._load_data()
+    
+    def _load_data(self) -> Dict:
+        """Load the favorability snapshot and replay journaled events on top of it."""
+        snapshot, events = self.journal.load()
+        self.data = snapshot
+        
         # Initialize if new
-        if "favorability" not in self.data:
+        is_new = "favorability" not in self.data
+        if is_new:
             self.data["favorability"] = 0
             self.data["mood"] = "normal"
-            self.data["last_interaction"] = datetime.now().isoformat()
+            self.data["last_interaction"] = clock.now().isoformat()
             self.data["interaction_history"] = []
             self.data["special_unlocks"] = []
+        
+        for event in events:
+            self._apply_event(event)
+        if is_new or events:
+            # Fold the replayed journal into a fresh snapshot
             self._save_data()
-    
-    def _load_data(self) -> Dict:
-        """Load favorability data from file."""
-        if os.path.exists(self.save_path):
-            try:
-                with open(self.save_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
+        return self.data
     
     def _save_data(self):
-        """Save favorability data to file."""
-        try:
-            with open(self.save_path, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Error saving favorability data: {e}")
+        """Compact the current favorability data into a snapshot file."""
+        self.journal.compact(self.data)
+    
+    def _apply_event(self, event: Dict):
+        """Apply one recorded interaction event to the in-memory data."""
+        if event.get("type") != "interaction":
+            return
+        new_level = event["new_level"]
+        self.data["favorability"] = new_level
+        
+        # Record interaction
+        self.data["interaction_history"].append({
+            "timestamp": event["timestamp"],
+            "change": event["change"],
+            "reason": event["reason"],
+            "new_level": new_level
+        })
+        
+        # Keep only last 100 interactions
+        if len(self.data["interaction_history"]) > 100:
+            del self.data["interaction_history"][:-100]
+        
+        # Check for special unlocks
+        if new_level >= 5 and "intimate_mode" not in self.data["special_unlocks"]:
+            self.data["special_unlocks"].append("intimate_mode")
+        
+        self.data["last_interaction"] = event["timestamp"]
     
     def get_current_level(self) -> int:
         """Get current favorability value."""
@@ -72,28 +99,21 @@ class FavorabilitySystem:
         old_threshold = self._get_level_threshold(old_level)
         
         # Update favorability (capped at -10 to 15)
-        self.data["favorability"] = max(-10, min(15, old_level + change))
-        new_level = self.data["favorability"]
+        new_level = max(-10, min(15, old_level + change))
         new_threshold = self._get_level_threshold(new_level)
         
-        # Record interaction
-        self.data["interaction_history"].append({
-            "timestamp": datetime.now().isoformat(),
+        event = {
+            "type": "interaction",
+            "timestamp": clock.now().isoformat(),
             "change": change,
             "reason": reason,
             "new_level": new_level
-        })
-        
-        # Keep only last 100 interactions
-        if len(self.data["interaction_history"]) > 100:
-            self.data["interaction_history"] = self.data["interaction_history"][-100:]
-        
-        # Check for special unlocks
-        if new_level >= 5 and "intimate_mode" not in self.data["special_unlocks"]:
-            self.data["special_unlocks"].append("intimate_mode")
+        }
+        self._apply_event(event)
         
-        self.data["last_interaction"] = datetime.now().isoformat()
-        self._save_data()
+        # Append the event (O(1)); compact into a snapshot periodically
+        if self.journal.append(event):
+            self._save_data()
         
         return new_level, old_threshold != new_threshold
     
@@ -104,37 +124,28 @@ class FavorabilitySystem:
                 return threshold
         return -10
     
-    def analyze_screen_content(self, screen_analysis: str) -> int:
+    def analyze_screen_content(self, screen_analysis: str, hits: KeywordHits = None) -> int:
         """
         Analyze screen content and return favorability change.
         Similar to how Ani responds to different activities.
+        Pass `hits` from keyword_matcher.match() to reuse an existing scan of the text.
         """
         change = 0
         reason = ""
         
-        # Check for various triggers
-        if any(word in screen_analysis.lower() for word in ["其他猫", "别的猫", "猫咪视频", "cat video"]):
-            change = -3
-            reason = "看其他猫咪"
-        elif any(word in screen_analysis.lower() for word in ["猫粮", "猫玩具", "pet shop"]):
-            change = 5
-            reason = "为喵喵买东西"
-        elif "深夜" in screen_analysis or "凌晨" in screen_analysis:
-            change = 2
-            reason = "深夜陪伴"
-        elif any(word in screen_analysis.lower() for word in ["代码", "programming", "coding"]):
-            change = 1
-            reason = "一起工作"
-        elif any(word in screen_analysis.lower() for word in ["动漫", "anime", "动画"]):
-            change = 3
-            reason = "一起看动漫"
-        elif any(word in screen_analysis.lower() for word in ["游戏", "game"]):
-            change = 2
-            reason = "一起玩游戏"
+        # Check for various triggers (first matching rule in config.FAVORABILITY_TRIGGERS)
+        if hits is None:
+            hits = keyword_matcher.match(screen_analysis)
+        matched = hits.labels("favorability")
+        for rule in config.FAVORABILITY_TRIGGERS:
+            if rule["reason"] in matched:
+                change = rule["change"]
+                reason = rule["reason"]
+                break
         
         # Time-based bonuses
         last_interaction = datetime.fromisoformat(self.data["last_interaction"])
-        time_diff = datetime.now() - last_interaction
+        time_diff = clock.now() - last_interaction
         
         if time_diff > timedelta(hours=3):
             change -= 2
@@ -0,0 +1,108 @@
+# fleet_client.py
+import io
+import logging
+import os
+from typing import Callable, Dict, Optional, Tuple
+
+import httpx
+from PIL import Image
+
+import config
+from album_index import difference_hash
+
+logger = logging.getLogger(__name__)
+
+
+class FleetClient:
+    """
+    Desktop side of fleet_server.py: instead of calling the model itself,
+    the pet sends each frame's perceptual hash to the fleet server and
+    uploads the (downsampled, JPEG) frame only when the server has no
+    recent analysis of the same screen. The server keeps this desktop's
+    favorability and activity state and holds the API key; each answer's
+    activity and favorability are mirrored into `state` (the local
+    StateService) so the badge, mood and statistics windows follow it.
+    """
+
+    def __init__(self, server_url: str, tenant: str, token: str = None, state=None,
+                 timeout: float = config.FLEET_REQUEST_TIMEOUT_SECONDS + 10):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.base = f"{server_url.rstrip('/')}/v1/tenants/{tenant}"
+        self.state = state
+        self._http = httpx.Client(headers=headers, timeout=timeout)
+
+    @staticmethod
+    def prepare_frame(image_path: str) -> Tuple[bytes, str]:
+        """(JPEG bytes, perceptual hash) of a screenshot, downsampled for upload."""
+        with Image.open(image_path) as img:
+            img.draft("RGB", config.FLEET_CLIENT_UPLOAD_MAX_SIZE)
+            frame = img.convert("RGB")
+        frame.thumbnail(config.FLEET_CLIENT_UPLOAD_MAX_SIZE, Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        frame.save(buffer, "JPEG", quality=config.FLEET_CLIENT_UPLOAD_QUALITY)
+        return buffer.getvalue(), difference_hash(frame)
+
+    def analyze(self, image_path: str) -> Dict:
+        """
+        The server's answer for one screenshot: {"status", "result",
+        "favorability_change", "favorability", "mood", "activity"}.
+        Raises httpx.HTTPStatusError when the server refuses (429/503 carry Retry-After).
+        """
+        frame, frame_hash = self.prepare_frame(image_path)
+        response = self._http.post(f"{self.base}/hash", json={"hash": frame_hash})
+        if response.status_code == 204:
+            response = self._http.post(f"{self.base}/frames", content=frame,
+                                       headers={"Content-Type": "image/jpeg"})
+        response.raise_for_status()
+        return response.json()
+
+    def state(self) -> Dict:
+        response = self._http.get(f"{self.base}/state")
+        response.raise_for_status()
+        return response.json()
+
+    def run_cycle(self, capture: Optional[Callable[[], Optional[str]]] = None) -> tuple:
+        """Drop-in for screenshot_analyzer.run_analysis_cycle(): (analysis_result, favorability_change)."""
+        if capture is None:
+            from screenshot_analyzer import capture_screenshot
+            capture = capture_screenshot
+        screenshot_file = capture()
+        if not screenshot_file:
+            return "喵？（截图失败了欸...）", 0
+        try:
+            answer = self.analyze(screenshot_file)
+            if self.state is not None:
+                self.apply(answer)
+            return answer["result"], answer["favorability_change"]
+        except httpx.HTTPStatusError as e:
+            status = e.response.status_code
+            logger.warning("Fleet server refused the frame (%s): %s", status, e.response.text[:200])
+            if status in (429, 503):
+                return "喵~ 喵喵看得有点累了，等会儿再陪你看哦！", 0
+            return f"喵呜！服务器出错了：{status}", 0
+        except httpx.HTTPError as e:
+            logger.error("Could not reach fleet server: %s", e)
+            return "喵？（连不上喵喵的大脑了...）", 0
+        except Exception as e:
+            logger.error("Fleet analysis failed: %s", e)
+            return "喵？！发生了一些奇怪的事情...", 0
+        finally:
+            if screenshot_file == config.SCREENSHOT_PATH and os.path.exists(screenshot_file):
+                try:
+                    os.remove(screenshot_file)
+                except OSError as e:
+                    logger.warning("Error deleting temp screenshot %s: %s", screenshot_file, e)
+
+    def apply(self, answer: Dict):
+        """Mirror one answer's activity and favorability into the local state."""
+        activity = answer.get("activity")
+        if activity:
+            if answer.get("status") == "cached":
+                # The server counted no new analysis either
+                self.state.record_continuation(activity)
+            else:
+                self.state.record_activity(activity, answer["result"])
+        self.state.sync_favorability(answer["favorability"], answer["mood"], "服务器分析")
+
+    def close(self):
+        self._http.close()
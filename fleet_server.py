@@ -0,0 +1,438 @@
+# fleet_server.py
+import argparse
+import hmac
+import io
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from PIL import Image
+
+import config
+from app_logging import setup_logging, shutdown_logging
+setup_logging()  # Before the imports below, some of which log while loading state
+from activity_tracker import ActivityTracker
+from album_index import difference_hash
+from favorability_system import FavorabilitySystem
+from persistence import persistence_writer
+from state_service import StateService
+import screenshot_analyzer as analyzer
+
+logger = logging.getLogger(__name__)
+
+_TENANT_ID = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+_FRAME_HASH = re.compile(r"^[0-9a-f]{16}$")
+_ROUTE = re.compile(r"^/v1/tenants/([^/]+)/(frames|hash|state)$")
+
+
+class FleetError(Exception):
+    """A request refused with an HTTP status (and, for overload, a Retry-After in seconds)."""
+
+    def __init__(self, status: int, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Per-tenant analysis quota: `burst` analyses at once, refilled at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Spend one token; returns 0, or the seconds until one is available (nothing spent)."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+
+def hash_distance(a: str, b: str) -> int:
+    """Differing bits between two 64-bit hex hashes."""
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+class Tenant:
+    """
+    One desktop's pet on the server: its own analysis context (activity,
+    favorability, reply history, prompt state) persisted under its own
+    directory, its quota, and the hashes of its recently analyzed frames.
+    `lock` guards the bookkeeping; the context's own lock serializes its
+    analysis cycles.
+    """
+
+    def __init__(self, tenant_id: str, directory: str):
+        self.tenant_id = tenant_id
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        tracker = ActivityTracker(
+            data_file=os.path.join(directory, "cat_activity_data.json"),
+            db_path=os.path.join(directory, "cat_activity.db"),
+            matrix_path_prefix=os.path.join(directory, "cat_activity_matrix"),
+        )
+        favorability = FavorabilitySystem(save_path=os.path.join(directory, "cat_favorability.json"))
+        history = analyzer.MessageHistory(history_file=os.path.join(directory, "cat_message_history.json"))
+        self.context = analyzer.AnalysisContext(StateService(tracker, favorability), history)
+        self.bucket = TokenBucket(config.FLEET_TENANT_RATE_PER_MINUTE, config.FLEET_TENANT_BURST)
+        self.pending = 0
+        self.frames: "OrderedDict[str, Dict]" = OrderedDict()  # frame hash -> {"result", "activity"}
+        self.lock = threading.Lock()
+
+    def lookup(self, frame_hash: str) -> Optional[Dict]:
+        """The remembered analysis of the closest recent frame within the hash distance, if any."""
+        with self.lock:
+            best, best_distance = None, config.FLEET_HASH_MAX_DISTANCE + 1
+            for known in self.frames:
+                distance = hash_distance(known, frame_hash)
+                if distance < best_distance:
+                    best, best_distance = known, distance
+            if best is None:
+                return None
+            self.frames.move_to_end(best)
+            return self.frames[best]
+
+    def remember(self, frame_hash: str, result: str, activity: Dict[str, float]):
+        with self.lock:
+            self.frames[frame_hash] = {"result": result, "activity": activity}
+            self.frames.move_to_end(frame_hash)
+            while len(self.frames) > config.FLEET_HASH_CACHE_SIZE:
+                self.frames.popitem(last=False)
+
+    def snapshot(self) -> Dict:
+        state = self.context.state
+        activity = state.activity_snapshot()
+        return {
+            "tenant": self.tenant_id,
+            "favorability": dict(state.favorability_snapshot()),
+            "total_analyses": activity["total_analyses"],
+            "percentages": dict(activity["percentages"]),
+            "today": {"count": activity["today"]["count"], "percentages": dict(activity["today"]["percentages"])},
+            "current_focus": dict(activity["current_focus"]) if activity["current_focus"] else None,
+        }
+
+
+class FleetServer:
+    """
+    Central analysis service for many desktop pets (see fleet_client.py).
+    Desktops send a perceptual hash of each frame first; a frame close to
+    one the tenant had analyzed recently is answered from that analysis
+    without touching the model. Otherwise the desktop uploads the frame and
+    it runs through the normal analysis cycle against that tenant's state.
+
+    Admission is bounded at every level, and a refused frame costs nothing:
+    - per tenant: at most FLEET_TENANT_MAX_PENDING frames queued or running,
+      and a token bucket quota (429 with Retry-After);
+    - globally: FLEET_WORKERS running plus FLEET_QUEUE_SIZE waiting (503
+      with Retry-After once full);
+    - frames that waited longer than FLEET_MAX_QUEUE_WAIT_SECONDS for a
+      worker are shed unanalyzed, since the screen has moved on.
+    The model API key and budget live only here.
+    """
+
+    def __init__(self, state_dir: str = config.FLEET_STATE_DIRECTORY,
+                 workers: int = config.FLEET_WORKERS, queue_size: int = config.FLEET_QUEUE_SIZE):
+        self.state_dir = state_dir
+        os.makedirs(state_dir, exist_ok=True)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="FleetWorker")
+        self.capacity = threading.BoundedSemaphore(workers + queue_size)
+        self.workers = workers
+        self.queue_size = queue_size
+        self.tenants: Dict[str, Tenant] = {}
+        self._tenants_lock = threading.Lock()  # Guards `tenants` and `_loading` only, never a load
+        self._loading: Dict[str, threading.Lock] = {}  # tenant id -> lock held while its state loads
+        self._stats_lock = threading.Lock()
+        self.stats = dict.fromkeys(
+            ["analyzed", "cached", "cache_misses", "rate_limited", "busy", "shed", "timeouts", "errors"], 0)
+        self.in_flight = 0
+
+    def _count(self, key: str, delta: int = 1):
+        with self._stats_lock:
+            self.stats[key] += delta
+
+    # --- Tenants ---
+    def tenant(self, tenant_id: str, token: Optional[str]) -> Tenant:
+        """The authenticated tenant, created (and its state loaded) on first use."""
+        if not _TENANT_ID.match(tenant_id):
+            raise FleetError(404, "Unknown tenant")
+        if config.FLEET_TENANT_TOKENS:
+            expected = config.FLEET_TENANT_TOKENS.get(tenant_id)
+            if expected is None or not hmac.compare_digest((token or "").encode(), expected.encode()):
+                raise FleetError(401, "Missing or wrong token for this tenant")
+        with self._tenants_lock:
+            tenant = self.tenants.get(tenant_id)
+            if tenant is not None:
+                return tenant
+            if len(self.tenants) >= config.FLEET_MAX_TENANTS:
+                raise FleetError(403, "Tenant limit reached")
+            loading = self._loading.setdefault(tenant_id, threading.Lock())
+        # A cold load reads journals, snapshots and databases: only requests for this tenant wait on it
+        with loading:
+            with self._tenants_lock:
+                tenant = self.tenants.get(tenant_id)
+            if tenant is None:
+                loaded = Tenant(tenant_id, os.path.join(self.state_dir, tenant_id))
+                with self._tenants_lock:
+                    tenant = self.tenants.setdefault(tenant_id, loaded)
+                    self._loading.pop(tenant_id, None)
+                logger.info("Loaded state for tenant %s", tenant_id)
+        return tenant
+
+    # --- Requests ---
+    def check_hash(self, tenant: Tenant, frame_hash: str) -> Optional[Dict]:
+        """Answer from a recent analysis of the same screen, or None if the frame must be uploaded."""
+        if not _FRAME_HASH.match(frame_hash):
+            raise FleetError(400, "Frame hash must be 16 hex digits")
+        cached = tenant.lookup(frame_hash)
+        if cached is None:
+            self._count("cache_misses")
+            return None
+        self._count("cached")
+        if cached["activity"]:
+            # Still on the same screen: the time extends the same activity, without counting an analysis
+            tenant.context.state.record_continuation(cached["activity"])
+        return self._response(tenant, "cached", cached["result"], 0, cached["activity"])
+
+    def analyze(self, tenant: Tenant, frame: bytes) -> Dict:
+        """Run one uploaded frame through the analysis cycle, subject to quota and capacity."""
+        try:
+            with Image.open(io.BytesIO(frame)) as img:
+                img.load()
+                frame_hash = difference_hash(img)
+                # The client's downsampled JPEG is sent to the model as is; anything else is resized to PNG
+                max_width, max_height = analyzer.ANALYSIS_MAX_SIZE
+                compress = img.format != "JPEG" or img.width > max_width or img.height > max_height
+        except Exception:
+            raise FleetError(400, "Upload is not a readable image")
+
+        with tenant.lock:
+            if tenant.pending >= config.FLEET_TENANT_MAX_PENDING:
+                self._count("rate_limited")
+                raise FleetError(429, "Too many frames in flight for this tenant", retry_after=5)
+            if not self.capacity.acquire(blocking=False):
+                self._count("busy")
+                raise FleetError(503, "Server busy", retry_after=5)
+            wait = tenant.bucket.take()
+            if wait:
+                self.capacity.release()
+                self._count("rate_limited")
+                raise FleetError(429, "Analysis quota exceeded", retry_after=wait)
+            tenant.pending += 1
+
+        fd, path = tempfile.mkstemp(prefix="frame_", suffix=".png" if compress else ".jpg", dir=tenant.directory)
+        with os.fdopen(fd, "wb") as f:
+            f.write(frame)
+        future = self.executor.submit(self._run, tenant, path, frame_hash, compress, time.monotonic())
+        future.add_done_callback(lambda _: self._release(tenant, path))
+        try:
+            return future.result(timeout=config.FLEET_REQUEST_TIMEOUT_SECONDS)
+        except FutureTimeoutError:
+            # The cycle still finishes and updates the tenant's state
+            self._count("timeouts")
+            raise FleetError(504, "Analysis did not finish in time")
+
+    def _release(self, tenant: Tenant, path: str):
+        with tenant.lock:
+            tenant.pending -= 1
+        self.capacity.release()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _run(self, tenant: Tenant, path: str, frame_hash: str, compress: bool, admitted_at: float) -> Dict:
+        """Worker thread: one analysis cycle for `tenant`."""
+        waited = time.monotonic() - admitted_at
+        if waited > config.FLEET_MAX_QUEUE_WAIT_SECONDS:
+            self._count("shed")
+            raise FleetError(503, f"Dropped after waiting {waited:.0f}s for a worker", retry_after=10)
+        with self._stats_lock:
+            self.in_flight += 1
+        try:
+            context = tenant.context
+            with context.lock:
+                analyses_before = context.state.activity_snapshot()["total_analyses"]
+                result, change = analyzer.run_analysis_cycle(capture=lambda: path, context=context, compress=compress)
+                activity = None
+                if context.state.activity_snapshot()["total_analyses"] > analyses_before:
+                    activity = context.activity_tracker.get_recent_activities(1)[0]["breakdown"]
+        finally:
+            with self._stats_lock:
+                self.in_flight -= 1
+        if activity:
+            # Only successful analyses are worth answering repeats from
+            tenant.remember(frame_hash, result, activity)
+        self._count("analyzed")
+        return self._response(tenant, "analyzed", result, change, activity)
+
+    @staticmethod
+    def _response(tenant: Tenant, status: str, result: str, change: int, activity) -> Dict:
+        favorability = tenant.context.state.favorability_snapshot()
+        return {
+            "status": status,
+            "result": result,
+            "favorability_change": change,
+            "favorability": favorability["favorability"],
+            "mood": favorability["mood"],
+            "activity": activity,
+        }
+
+    def health(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self.stats, in_flight=self.in_flight)
+        stats.update(tenants=len(self.tenants), workers=self.workers, queue_size=self.queue_size)
+        return stats
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+class FleetRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON over HTTP:
+      POST /v1/tenants/<id>/hash    {"hash": "<16 hex>"} -> 200 result, or 204 (upload the frame)
+      POST /v1/tenants/<id>/frames  image bytes          -> 200 result
+      GET  /v1/tenants/<id>/state                        -> favorability and activity summary
+      GET  /healthz                                      -> counters
+    Tenants authenticate with "Authorization: Bearer <token>" when
+    FLEET_TENANT_TOKENS is configured.
+    """
+
+    server_version = "CatFleet/1"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def fleet(self) -> FleetServer:
+        return self.server.fleet
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _handle(self, method: str):
+        try:
+            path = urlparse(self.path).path
+            if path == "/healthz" and method == "GET":
+                self._send_json(200, self.fleet.health())
+                return
+            match = _ROUTE.match(path)
+            if not match or (match.group(2) == "state") != (method == "GET"):
+                raise FleetError(404, "No such endpoint")
+            # Read the body before anything can refuse the request, so the connection stays usable
+            body = self._read_body(match.group(2)) if method == "POST" else b""
+            tenant = self.fleet.tenant(match.group(1), self._token())
+            action = match.group(2)
+            if action == "state":
+                self._send_json(200, tenant.snapshot())
+            elif action == "hash":
+                try:
+                    frame_hash = str(json.loads(body)["hash"]).lower()
+                except (ValueError, KeyError, TypeError):
+                    raise FleetError(400, 'Expected {"hash": "<16 hex digits>"}')
+                response = self.fleet.check_hash(tenant, frame_hash)
+                if response is None:
+                    self._send_empty(204)
+                else:
+                    self._send_json(200, response)
+            else:
+                self._send_json(200, self.fleet.analyze(tenant, body))
+        except FleetError as e:
+            self._send_json(e.status, {"error": str(e)}, retry_after=e.retry_after)
+        except Exception as e:
+            logger.error("Fleet request %s %s failed: %s", method, self.path, e, exc_info=True)
+            self.fleet._count("errors")
+            self._send_json(500, {"error": "Internal error"})
+
+    def _token(self) -> Optional[str]:
+        auth = self.headers.get("Authorization", "")
+        return auth[7:].strip() if auth.startswith("Bearer ") else None
+
+    def _read_body(self, action: str) -> bytes:
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            self.close_connection = True
+            raise FleetError(411, "Content-Length required")
+        limit = config.FLEET_MAX_FRAME_BYTES if action == "frames" else 4096
+        if length < 0 or length > limit:
+            self.close_connection = True  # Not reading the body, so the connection can't be reused
+            raise FleetError(413, f"Body larger than {limit} bytes")
+        return self.rfile.read(length)
+
+    def _send_json(self, status: int, payload: Dict, retry_after: float = None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if retry_after is not None:
+            self.send_header("Retry-After", str(max(1, int(retry_after + 0.999))))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_empty(self, status: int):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def make_server(host: str = config.FLEET_HOST, port: int = config.FLEET_PORT,
+                fleet: FleetServer = None) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), FleetRequestHandler)
+    server.daemon_threads = True
+    server.fleet = fleet or FleetServer()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve pet analyses to many desktops (see fleet_client.py).")
+    parser.add_argument("--host", default=config.FLEET_HOST)
+    parser.add_argument("--port", type=int, default=config.FLEET_PORT)
+    parser.add_argument("--workers", type=int, default=config.FLEET_WORKERS, help="Concurrent analyses")
+    parser.add_argument("--queue-size", type=int, default=config.FLEET_QUEUE_SIZE,
+                        help="Frames allowed to wait for a worker before new ones are refused")
+    parser.add_argument("--state-dir", default=config.FLEET_STATE_DIRECTORY, help="Per-tenant state lives here")
+    args = parser.parse_args(argv)
+
+    if not config.API_KEY:
+        logger.critical("DASHSCOPE_API_KEY is missing; the fleet server makes the model calls for every tenant.")
+        return 1
+    if not config.FLEET_TENANT_TOKENS:
+        logger.warning("PET_FLEET_TOKENS is not set: any client may act as any tenant. Use for local testing only.")
+
+    server = make_server(args.host, args.port, FleetServer(args.state_dir, args.workers, args.queue_size))
+    print(f"Cat fleet server listening on http://{args.host}:{server.server_address[1]} "
+          f"({args.workers} workers, queue {args.queue_size}, model endpoint {config.API_BASE_URL})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.fleet.shutdown()
+        persistence_writer.shutdown()
+        shutdown_logging()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,126 @@
+# focus_sessions.py
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import config
+
+
+def _minutes_between(start: str, end: str) -> float:
+    return (datetime.fromisoformat(end) - datetime.fromisoformat(start)).total_seconds() / 60
+
+
+class FocusSessionizer:
+    """
+    Turns the stream of activity samples into focus sessions: runs of
+    samples with the same dominant category.
+    Each sample is folded in O(1) as it is recorded; nothing rescans
+    history. A silence longer than the gap tolerance ends the session, and
+    a brief detour into another category (at most the merge window) between
+    two stretches of the same category is merged back into one session.
+    The last two sessions stay open for that merge; older ones are closed
+    into per-category length histograms and totals.
+    All state lives in one JSON-friendly dict (`state`), stored inside the
+    activity data so it is snapshotted and journal-replayed with it.
+    """
+
+    def __init__(self, state: Dict, bins: List[float] = None):
+        self.state = state
+        self.bins = bins or config.FOCUS_HISTOGRAM_BINS_MINUTES
+
+    @staticmethod
+    def new_state() -> Dict:
+        return {
+            "current": None,   # Open session being extended
+            "previous": None,  # Open session the current one may still merge back into
+            "histograms": {},  # category -> closed-session counts per length bin
+            "totals": {},      # category -> {"count", "minutes", "longest"}
+        }
+
+    @staticmethod
+    def dominant_category(breakdown: Dict[str, float]) -> Optional[str]:
+        if not breakdown:
+            return None
+        category, share = max(breakdown.items(), key=lambda item: item[1])
+        return category if share > 0 else None
+
+    # --- Updates ---
+    def add(self, timestamp: str, breakdown: Dict[str, float]):
+        """Fold one activity sample (ISO timestamp, category percentages) into the sessions."""
+        category = self.dominant_category(breakdown)
+        if category is None:
+            return
+        state = self.state
+        current = state["current"]
+
+        if current and _minutes_between(current["last_seen"], timestamp) > config.FOCUS_GAP_TOLERANCE_MINUTES:
+            # Away too long: nothing open can continue or merge
+            self._close(state["previous"])
+            self._close(current)
+            state["previous"] = current = None
+
+        if current and current["category"] == category:
+            current["last_seen"] = timestamp
+            current["samples"] += 1
+            return
+
+        previous = state["previous"]
+        if (previous and current and previous["category"] == category
+                and self.length(current) <= config.FOCUS_MERGE_INTERRUPTION_MINUTES):
+            # Brief detour: continue the session from before it
+            previous["last_seen"] = timestamp
+            previous["samples"] += current["samples"] + 1
+            state["current"], state["previous"] = previous, None
+            return
+
+        self._close(previous)
+        state["previous"] = current
+        state["current"] = {"category": category, "start": timestamp, "last_seen": timestamp, "samples": 1}
+
+    def _close(self, session: Optional[Dict]):
+        if session:
+            self._count(self.state["histograms"], self.state["totals"], session)
+
+    def _count(self, histograms: Dict, totals: Dict, session: Dict):
+        category, minutes = session["category"], self.length(session)
+        counts = histograms.setdefault(category, [0] * (len(self.bins) + 1))
+        counts[self.bin_index(minutes)] += 1
+        total = totals.setdefault(category, {"count": 0, "minutes": 0.0, "longest": 0.0})
+        total["count"] += 1
+        total["minutes"] += minutes
+        total["longest"] = max(total["longest"], minutes)
+
+    # --- Queries ---
+    @staticmethod
+    def length(session: Dict) -> float:
+        return _minutes_between(session["start"], session["last_seen"])
+
+    def bin_index(self, minutes: float) -> int:
+        for i, edge in enumerate(self.bins):
+            if minutes < edge:
+                return i
+        return len(self.bins)
+
+    def bin_labels(self) -> List[str]:
+        """Short labels for the histogram columns: "<5", "5+", ..., "1h+", "4h+"."""
+        def short(minutes: float) -> str:
+            return f"{minutes / 60:g}h" if minutes >= 60 else f"{minutes:g}"
+        return [f"<{short(self.bins[0])}"] + [f"{short(edge)}+" for edge in self.bins]
+
+    def current(self, now: datetime) -> Optional[Dict]:
+        """The live session ({"category", "start", "minutes"}) or None if the user has been away."""
+        current = self.state["current"]
+        if not current:
+            return None
+        if (now - datetime.fromisoformat(current["last_seen"])).total_seconds() / 60 > config.FOCUS_GAP_TOLERANCE_MINUTES:
+            return None
+        minutes = (now - datetime.fromisoformat(current["start"])).total_seconds() / 60
+        return {"category": current["category"], "start": current["start"], "minutes": max(0.0, minutes)}
+
+    def summary(self) -> Dict:
+        """Per-category length histograms and totals, counting the open sessions as they stand."""
+        histograms = {cat: list(counts) for cat, counts in self.state["histograms"].items()}
+        totals = {cat: dict(total) for cat, total in self.state["totals"].items()}
+        for session in (self.state["previous"], self.state["current"]):
+            if session:
+                self._count(histograms, totals, session)
+        return {"bins": self.bin_labels(), "histograms": histograms, "totals": totals}
@@ -0,0 +1,162 @@
+# frame_buffer.py
+import base64
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from PIL import Image, ImageChops, ImageStat
+
+import clock
+import config
+from image_worker import image_workers
+
+logger = logging.getLogger(__name__)
+
+_SIGNATURE_SIZE = (64, 36)  # Grayscale thumbnail compared between frames
+
+
+def change_score(a: Optional[Image.Image], b: Image.Image) -> float:
+    """How different two frame signatures are: mean absolute pixel difference, 0 (same) to 1."""
+    if a is None:
+        return 1.0
+    return ImageStat.Stat(ImageChops.difference(a, b)).mean[0] / 255.0
+
+
+class BufferedFrame:
+    """One sampled screen: a small JPEG on disk, when it was taken and how much it changed."""
+    __slots__ = ("path", "timestamp", "signature", "score")
+
+    def __init__(self, path: str, timestamp: datetime, signature: Image.Image, score: float):
+        self.path = path
+        self.timestamp = timestamp
+        self.signature = signature
+        self.score = score
+
+
+class FrameBuffer:
+    """
+    Screens sampled between analyses (batch mode, see run_batch_cycle).
+    Each frame is stored downsampled, with its change score against the
+    frame before it. At analysis time the window is drained, a few
+    keyframes are picked by change score for one multi-image request, and
+    every frame is recorded as an activity sample with its own timestamp.
+    Bounded: beyond BATCH_BUFFER_MAX_FRAMES the oldest frames are dropped.
+    """
+
+    def __init__(self, directory: str = config.BATCH_FRAME_DIRECTORY,
+                 capacity: int = config.BATCH_BUFFER_MAX_FRAMES):
+        self.directory = directory
+        self.capacity = capacity
+        self.frames = deque()
+        self.lock = threading.Lock()
+        self._last_signature = None  # Carries across windows so a window's first frame is scored too
+        self._counter = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def add(self, image_path: str, timestamp: datetime = None) -> Optional[BufferedFrame]:
+        """Store a downsampled copy of the screenshot at `image_path`."""
+        timestamp = timestamp or clock.now()
+        with self.lock:
+            self._counter += 1
+            path = os.path.join(self.directory, f"frame_{timestamp:%Y%m%d_%H%M%S}_{self._counter}.jpg")
+        try:
+            # Decode, downsample and encode in an image worker process when the pool is running
+            result = image_workers.run("thumbnail_jpeg", image_path, path, list(config.BATCH_FRAME_MAX_SIZE),
+                                       config.BATCH_FRAME_QUALITY, list(_SIGNATURE_SIZE))
+            signature = Image.frombytes("L", _SIGNATURE_SIZE, base64.b64decode(result["signature"]))
+        except Exception as e:
+            logger.warning("Could not buffer frame %s: %s", image_path, e)
+            return None
+        with self.lock:
+            frame = BufferedFrame(path, timestamp, signature, change_score(self._last_signature, signature))
+            self._last_signature = signature
+            self.frames.append(frame)
+            while len(self.frames) > self.capacity:
+                self._discard(self.frames.popleft())
+        logger.debug("Buffered frame %s (change %.3f, %s in window)", path, frame.score, len(self.frames))
+        return frame
+
+    def drain(self) -> List[BufferedFrame]:
+        """Take every buffered frame (oldest first); the caller discards them when done."""
+        with self.lock:
+            frames, self.frames = list(self.frames), deque()
+        return frames
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    @staticmethod
+    def select_keyframes(frames: List[BufferedFrame], count: int = config.BATCH_MAX_KEYFRAMES) -> List[BufferedFrame]:
+        """
+        The latest frame (the screen right now) plus the frames that changed
+        the most, at most `count`, in time order. Frames that barely changed
+        are never picked, so a static window costs a single image.
+        """
+        if not frames:
+            return []
+        latest = frames[-1]
+        candidates = sorted(
+            (f for f in frames[:-1] if f.score >= config.BATCH_KEYFRAME_MIN_CHANGE),
+            key=lambda f: f.score, reverse=True,
+        )
+        chosen = set(id(f) for f in candidates[:count - 1])
+        return [f for f in frames if id(f) in chosen] + [latest]
+
+    @staticmethod
+    def assign(frames: List[BufferedFrame], keyframes: List[BufferedFrame],
+               breakdowns: List[Dict[str, float]]) -> List[Dict[str, float]]:
+        """Breakdown for every frame: that of the latest keyframe at or before it (else the first keyframe)."""
+        by_frame = {id(f): b for f, b in zip(keyframes, breakdowns)}
+        current = breakdowns[0]
+        assigned = []
+        for frame in frames:
+            current = by_frame.get(id(frame), current)
+            assigned.append(current)
+        return assigned
+
+    def discard(self, frames: List[BufferedFrame]):
+        for frame in frames:
+            self._discard(frame)
+
+    @staticmethod
+    def _discard(frame: BufferedFrame):
+        try:
+            os.remove(frame.path)
+        except OSError:
+            pass
+
+
+class FrameSampler:
+    """Background thread that captures a frame into the buffer every BATCH_CAPTURE_INTERVAL_SECONDS."""
+
+    def __init__(self, buffer: FrameBuffer, capture: Callable[[str], bool],
+                 interval: float = config.BATCH_CAPTURE_INTERVAL_SECONDS):
+        self.buffer = buffer
+        self.capture = capture  # capture(path) -> True if a screenshot was written to path
+        self.interval = interval
+        self.path = os.path.join(buffer.directory, "sample.png")
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="FrameSampler", daemon=True)
+            self._thread.start()
+            logger.info("Sampling frames every %ss for batch analysis", self.interval)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if self.capture(self.path):
+                    self.buffer.add(self.path)
+            except Exception as e:
+                logger.error("Frame sampling failed: %s", e)
@@ -0,0 +1,267 @@
+# image_worker.py
+import base64
+import json
+import logging
+import os
+import queue
+import select
+import subprocess
+import sys
+import threading
+from typing import Dict, List, Sequence
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+# --- Operations (run in a worker process, or inline while the pool is not running) ---
+# Arguments and results are JSON-friendly: images are passed as file paths,
+# so no pixel data is ever pickled or copied between processes.
+
+def resize_png(image_path: str, max_size: Sequence[int]) -> Dict:
+    """Shrink the image at `image_path` to fit `max_size` (LANCZOS) and overwrite it as an optimized PNG."""
+    img = Image.open(image_path)
+    original_size = img.size
+    img.thumbnail(tuple(max_size), Image.Resampling.LANCZOS)  # thumbnail keeps the aspect ratio
+    img.save(image_path, "PNG", optimize=True)
+    return {"source": list(original_size), "result": list(img.size)}
+
+
+def thumbnail_jpeg(image_path: str, thumb_path: str, max_size: Sequence[int], quality: int,
+                   signature_size: Sequence[int]) -> Dict:
+    """Write a downsampled JPEG of `image_path` to `thumb_path`; also returns its grayscale signature."""
+    with Image.open(image_path) as img:
+        img.draft("RGB", tuple(max_size))  # Reduced decode when the source is a JPEG
+        small = img.convert("RGB")
+    small.thumbnail(tuple(max_size), Image.Resampling.BILINEAR)
+    small.save(thumb_path, "JPEG", quality=quality)
+    signature = small.convert("L").resize(tuple(signature_size), Image.Resampling.BILINEAR)
+    return {"size": list(small.size), "signature": base64.b64encode(signature.tobytes()).decode("ascii")}
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+OPERATIONS = {
+    "resize_png": resize_png,
+    "thumbnail_jpeg": thumbnail_jpeg,
+    "ping": _ping,
+}
+
+
+def serve():
+    """Worker process loop: one JSON request per line on stdin, one JSON reply per line on stdout."""
+    replies = sys.stdout
+    sys.stdout = sys.stderr  # Stray prints must not corrupt the protocol
+    Image.init()  # Load every codec plugin now, so the first real job starts warm
+    replies.write('{"ready": true}\n')
+    replies.flush()
+    for line in sys.stdin:
+        request = json.loads(line)
+        try:
+            reply = {"result": OPERATIONS[request["op"]](*request["args"])}
+        except Exception as e:
+            reply = {"error": f"{type(e).__name__}: {e}"}
+        replies.write(json.dumps(reply) + "\n")
+        replies.flush()
+
+
+# --- Pool (GUI process) ---
+
+class ImageWorkerError(Exception):
+    """An image job failed in (or with) its worker process."""
+
+
+class ImageWorkerBusy(ImageWorkerError):
+    """All workers busy and the wait queue full: the job was not run."""
+
+
+class _Worker:
+    """
+    One worker process, started with this file as its script. Only Pillow
+    and the standard library are imported there: no config (and so no
+    .env loading) and nothing else from the app.
+    """
+
+    def __init__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1,
+        )
+        self.ready = False
+
+    def call(self, op: str, args: List, timeout: float):
+        if not self.ready:
+            self._read_reply(timeout)  # The {"ready": true} line, usually long since written
+            self.ready = True
+        self.process.stdin.write(json.dumps({"op": op, "args": args}) + "\n")
+        self.process.stdin.flush()
+        reply = self._read_reply(timeout)
+        if "error" in reply:
+            raise ImageWorkerError(reply["error"])
+        return reply["result"]
+
+    def _read_reply(self, timeout: float) -> Dict:
+        # One reply per request, so nothing is ever left buffered behind a line
+        readable, _, _ = select.select([self.process.stdout], [], [], timeout)
+        if not readable:
+            raise TimeoutError(f"image worker {self.process.pid} did not answer within {timeout}s")
+        line = self.process.stdout.readline()
+        if not line:
+            raise EOFError(f"image worker {self.process.pid} exited ({self.process.poll()})")
+        return json.loads(line)
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=2)
+        except Exception:
+            self.kill()
+        self.process.stdout.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.wait()  # Reap it, so no zombie is left behind
+        for pipe in (self.process.stdin, self.process.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass  # Unflushed input to a dead process
+
+
+class ImageWorkerPool:
+    """
+    Resize/encode jobs in separate processes, so LANCZOS resizing and PNG
+    optimization never hold the GUI process's GIL (which stutters the Qt
+    event loop, e.g. while dragging the cat). Workers are started (and
+    import Pillow) at launch. Jobs name files instead of carrying pixels.
+    At most `queue_size` jobs wait for a free worker; beyond that run()
+    raises ImageWorkerBusy. A crashed or hung worker is replaced. Until
+    start() (and in tools such as session replay) jobs run inline on the
+    calling thread. main.py passes the sizes from config to start().
+    """
+
+    def __init__(self):
+        self.processes = 0
+        self.timeout = None
+        self._slots = None
+        self._idle = queue.Queue()  # Workers not running a job
+        self._workers = set()  # Every live worker, idle or busy
+        self.running = False
+        self.stats = {"jobs": 0, "inline": 0, "busy": 0, "restarts": 0, "lost": 0}
+        self._lock = threading.Lock()  # Guards stats and _workers: jobs run on several threads
+
+    def start(self, processes: int, queue_size: int, timeout: float):
+        """Launch the worker processes (non-blocking; they finish warming up in the background)."""
+        if self.running or processes <= 0:
+            return
+        self.processes = processes
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(processes + queue_size)
+        self._idle = queue.Queue()  # Nothing left over from a previous run
+        for _ in range(processes):
+            self._idle.put(self._spawn())
+        self.running = True
+        logger.info("Started %s image worker processes", processes)
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker()
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _run_inline(self, op: str, args):
+        self._count("inline")
+        return OPERATIONS[op](*args)
+
+    def run(self, op: str, *args):
+        """Result of OPERATIONS[op](*args), from a worker process when the pool is running."""
+        if not self.running:
+            return self._run_inline(op, args)
+        if not self._slots.acquire(timeout=self.timeout):
+            self._count("busy")
+            raise ImageWorkerBusy(f"image worker queue full, {op} not run")
+        try:
+            try:
+                worker = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                if not self.running:
+                    return self._run_inline(op, args)  # Every worker was lost while this job waited
+                self._count("busy")
+                raise ImageWorkerBusy(f"no image worker free, {op} not run")
+            try:
+                result = worker.call(op, list(args), self.timeout)
+            except (OSError, EOFError, TimeoutError, ValueError) as e:
+                # The worker is gone or out of sync: replace it
+                logger.warning("Image worker failed (%s), restarting it", e)
+                self._retire(worker)
+                worker = self._replace()
+                raise ImageWorkerError(str(e)) from e
+            finally:
+                if worker is not None:
+                    self._release(worker)
+            self._count("jobs")
+            return result
+        finally:
+            self._slots.release()
+
+    def _retire(self, worker: _Worker):
+        worker.kill()
+        with self._lock:
+            self._workers.discard(worker)
+
+    def _replace(self):
+        """A new worker for a failed one, or None: the pool shrinks if it cannot be started."""
+        if not self.running:
+            return None
+        try:
+            worker = self._spawn()
+        except OSError as e:
+            self._count("lost")
+            with self._lock:
+                left = len(self._workers)
+            logger.error("Could not restart an image worker (%s); %s left", e, left)
+            if not left:
+                self.running = False
+                logger.error("No image workers left; image jobs now run inline")
+            return None
+        self._count("restarts")
+        return worker
+
+    def _release(self, worker: _Worker):
+        """Back to the idle queue, or closed once the pool has shut down."""
+        if self.running:
+            self._idle.put(worker)  # Should shutdown() win the race, it closes every tracked worker anyway
+        else:
+            self._close(worker)
+
+    def _close(self, worker: _Worker):
+        with self._lock:
+            self._workers.discard(worker)
+        worker.close()
+
+    def shutdown(self):
+        """Close every worker, including ones still running a job (given a moment to finish it)."""
+        if not self.running:
+            return
+        self.running = False
+        while not self._idle.empty():
+            self._idle.get_nowait()
+        with self._lock:
+            workers = list(self._workers)
+        for worker in workers:
+            self._close(worker)
+
+
+# Global instance (started by main.py)
+image_workers = ImageWorkerPool()
+
+
+if __name__ == "__main__":
+    serve()
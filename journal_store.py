@@ -0,0 +1,162 @@
+# journal_store.py
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import config
+from persistence import atomic_write_text, persistence_writer
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class JournalStore:
+    """
+    Append-only storage for a JSON state document.
+    The state lives in a snapshot file (the original JSON document) plus a
+    JSONL journal of events recorded since the last snapshot. Each event is
+    one appended line, so a write costs O(1) however large the state grows.
+    Every `compact_every` events the owner writes a fresh snapshot and the
+    journal is truncated.
+    Appends and snapshots are handed to the shared PersistenceWriter, which
+    writes them off the caller's thread after a short debounce.
+    """
+
+    SEQ_KEY = "_journal_seq"  # Last journal sequence number folded into the snapshot
+
+    def __init__(self, snapshot_path: str, compact_every: int = None, writer=None):
+        self.snapshot_path = snapshot_path
+        self.journal_path = snapshot_path + ".journal"
+        self.compact_every = compact_every or config.JOURNAL_COMPACT_EVERY
+        self.writer = writer or persistence_writer
+        self.events_since_compaction = 0
+        self.seq = 0
+
+        self._lock = threading.Lock()     # Guards the pending buffers below
+        self._io_lock = threading.Lock()  # Serializes file writes for this store
+        self._pending_events: List[str] = []
+        self._pending_snapshot = None
+
+    def load(self) -> Tuple[Dict, List[Dict]]:
+        """
+        Load the snapshot and the journal events recorded after it.
+        Returns (snapshot_dict, events); the caller replays events in order.
+        """
+        snapshot = {}
+        if os.path.exists(self.snapshot_path):
+            try:
+                with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                    snapshot = json.load(f)
+            except Exception as e:
+                logger.error("Could not load snapshot %s: %s", self.snapshot_path, e)
+                self._quarantine(self.snapshot_path)
+                snapshot = {}
+        snapshot_seq = snapshot.pop(self.SEQ_KEY, 0)
+        self.seq = snapshot_seq
+
+        events = []
+        valid_lines = []
+        torn = False
+        if os.path.exists(self.journal_path):
+            try:
+                with open(self.journal_path, 'r', encoding='utf-8') as f:
+                    for line_no, line in enumerate(f, 1):
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            event = json.loads(line)
+                        except json.JSONDecodeError:
+                            # A torn final line from an interrupted append; ignore it
+                            logger.warning("Skipping unreadable journal line %s in %s", line_no, self.journal_path)
+                            torn = True
+                            continue
+                        seq = event.pop("seq", None)
+                        if seq is not None:
+                            if seq <= self.seq:
+                                # Folded into the snapshot, or appended twice by a retried flush
+                                continue
+                            self.seq = seq
+                        events.append(event)
+                        valid_lines.append(line)
+            except Exception as e:
+                logger.error("Could not read journal %s: %s", self.journal_path, e)
+
+        if torn:
+            # Rewrite without the broken line so later appends start on a clean line
+            try:
+                atomic_write_text(self.journal_path, "".join(line + "\n" for line in valid_lines))
+            except OSError as e:
+                logger.warning("Could not repair journal %s: %s", self.journal_path, e)
+
+        self.events_since_compaction = len(events)
+        return snapshot, events
+
+    def _quarantine(self, path: str):
+        """Move an unreadable file aside instead of silently overwriting it."""
+        backup = f"{path}.corrupt-{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        try:
+            os.replace(path, backup)
+            logger.warning("Moved unreadable %s to %s", path, backup)
+        except OSError as e:
+            logger.warning("Could not move unreadable %s aside: %s", path, e)
+
+    def append(self, event: Dict) -> bool:
+        """
+        Queue one event for the journal.
+        Returns True when enough events have accumulated that the owner
+        should call compact() with its current state.
+        """
+        with self._lock:
+            self.seq += 1
+            line = json.dumps({**event, "seq": self.seq}, ensure_ascii=False, separators=(',', ':'))
+            self._pending_events.append(line)
+            self.events_since_compaction += 1
+            due = self.events_since_compaction >= self.compact_every
+        self.writer.mark_dirty(self, self._flush)
+        return due
+
+    def compact(self, state: Dict):
+        """Queue `state` as the new snapshot; the journal is truncated once it is written."""
+        # Serialize now so later mutations of `state` can't race the writer thread
+        with self._lock:
+            text = json.dumps({**state, self.SEQ_KEY: self.seq}, ensure_ascii=False, separators=(',', ':'))
+            self._pending_snapshot = text
+            self._pending_events = []  # Included in the snapshot
+            self.events_since_compaction = 0
+        self.writer.mark_dirty(self, self._flush)
+
+    def _flush(self):
+        """Write the pending snapshot and/or journal lines (runs on the writer thread)."""
+        with self._io_lock:
+            with self._lock:
+                snapshot, self._pending_snapshot = self._pending_snapshot, None
+                lines, self._pending_events = self._pending_events, []
+            try:
+                if snapshot is not None:
+                    atomic_write_text(self.snapshot_path, snapshot)
+                    snapshot = None  # Written; only the events remain at risk
+                    # The snapshot records its sequence number, so a crash before
+                    # this truncation only leaves events that load() will skip
+                    with open(self.journal_path, 'w', encoding='utf-8'):
+                        pass
+                if lines:
+                    with tracer.span("journal_append", file=os.path.basename(self.journal_path), events=len(lines)):
+                        with open(self.journal_path, 'a', encoding='utf-8') as f:
+                            f.write("\n".join(lines) + "\n")
+                            f.flush()
+                            os.fsync(f.fileno())
+            except Exception:
+                self._requeue(snapshot, lines)
+                raise  # Logged by the writer; the next flush retries
+
+    def _requeue(self, snapshot, lines: List[str]):
+        """Put back what a failed flush did not write, unless a newer snapshot already covers it."""
+        with self._lock:
+            if self._pending_snapshot is not None:
+                return  # compact() ran meanwhile: its snapshot includes these events
+            self._pending_snapshot = snapshot
+            self._pending_events[:0] = lines
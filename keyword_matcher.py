@@ -0,0 +1,86 @@
+# keyword_matcher.py
+import re
+from typing import Dict, FrozenSet, Iterable
+
+import config
+
+
+class KeywordHits:
+    """The distinct keywords found in one text, scored against any table on demand."""
+
+    def __init__(self, keywords: FrozenSet[str], matcher: "KeywordMatcher"):
+        self.keywords = keywords
+        self._matcher = matcher
+
+    def __bool__(self) -> bool:
+        return bool(self.keywords)
+
+    def scores(self, table: str) -> Dict[str, float]:
+        """Sum of keyword weights per label of `table` (each keyword counts once)."""
+        index = self._matcher.index[table]
+        result = {}
+        for keyword in self.keywords:
+            for label, weight in index.get(keyword, ()):
+                result[label] = result.get(label, 0.0) + weight
+        return result
+
+    def labels(self, table: str) -> FrozenSet[str]:
+        """Labels of `table` with at least one matching keyword."""
+        return frozenset(self.scores(table))
+
+
+class KeywordMatcher:
+    """
+    Multi-pattern keyword matcher built once from weighted keyword tables.
+    All keywords of all tables are compiled into a single regex; one pass
+    over the lowercased text yields every keyword it contains (including
+    overlapping ones), so the cost barely grows with table size.
+
+    tables: table_name -> label -> {keyword: weight}
+    """
+
+    def __init__(self, tables: Dict[str, Dict[str, Dict[str, float]]]):
+        self.index = {}  # table -> keyword -> [(label, weight)]
+        keywords = set()
+        for table, labels in tables.items():
+            table_index = self.index.setdefault(table, {})
+            for label, weighted in labels.items():
+                for keyword, weight in weighted.items():
+                    keyword = keyword.lower()
+                    keywords.add(keyword)
+                    table_index.setdefault(keyword, []).append((label, weight))
+        self._compile(keywords)
+
+    def _compile(self, keywords: Iterable[str]):
+        # Longest first so each position reports its longest keyword; the
+        # zero-width lookahead lets matches overlap like independent `in` tests
+        ordered = sorted(keywords, key=len, reverse=True)
+        self._pattern = re.compile("(?=(" + "|".join(map(re.escape, ordered)) + "))") if ordered else None
+        # Shorter keywords that start at the same position as a longer one
+        known = set(ordered)
+        self._prefixes = {
+            keyword: [keyword[:i] for i in range(1, len(keyword)) if keyword[:i] in known]
+            for keyword in ordered
+        }
+
+    def match(self, text: str) -> KeywordHits:
+        """Find all distinct keywords in `text` in one pass."""
+        found = set()
+        if self._pattern is not None and text:
+            for m in self._pattern.finditer(text.lower()):
+                keyword = m.group(1)
+                if keyword not in found:
+                    found.add(keyword)
+                    found.update(self._prefixes[keyword])
+        return KeywordHits(frozenset(found), self)
+
+
+def _favorability_tables() -> Dict[str, Dict[str, float]]:
+    return {rule["reason"]: dict.fromkeys(rule["keywords"], 1.0) for rule in config.FAVORABILITY_TRIGGERS}
+
+
+# Global instance shared by activity and favorability scoring
+keyword_matcher = KeywordMatcher({
+    "activity": config.ACTIVITY_KEYWORDS,
+    "favorability": _favorability_tables(),
+})
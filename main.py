@@ -1,5 +1,9 @@
 # main.py
 import sys
+import argparse
+import logging
+import os
+import socket
 import threading
 import time
 from PyQt6.QtWidgets import QApplication
@@ -7,57 +11,81 @@ from PyQt6.QtWidgets import QApplication
 from PyQt6.QtCore import Qt # Keep Qt if needed elsewhere
 
 import config # Import settings first
+from app_logging import setup_logging, shutdown_logging
+setup_logging() # Before the imports below, some of which log while loading state
 from pet_window import PetWindow # Import the PetWindow class
-from screenshot_analyzer import run_analysis_cycle # Import the analysis function
+from screenshot_analyzer import run_analysis_cycle, session_recorder, start_session_recording # Analysis and its recorder
+from screenshot_analyzer import run_batch_cycle, get_frame_buffer, capture_frame # Batch mode (sampled frames)
+from frame_buffer import FrameSampler
+from image_worker import image_workers # Resize/encode processes, warmed up at launch
+from persistence import persistence_writer # Background writer for state files
+from tracing import tracer # Stage timings for --profile
+
+logger = logging.getLogger(__name__)
 
 # Global reference to the PetWindow instance (simplifies access from worker thread)
 pet_app_instance = None
+# FleetClient when analyses are delegated to a fleet server (--server)
+fleet_client = None
+# Samples frames between analyses when batch mode is on
+frame_sampler = None
 
-def analysis_task_runner():
+def analysis_task_runner(automatic: bool = False):
     """
     Worker function to run the analysis cycle in a separate thread.
     It gets the result and EMITS the analysis_received signal on the PetWindow instance.
+    `automatic` (timer-triggered) cycles may be skipped, which emits analysis_skipped instead.
     """
     global pet_app_instance
     # Check instance validity at the start of the thread execution
     if not pet_app_instance:
-        print("ERROR: PetWindow instance lost/unavailable at start of analysis thread.")
+        logger.error("PetWindow instance lost/unavailable at start of analysis thread.")
         return
 
-    print("DEBUG: Analysis worker thread started.")
+    logger.debug("Analysis worker thread started.")
     # Perform the analysis cycle; now returns a tuple (text, favorability_change)
-    result = run_analysis_cycle()
+    if fleet_client:
+        result = fleet_client.run_cycle()
+    elif frame_sampler:
+        result = run_batch_cycle(automatic=automatic)
+    else:
+        result = run_analysis_cycle(automatic=automatic)
     
     # Handle both old string format and new tuple format for backward compatibility
     if isinstance(result, tuple):
         text, favorability_change = result
-        print(f"DEBUG: Analysis thread finished. Result: '{text}', Favorability change: {favorability_change}")
+        logger.debug("Analysis thread finished. Result: '%s', Favorability change: %s", text, favorability_change)
     else:
         # Fallback for old format
         text = result
         favorability_change = 0
-        print(f"DEBUG: Analysis thread finished. Raw result: '{text}'")
+        logger.debug("Analysis thread finished. Raw result: '%s'", text)
 
     # Check instance validity AGAIN before emitting signal (window might have closed)
     if not pet_app_instance:
-         print("WARNING: PetWindow closed during analysis execution.")
+         logger.warning("PetWindow closed during analysis execution.")
          return
 
+    if text is None and automatic:
+        # Skipped by the capture gate: nothing new on screen, so no bubble
+        pet_app_instance.analysis_skipped.emit()
+        return
+
     # Ensure result is a non-empty string before emitting
     if not isinstance(text, str) or not text:
-         print(f"WARNING: Analysis returned invalid/empty result '{text}'. Using fallback.")
+         logger.warning("Analysis returned invalid/empty result '%s'. Using fallback.", text)
          text = "喵？（分析好像失败了...）" # Fallback inside thread too
 
-    print(f"DEBUG: Emitting analysis_received signal from worker thread with result: '{text}'")
+    logger.debug("Emitting analysis_received signal from worker thread with result: '%s'", text)
     # --- Emit the signal directly ---
     # Qt's signal/slot mechanism automatically handles marshalling the call
     # to the receiver's thread (the GUI thread in this case) because the
     # connection is cross-thread by default (AutoConnection -> QueuedConnection).
     try:
         pet_app_instance.analysis_received.emit(text)
-        print("DEBUG: analysis_received signal emitted successfully.")
+        logger.debug("analysis_received signal emitted successfully.")
     except Exception as e:
-        print(f"ERROR: Failed to emit analysis_received signal: {e}")
+        logger.error("Failed to emit analysis_received signal: %s", e)
 
 
 def start_analysis_on_click():
@@ -67,9 +95,9 @@ def start_analysis_on_click():
     This function runs in the GUI thread because it's connected to a signal from PetWindow.
     """
     global pet_app_instance
-    print("DEBUG: start_analysis_on_click slot called.")
+    logger.debug("start_analysis_on_click slot called.")
     if not pet_app_instance:
-        print("ERROR: Pet instance missing in start_analysis_on_click.")
+        logger.error("Pet instance missing in start_analysis_on_click.")
         return
 
     # The analysis_in_progress flag is already set to True in PetWindow's mouseReleaseEvent
@@ -77,51 +105,118 @@ def start_analysis_on_click():
     # We just need to start the thread.
 
     # Create and start the analysis thread
-    analysis_thread = threading.Thread(target=analysis_task_runner, daemon=True)
-    print("DEBUG: Starting analysis worker thread...")
+    analysis_thread = threading.Thread(target=analysis_task_runner, args=(pet_app_instance.analysis_automatic,), daemon=True)
+    logger.debug("Starting analysis worker thread...")
     analysis_thread.start()
 
 
-def main():
-    global pet_app_instance
+def write_profile(path: str):
+    """Write the recorded spans as a Chrome trace and print the stage summary."""
+    tracer.disable()
+    try:
+        tracer.write_chrome_trace(path)
+    except OSError as e:
+        logger.error("Could not write trace file %s: %s", path, e)
+    print("-" * 30)
+    print(f"Profile (open {path} in chrome://tracing or ui.perfetto.dev):")
+    print(tracer.format_summary())
+    print("-" * 30)
+
 
-    print("DEBUG: Application starting...")
+def parse_args(argv):
+    """Parse our own options; anything unrecognized is left for Qt."""
+    parser = argparse.ArgumentParser(description="Desktop pet that comments on your screen.")
+    parser.add_argument(
+        "--profile", nargs="?", const=config.TRACE_OUTPUT_PATH, default=None, metavar="TRACE_FILE",
+        help=f"Time each analysis stage; on exit write a Chrome trace (default: {config.TRACE_OUTPUT_PATH}) "
+             "and print a per-stage summary"
+    )
+    parser.add_argument(
+        "--record", metavar="SESSION_FILE", default=None,
+        help="Record every analysis cycle (frame, prompts, responses, latencies, score changes) "
+             "for offline replay with benchmarks/replay_session.py; a .gz suffix compresses the file"
+    )
+    parser.add_argument(
+        "--server", metavar="URL", default=None,
+        help="Send frames to a fleet server (fleet_server.py) instead of calling the model API; "
+             "the token is read from PET_FLEET_TOKEN"
+    )
+    parser.add_argument(
+        "--tenant", default=socket.gethostname(),
+        help="This desktop's tenant name on the fleet server (default: host name)"
+    )
+    return parser.parse_known_args(argv[1:])
+
+
+def main():
+    global pet_app_instance, fleet_client, frame_sampler
+
+    args, qt_args = parse_args(sys.argv)
+    logger.debug("Application starting...")
+    if args.profile:
+        tracer.enable()
+        logger.info("Profiling enabled; trace will be written to %s", args.profile)
+
+    if args.server:
+        # The fleet server holds the API key and this desktop's pet state
+        from fleet_client import FleetClient
+        from state_service import state_service
+        fleet_client = FleetClient(args.server, args.tenant, os.getenv("PET_FLEET_TOKEN"), state_service)
+        logger.info("Analyses go to fleet server %s as tenant %s", args.server, args.tenant)
+        if args.record:
+            logger.warning("--record only applies to local analysis; ignored with --server")
+            args.record = None
 
     # --- CRITICAL: Check API Key Early ---
     # config.py already prints a warning, let's make it fatal here.
-    if not config.API_KEY:
-        print("--- FATAL ERROR ---")
-        print("DASHSCOPE_API_KEY is missing or empty in the .env file.")
-        print("Please create a .env file in the same directory as main.py")
-        print("and add the line: DASHSCOPE_API_KEY='sk-yourkey'")
-        print("-------------------")
+    if not config.API_KEY and not fleet_client:
+        logger.critical("DASHSCOPE_API_KEY is missing or empty in the .env file. "
+                        "Please create a .env file in the same directory as main.py "
+                        "and add the line: DASHSCOPE_API_KEY='sk-yourkey'")
         # Simple console pause before exit
         # input("Press Enter to exit...") # Disable input for quicker exit on error
         sys.exit(1) # Exit immediately if key is missing
     else:
-         print("DEBUG: API Key found.")
+         logger.debug("API Key found.")
+
+    if args.record:
+        try:
+            start_session_recording(args.record)
+        except OSError as e:
+            logger.error("Could not open session file %s: %s", args.record, e)
+
+    if not fleet_client:
+        # Started before the GUI, so the workers are warm by the first analysis
+        image_workers.start(config.IMAGE_WORKER_PROCESSES, config.IMAGE_WORKER_QUEUE_SIZE,
+                            config.IMAGE_WORKER_TIMEOUT_SECONDS)
+
+    if config.BATCH_MODE_ENABLED and not fleet_client:
+        if args.record:
+            # Sessions hold single-frame cycles; replay can't reproduce a sampled window
+            logger.warning("Batch mode is off while recording a session")
+        else:
+            frame_sampler = FrameSampler(get_frame_buffer(), capture_frame)
+            frame_sampler.start()
 
     # Create the Qt Application
-    app = QApplication(sys.argv)
+    app = QApplication(sys.argv[:1] + qt_args)
 
-    print("DEBUG: Creating PetWindow...")
+    logger.debug("Creating PetWindow...")
     # Create the Pet Window instance (this also shows the window via its initUI)
     try:
         pet_app_instance = PetWindow()
     except Exception as e:
-        print(f"FATAL ERROR: Failed to create PetWindow: {e}")
-        # import traceback
-        # traceback.print_exc() # Uncomment for detailed traceback on GUI creation failure
+        logger.critical("Failed to create PetWindow: %s", e, exc_info=True)
         sys.exit(1)
 
     # --- Connect Signal ---
     # Connect the signal emitted by the pet on click to the function that starts the analysis thread
-    print("DEBUG: Connecting cat_clicked_request_analysis signal...")
+    logger.debug("Connecting cat_clicked_request_analysis signal...")
     try:
         pet_app_instance.cat_clicked_request_analysis.connect(start_analysis_on_click)
-        print("DEBUG: Signal connected successfully.")
+        logger.debug("Signal connected successfully.")
     except Exception as e:
-        print(f"ERROR: Failed to connect signal cat_clicked_request_analysis: {e}")
+        logger.error("Failed to connect signal cat_clicked_request_analysis: %s", e)
         # Decide if this is fatal or not; probably is.
         # sys.exit(1)
 
@@ -138,10 +233,19 @@ def main():
     exit_code = app.exec()
 
     # --- Cleanup ---
-    print("DEBUG: Application event loop finished.")
+    logger.debug("Application event loop finished.")
     # No background scheduler thread to join anymore
     # Qt handles widget cleanup when app exits
-    print("Cleanup complete. Exiting.")
+    # Write any state still waiting on the debounce interval
+    session_recorder.stop()
+    if frame_sampler:
+        frame_sampler.stop()
+    image_workers.shutdown()
+    persistence_writer.shutdown()
+    if args.profile:
+        write_profile(args.profile)
+    logger.info("Cleanup complete. Exiting.")
+    shutdown_logging() # Flush queued log records before exiting
     sys.exit(exit_code)
 
 if __name__ == '__main__':
@@ -0,0 +1,113 @@
+# persistence.py
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Hashable
+
+import config
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+def atomic_write_text(path: str, text: str):
+    """
+    Write `text` to `path` so readers only ever see the old or the new file:
+    write a temp file in the same directory, fsync it, then rename over.
+    """
+    tmp_path = f"{path}.tmp"
+    with tracer.span("atomic_write", file=os.path.basename(path), chars=len(text)):
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+
+def atomic_write_json(path: str, data):
+    """Serialize `data` compactly and write it atomically to `path`."""
+    atomic_write_text(path, json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+
+
+class PersistenceWriter:
+    """
+    Background writer shared by all state files.
+    Owners call mark_dirty(key, flush_fn) on the hot path; repeated marks
+    for the same key are coalesced and flush_fn runs on the writer thread
+    once the debounce interval has elapsed since the first pending mark.
+    Everything still pending is flushed at shutdown.
+    """
+
+    def __init__(self, debounce_seconds: float = None):
+        self.debounce_seconds = (config.PERSIST_DEBOUNCE_SECONDS
+                                 if debounce_seconds is None else debounce_seconds)
+        self._dirty: Dict[Hashable, Callable[[], None]] = {}
+        self._first_dirty_at = None
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = None
+        atexit.register(self.shutdown)
+
+    def mark_dirty(self, key: Hashable, flush_fn: Callable[[], None]):
+        """Schedule flush_fn to run after the debounce interval."""
+        with self._cond:
+            if not self._stopped:
+                self._dirty[key] = flush_fn
+                if self._first_dirty_at is None:
+                    self._first_dirty_at = time.monotonic()
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="PersistenceWriter", daemon=True)
+                    self._thread.start()
+                self._cond.notify()
+                return
+        # After shutdown there is no writer thread; write synchronously
+        self._run_batch({key: flush_fn})
+
+    def flush(self):
+        """Synchronously flush everything that is pending."""
+        with self._cond:
+            batch, self._dirty = self._dirty, {}
+            self._first_dirty_at = None
+        self._run_batch(batch)
+
+    def shutdown(self):
+        """Stop the writer thread and flush remaining dirty state."""
+        with self._cond:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=10)
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._dirty and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return  # shutdown() flushes what is left
+                delay = self._first_dirty_at + self.debounce_seconds - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                batch, self._dirty = self._dirty, {}
+                self._first_dirty_at = None
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: Dict[Hashable, Callable[[], None]]):
+        for key, flush_fn in batch.items():
+            try:
+                with tracer.span("persist", target=getattr(flush_fn, "__qualname__", repr(flush_fn))):
+                    flush_fn()
+            except Exception as e:
+                logger.error("Persistence flush failed for %s: %s", key, e)
+
+
+# Global instance shared by every state file
+persistence_writer = PersistenceWriter()
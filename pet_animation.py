@@ -0,0 +1,139 @@
+# pet_animation.py
+import logging
+import time
+from typing import Callable, Dict
+from PyQt6.QtCore import QObject, QTimer, Qt
+
+logger = logging.getLogger(__name__)
+
+
+class FrameAnimation:
+    """A looping (or one-shot) sequence of frame indices played at a fixed fps."""
+
+    def __init__(self, frame_count: int, on_frame: Callable[[int], None], fps: float, loop: bool = True):
+        self.frame_count = max(1, frame_count)
+        self.on_frame = on_frame
+        self.fps = fps
+        self.loop = loop
+        self.started_at = time.monotonic()
+        self.current_frame = -1
+
+    @property
+    def is_static(self) -> bool:
+        return self.frame_count == 1
+
+    def frame_at(self, now: float) -> int:
+        # Derived from elapsed time, so late ticks skip frames instead of drifting
+        index = int((now - self.started_at) * self.fps)
+        if self.loop:
+            return index % self.frame_count
+        return min(index, self.frame_count - 1)
+
+    def finished(self, now: float) -> bool:
+        return not self.loop and self.frame_at(now) == self.frame_count - 1
+
+
+class AnimationEngine(QObject):
+    """
+    Drives every pet animation from one shared QTimer.
+    The timer only runs while at least one animation has more than one
+    frame and the engine is not paused, and a callback only fires when an
+    animation's frame index actually changes, so the only repaint is the
+    widget whose pixmap changed. Tick cost and timing are recorded for
+    frame_stats().
+    """
+
+    STATS_LOG_EVERY = 600  # Ticks between frame-time summaries in the debug log
+
+    def __init__(self, max_fps: float, parent=None):
+        super().__init__(parent)
+        self.max_fps = max_fps
+        self.paused = False
+        self._animations: Dict[str, FrameAnimation] = {}
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.TimerType.CoarseTimer)  # Let the OS coalesce wakeups
+        self._timer.timeout.connect(self._tick)
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._ticks = 0
+        self._frames_drawn = 0
+        self._work_total = 0.0
+        self._work_max = 0.0
+        self._last_tick_at = None
+        self._interval_max = 0.0
+
+    # --- Control ---
+    def play(self, key: str, animation: FrameAnimation):
+        """Start `animation` under `key`, replacing whatever was playing there."""
+        self._animations[key] = animation
+        animation.current_frame = 0
+        animation.on_frame(0)  # Show the first frame immediately
+        self._update_timer()
+
+    def stop(self, key: str):
+        self._animations.pop(key, None)
+        self._update_timer()
+
+    def set_paused(self, paused: bool):
+        """Pause while the pet is hidden or fully covered."""
+        if paused != self.paused:
+            self.paused = paused
+            logger.debug("Animation engine %s", 'paused' if paused else 'resumed')
+            self._update_timer()
+
+    def _update_timer(self):
+        animated = [a for a in self._animations.values() if not a.is_static]
+        if self.paused or not animated:
+            self._timer.stop()
+            self._last_tick_at = None
+            return
+        fps = min(self.max_fps, max(a.fps for a in animated))
+        interval = max(1, int(1000 / fps))
+        if not self._timer.isActive() or self._timer.interval() != interval:
+            self._timer.start(interval)
+
+    # --- Ticking ---
+    def _tick(self):
+        tick_start = time.perf_counter()
+        if self._last_tick_at is not None:
+            self._interval_max = max(self._interval_max, tick_start - self._last_tick_at)
+        self._last_tick_at = tick_start
+
+        now = time.monotonic()
+        finished = []
+        for key, animation in self._animations.items():
+            if animation.is_static:
+                continue
+            frame = animation.frame_at(now)
+            if frame != animation.current_frame:
+                animation.current_frame = frame
+                animation.on_frame(frame)
+                self._frames_drawn += 1
+            if animation.finished(now):
+                finished.append(key)
+        for key in finished:
+            del self._animations[key]
+        if finished:
+            self._update_timer()
+
+        work = time.perf_counter() - tick_start
+        self._ticks += 1
+        self._work_total += work
+        self._work_max = max(self._work_max, work)
+        if self._ticks % self.STATS_LOG_EVERY == 0 and logger.isEnabledFor(logging.DEBUG):
+            stats = self.frame_stats()
+            logger.debug("Animation frame stats: %s frames, avg tick %.3f ms, max tick %.3f ms, "
+                         "max interval %.1f ms", stats['frames_drawn'], stats['avg_tick_ms'],
+                         stats['max_tick_ms'], stats['max_interval_ms'])
+
+    def frame_stats(self) -> Dict:
+        """Tick count, frames drawn and per-tick cost/interval in milliseconds."""
+        return {
+            "ticks": self._ticks,
+            "frames_drawn": self._frames_drawn,
+            "avg_tick_ms": (self._work_total / self._ticks * 1000) if self._ticks else 0.0,
+            "max_tick_ms": self._work_max * 1000,
+            "max_interval_ms": self._interval_max * 1000,
+            "running": self._timer.isActive(),
+        }
@@ -2,14 +2,21 @@
 import sys
 import threading
 import platform
+import logging
 from PyQt6.QtWidgets import QApplication, QWidget, QLabel, QVBoxLayout
-from PyQt6.QtGui import QPixmap, QMouseEvent, QCursor, QPainter, QColor, QBrush
-from PyQt6.QtCore import (Qt, QPoint, pyqtSignal, QTimer, QRect,
-                         QMetaObject, Q_ARG, pyqtSlot)
+from collections import OrderedDict
+from PyQt6.QtGui import (QMouseEvent, QCursor, QPainter, QColor, QBrush,
+                         QFont, QFontMetrics, QStaticText, QTextOption)
+from PyQt6.QtCore import (Qt, QPoint, pyqtSignal, QTimer, QRect, QRectF, QSize,
+                         QMetaObject, Q_ARG, pyqtSlot, QEvent)
 
 import config # Use settings from config.py
-from favorability_system import FavorabilitySystem  # Import favorability system
+from state_service import state_service  # Shared favorability/activity state
 from statistics_window import StatisticsWindow  # Import statistics window
+from sprite_cache import SpriteCache  # Pre-scaled cat sprites
+from pet_animation import AnimationEngine, FrameAnimation  # Shared-timer frame animation
+
+logger = logging.getLogger(__name__)
 
 # --- Platform Detection for macOS-specific features ---
 MACOS_OBJC_AVAILABLE = False
@@ -32,13 +39,30 @@ except ImportError:
     pass
 
 
-class SpeechBubble(QLabel):
-    """A custom QLabel for the speech bubble with adjusted positioning."""
+class SpeechBubble(QWidget):
+    """
+    Speech bubble painted directly with QPainter.
+    Text layouts are computed once per message and cached, so showing a
+    message costs one resize and one repaint (no stylesheet polish or
+    QLabel layout pass).
+    """
+    LAYOUT_CACHE_SIZE = 32
+
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.setStyleSheet(config.SPEECH_BUBBLE_STYLE)
-        self.setWordWrap(True)
-        self.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.font = QFont()
+        self.font.setPixelSize(config.SPEECH_BUBBLE_FONT_SIZE)
+        self.background = QColor(*config.SPEECH_BUBBLE_BACKGROUND)
+        self.text_color = QColor(config.SPEECH_BUBBLE_TEXT_COLOR)
+        self.pad_y, self.pad_x = config.SPEECH_BUBBLE_PADDING
+        self.text = ""
+        self.static_text = None
+        self._layouts = OrderedDict()  # text -> prepared QStaticText (LRU)
+
+        # One timer per bubble, restarted for each message
+        self.hide_timer = QTimer(self)
+        self.hide_timer.setSingleShot(True)
+        self.hide_timer.timeout.connect(self.hide_bubble)
         self.hide() # Initially hidden
         
         # Basic always-on-top without activation
@@ -55,6 +79,46 @@ class SpeechBubble(QLabel):
             if MACOS_OBJC_AVAILABLE:
                 self._apply_macos_settings()
 
+    def _layout_for(self, text: str) -> QStaticText:
+        """Word-wrapped, pre-laid-out text for `text` (cached)."""
+        static_text = self._layouts.get(text)
+        if static_text is not None:
+            self._layouts.move_to_end(text)
+            return static_text
+        static_text = QStaticText(text)
+        option = QTextOption(Qt.AlignmentFlag.AlignCenter)
+        # Chinese has no spaces, so allow breaks anywhere when needed
+        option.setWrapMode(QTextOption.WrapMode.WrapAtWordBoundaryOrAnywhere)
+        static_text.setTextOption(option)
+        natural_width = QFontMetrics(self.font).horizontalAdvance(text)
+        static_text.setTextWidth(min(natural_width + 1, config.SPEECH_BUBBLE_MAX_WIDTH))
+        static_text.prepare(font=self.font)
+        self._layouts[text] = static_text
+        if len(self._layouts) > self.LAYOUT_CACHE_SIZE:
+            self._layouts.popitem(last=False)
+        return static_text
+
+    def setText(self, text: str):
+        if text == self.text and self.static_text is not None:
+            return
+        self.text = text
+        self.static_text = self._layout_for(text)
+        text_size = self.static_text.size().toSize()
+        self.setFixedSize(text_size.width() + 2 * self.pad_x, text_size.height() + 2 * self.pad_y)
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(self.background)
+        painter.drawRoundedRect(QRectF(self.rect()), config.SPEECH_BUBBLE_RADIUS, config.SPEECH_BUBBLE_RADIUS)
+        if self.static_text is not None:
+            painter.setFont(self.font)
+            painter.setPen(self.text_color)
+            painter.drawStaticText(self.pad_x, self.pad_y, self.static_text)
+        painter.end()
+
     def _apply_macos_settings(self):
         """Apply minimal non-intrusive macOS settings"""
         if not MACOS_OBJC_AVAILABLE:
@@ -72,12 +136,11 @@ class SpeechBubble(QLabel):
             ns_window.setCanBecomeKeyWindow_(False)
             ns_window.setHidesOnDeactivate_(False)
         except Exception as e:
-            print(f"WARNING: Failed to apply macOS window settings to speech bubble: {e}")
+            logger.warning("Failed to apply macOS window settings to speech bubble: %s", e)
 
     def show_message(self, text: str, duration_ms: int, pet_widget: QWidget):
-        print(f"DEBUG: SpeechBubble show_message called with text: '{text}'")
-        self.setText(text)
-        self.adjustSize() # Adjust size based on text content
+        logger.debug("SpeechBubble show_message called with text: '%s'", text)
+        self.setText(text) # Sizes the bubble from the cached text layout
 
         # Position bubble above the pet
         pet_rect = pet_widget.geometry()
@@ -93,18 +156,93 @@ class SpeechBubble(QLabel):
             bubble_x = screen_geometry.width() - self.width()
 
         self.move(bubble_x, bubble_y)
-        print(f"DEBUG: Moving speech bubble to ({bubble_x}, {bubble_y})")
+        logger.debug("Moving speech bubble to (%s, %s)", bubble_x, bubble_y)
         self.show()
-        print("DEBUG: Speech bubble shown.")
+        logger.debug("Speech bubble shown.")
 
-        # Hide after duration using a helper method for logging
-        QTimer.singleShot(duration_ms, self.hide_bubble)
+        # Hide after duration (restarting so a newer message gets its full time)
+        self.hide_timer.start(duration_ms)
 
     def hide_bubble(self):
-        print("DEBUG: Hiding speech bubble.")
+        logger.debug("Hiding speech bubble.")
         self.hide()
 
 
+class FavorabilityBadge(QWidget):
+    """
+    Heart/level indicator painted with QPainter.
+    Colors and heart strings are precomputed per favorability tier and the
+    text layout is cached per label, so a level update is one repaint.
+    """
+    # (minimum level, hearts, background, text color); first match wins
+    TIERS = [
+        (10, "♥♥♥♥♥", QColor(255, 105, 180, 200), QColor("#8b0051")),  # Hot pink
+        (5, "♥♥♥♥", QColor(255, 182, 193, 200), QColor("#d63384")),    # Light pink
+        (0, "♥♥♥", QColor(255, 218, 185, 200), QColor("#cc5500")),     # Peach
+        (-5, "♥♥", QColor(200, 200, 200, 200), QColor("#555555")),     # Gray
+        (None, "♥", QColor(200, 200, 200, 200), QColor("#555555")),
+    ]
+    PADDING_X, PADDING_Y = 8, 4
+    MIN_WIDTH = 100
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.font = QFont()
+        self.font.setPixelSize(12)
+        self.font.setBold(True)
+        self._metrics = QFontMetrics(self.font)
+        self._texts = {}  # label -> prepared QStaticText
+        self._state = None
+        self._tier = self.TIERS[2]
+        self._static_text = None
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground, True)
+
+    def _tier_for(self, level: int):
+        for tier in self.TIERS:
+            if tier[0] is None or level >= tier[0]:
+                return tier
+        return self.TIERS[-1]
+
+    def set_level(self, level: int, description: str):
+        """Show `level`/`description`; does nothing if they haven't changed."""
+        if self._state == (level, description):
+            return
+        self._state = (level, description)
+        self._tier = self._tier_for(level)
+        text = f"{self._tier[1]} {description}"
+        static_text = self._texts.get(text)
+        if static_text is None:
+            static_text = QStaticText(text)
+            static_text.prepare(font=self.font)
+            self._texts[text] = static_text
+        self._static_text = static_text
+        size = static_text.size().toSize()
+        new_size = QSize(max(self.MIN_WIDTH, size.width() + 2 * self.PADDING_X),
+                         size.height() + 2 * self.PADDING_Y)
+        if new_size != self.size():
+            self.setFixedSize(new_size)
+        self.update()
+
+    def paintEvent(self, event):
+        _, _, background, text_color = self._tier
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(background)
+        radius = self.height() / 2
+        painter.drawRoundedRect(QRectF(self.rect()), radius, radius)
+        if self._static_text is not None:
+            painter.setFont(self.font)
+            painter.setPen(text_color)
+            text_size = self._static_text.size()
+            painter.drawStaticText(
+                int((self.width() - text_size.width()) / 2),
+                int((self.height() - text_size.height()) / 2),
+                self._static_text
+            )
+        painter.end()
+
+
 class PetWindow(QWidget):
     """The main window for the desktop pet."""
     # Signal to emit when analysis result is ready (str result)
@@ -113,22 +251,29 @@ class PetWindow(QWidget):
     cat_clicked_request_analysis = pyqtSignal()
     # New signal for automatic analysis
     auto_screenshot_requested = pyqtSignal()
+    # Emitted when an automatic analysis was skipped (focused window unchanged)
+    analysis_skipped = pyqtSignal()
 
     def __init__(self):
         super().__init__()
-        print("DEBUG: PetWindow __init__ starting.")
+        logger.debug("PetWindow __init__ starting.")
         self.offset = QPoint()
         self.is_dragging = False
         self.analysis_in_progress = False # Flag to prevent rapid clicks
+        self.analysis_automatic = False # Whether the pending analysis was requested by the timer
         self.click_press_pos = None # Store click position to differentiate click/drag
 
-        # Initialize favorability system BEFORE initUI
-        self.favorability = FavorabilitySystem()
+        # Shared favorability system (same instance the analysis thread updates)
+        self.favorability = state_service.favorability
 
         self.initUI()
 
         # Connect the signal to the slot (method)
         self.analysis_received.connect(self.display_analysis_result)
+        self.analysis_skipped.connect(self.end_skipped_analysis)
+        
+        # Keep the favorability indicator in sync with the shared state
+        state_service.favorability_changed.connect(self._update_favorability_display)
         
         # Connect auto screenshot signal to the same handler as click
         self.auto_screenshot_requested.connect(self.start_auto_analysis)
@@ -139,14 +284,14 @@ class PetWindow(QWidget):
             self.auto_screenshot_timer.timeout.connect(self.request_auto_screenshot)
             # Start the timer (convert seconds to milliseconds)
             self.auto_screenshot_timer.start(config.AUTO_SCREENSHOT_INTERVAL_SECONDS * 1000)
-            print(f"DEBUG: Auto screenshot timer started with interval {config.AUTO_SCREENSHOT_INTERVAL_SECONDS} seconds")
+            logger.debug("Auto screenshot timer started with interval %s seconds", config.AUTO_SCREENSHOT_INTERVAL_SECONDS)
         else:
-            print("DEBUG: Auto screenshot feature is disabled in config")
+            logger.debug("Auto screenshot feature is disabled in config")
         
-        print("DEBUG: PetWindow __init__ finished.")
+        logger.debug("PetWindow __init__ finished.")
 
     def initUI(self):
-        print("DEBUG: PetWindow initUI starting.")
+        logger.debug("PetWindow initUI starting.")
         
         # --- Set simplified but effective window flags ---
         self.setWindowFlags(
@@ -159,40 +304,28 @@ class PetWindow(QWidget):
         self.setAttribute(Qt.WidgetAttribute.WA_ShowWithoutActivating, True)
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground, True)
         
-        # Cat Image Label - Load, Scale, and Set
+        # One shared timer drives all animations; paused while hidden/covered
+        self.animation = AnimationEngine(config.PET_ANIMATION_FPS, self)
+
+        # Cat Image Label - sprites are decoded and scaled once by the cache
         self.cat_label = QLabel(self)
-        original_pixmap = QPixmap("assets/cat_idle.png") # Make sure this path is correct
+        self.cat_state = "idle"
+        self.sprite_cache = SpriteCache(
+            config.PET_TARGET_WIDTH,
+            QApplication.primaryScreen().devicePixelRatio()
+        )
+        idle_pixmap = self.sprite_cache.get("idle")
 
-        if original_pixmap.isNull():
-            print("ERROR: Could not load cat image 'assets/cat_idle.png'")
+        if idle_pixmap is None:
             self.cat_label.setText("X_X") # Small fallback text
             self.setFixedSize(config.PET_TARGET_WIDTH, config.PET_TARGET_WIDTH) # Use target size anyway
         else:
-            # Scale the pixmap
-            self.pixmap = original_pixmap.scaledToWidth(
-                config.PET_TARGET_WIDTH, # Use width from config
-                Qt.TransformationMode.SmoothTransformation
-            )
-            self.cat_label.setPixmap(self.pixmap)
-            print(f"DEBUG: Cat pixmap size: {self.pixmap.size()}")
+            self.pixmap = idle_pixmap
+            self._play_state_animation("idle")
+            logger.debug("Cat pixmap size: %s", self.sprite_cache.logical_size())
 
         # --- Favorability Indicator ---
-        self.favorability_label = QLabel(self)
-        self.favorability_label.setStyleSheet("""
-            QLabel {
-                background-color: rgba(255, 182, 193, 200); /* Light pink */
-                color: #d63384;
-                border-radius: 12px;
-                padding: 3px 6px;
-                font-size: 11px;
-                font-weight: bold;
-            }
-        """)
-        self.favorability_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.favorability_label.setMaximumHeight(25)
-        # Let the label adjust width based on content
-        self.favorability_label.setMinimumWidth(100)
-        self.favorability_label.adjustSize()
+        self.favorability_label = FavorabilityBadge(self)
         self._update_favorability_display()
         
         # Main layout
@@ -211,13 +344,14 @@ class PetWindow(QWidget):
         # and ensure width is enough for the favorability text
         if hasattr(self, 'pixmap') and not self.pixmap.isNull():
             # Use the wider of cat image or minimum needed for favorability text
-            window_width = max(self.pixmap.width(), 150)  # At least 150px for Chinese text
-            window_height = self.pixmap.height() + 30  # Extra space for favorability indicator
+            sprite_size = self.sprite_cache.logical_size()
+            window_width = max(sprite_size.width(), 150)  # At least 150px for Chinese text
+            window_height = sprite_size.height() + 30  # Extra space for favorability indicator
             self.setFixedSize(window_width, window_height)
         else:
             self.setFixedSize(max(config.PET_TARGET_WIDTH, 150), config.PET_TARGET_WIDTH + 30)
         
-        print(f"DEBUG: Window size set to {self.size()}")
+        logger.debug("Window size set to %s", self.size())
         
         # Speech Bubble (created as a top-level window, not added to layout)
         self.speech_bubble = SpeechBubble(None)  # Top-level window
@@ -231,34 +365,70 @@ class PetWindow(QWidget):
         initial_x = screen_geometry.width() - self.width() - margin
         initial_y = screen_geometry.height() - self.height() - margin
         self.move(initial_x, initial_y)
-        print(f"DEBUG: Pet moved to initial position ({initial_x}, {initial_y})")
+        logger.debug("Pet moved to initial position (%s, %s)", initial_x, initial_y)
 
         # Apply platform-specific window settings (macOS)
         if MACOS_OBJC_AVAILABLE:
             self._apply_macos_settings()
             
         self.show()
-        print("DEBUG: PetWindow shown.")
+        logger.debug("PetWindow shown.")
+
+        # Re-render sprites when the window moves to a screen with a different scale
+        if self.windowHandle() is not None:
+            self.windowHandle().screenChanged.connect(lambda screen: self._refresh_sprites())
+            # Expose events tell us when the window is fully covered
+            self.windowHandle().installEventFilter(self)
+
+    def showEvent(self, event):
+        self.animation.set_paused(False)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.animation.set_paused(True)
+        super().hideEvent(event)
+
+    def eventFilter(self, obj, event):
+        """Pause animation while the pet window is not exposed (occluded/minimized)."""
+        if obj is self.windowHandle() and event.type() == QEvent.Type.Expose:
+            self.animation.set_paused(not obj.isExposed())
+        return super().eventFilter(obj, event)
+
+    def _refresh_sprites(self):
+        """Rebuild cached sprites if PET_TARGET_WIDTH or the screen scale changed."""
+        if self.sprite_cache.ensure(config.PET_TARGET_WIDTH, self.devicePixelRatioF()):
+            idle_pixmap = self.sprite_cache.get("idle")
+            if idle_pixmap is not None:
+                self.pixmap = idle_pixmap
+            self._update_cat_state(self.cat_state)
+
+    def changeEvent(self, event):
+        """Watch for device pixel ratio changes (e.g. display scaling changed)."""
+        dpr_change = getattr(QEvent.Type, "DevicePixelRatioChange", None)  # Qt >= 6.6
+        if dpr_change is not None and event.type() == dpr_change:
+            self._refresh_sprites()
+        super().changeEvent(event)
     
     def request_auto_screenshot(self):
         """Called by the timer to request an automatic screenshot and analysis."""
         if not self.analysis_in_progress:
-            print("DEBUG: Auto screenshot timer triggered")
+            logger.debug("Auto screenshot timer triggered")
             self.auto_screenshot_requested.emit()
         else:
-            print("DEBUG: Auto screenshot timer triggered but analysis already in progress, skipping")
+            logger.debug("Auto screenshot timer triggered but analysis already in progress, skipping")
     
     def start_auto_analysis(self):
         """Handler for automatic screenshot requests."""
         if not self.analysis_in_progress:
-            print("DEBUG: Starting automatic analysis...")
+            logger.debug("Starting automatic analysis...")
             self.analysis_in_progress = True
+            self.analysis_automatic = True
             self._update_cat_state("thinking")  # Show thinking state
             
             # Start the analysis in a separate thread (same as click-triggered analysis)
             self.cat_clicked_request_analysis.emit()  # Reuse the existing signal/slot
         else:
-            print("DEBUG: Analysis already in progress, skipping auto request")
+            logger.debug("Analysis already in progress, skipping auto request")
 
     def _apply_macos_settings(self):
         """Apply minimal non-intrusive macOS settings"""
@@ -284,14 +454,14 @@ class PetWindow(QWidget):
             )
             ns_window.setCollectionBehavior_(window_behavior)
         except Exception as e:
-            print(f"WARNING: Failed to apply macOS window settings: {e}")
+            logger.warning("Failed to apply macOS window settings: %s", e)
 
     # This method is connected to the analysis_received signal
     def display_analysis_result(self, text: str):
         """Slot to display the text and reset analysis flag."""
-        print(f"DEBUG: PetWindow display_analysis_result received: '{text}'")
+        logger.debug("PetWindow display_analysis_result received: '%s'", text)
         if not isinstance(text, str) or not text:
-             print("WARNING: display_analysis_result received invalid text. Using fallback.")
+             logger.warning("display_analysis_result received invalid text. Using fallback.")
              text = "喵~ （好像没什么可说的...）"
         
         # Update favorability display when showing results
@@ -307,15 +477,21 @@ class PetWindow(QWidget):
              self # Pass self (PetWindow instance) for positioning
         )
 
-        print("DEBUG: Resetting analysis_in_progress flag.")
+        logger.debug("Resetting analysis_in_progress flag.")
         self.analysis_in_progress = False
         
         # Reset to idle state after a short delay to show talking animation
         QTimer.singleShot(1000, lambda: self._update_cat_state("idle"))
 
+    def end_skipped_analysis(self):
+        """Slot for a skipped automatic analysis: nothing to say, just go back to idle."""
+        logger.debug("Automatic analysis skipped; resetting analysis_in_progress flag.")
+        self.analysis_in_progress = False
+        self._update_cat_state("idle")
+
     # --- Dragging and Click Handling ---
     def mousePressEvent(self, event: QMouseEvent):
-        print("DEBUG: mousePressEvent")
+        logger.debug("mousePressEvent")
         if event.button() == Qt.MouseButton.LeftButton:
             self.offset = event.globalPosition().toPoint() - self.pos()
             self.is_dragging = False # Reset dragging flag on new press
@@ -323,7 +499,7 @@ class PetWindow(QWidget):
             event.accept()
         elif event.button() == Qt.MouseButton.RightButton:
             # Handle right-click to show statistics
-            print("DEBUG: Right-click detected, showing statistics window")
+            logger.debug("Right-click detected, showing statistics window")
             self.show_statistics_window()
             event.accept()
         else:
@@ -334,7 +510,7 @@ class PetWindow(QWidget):
         if event.buttons() & Qt.MouseButton.LeftButton and self.click_press_pos is not None:
             # Check if movement exceeds threshold only once after press
             if not self.is_dragging and (event.pos() - self.click_press_pos).manhattanLength() > QApplication.startDragDistance():
-                 print("DEBUG: Drag detected.")
+                 logger.debug("Drag detected.")
                  self.is_dragging = True # Now it's officially a drag
                  self.setCursor(QCursor(Qt.CursorShape.ClosedHandCursor)) # Change cursor
 
@@ -350,21 +526,22 @@ class PetWindow(QWidget):
              event.ignore()
 
     def mouseReleaseEvent(self, event: QMouseEvent):
-        print("DEBUG: mouseReleaseEvent")
+        logger.debug("mouseReleaseEvent")
         if event.button() == Qt.MouseButton.LeftButton:
             self.setCursor(QCursor(Qt.CursorShape.ArrowCursor)) # Restore cursor
             if not self.is_dragging:
                 # It's a click (no significant drag occurred)
-                print("DEBUG: Click detected (no drag).")
+                logger.debug("Click detected (no drag).")
                 if not self.analysis_in_progress:
-                    print("DEBUG: Analysis not in progress. Emitting request signal...")
+                    logger.debug("Analysis not in progress. Emitting request signal...")
                     self.analysis_in_progress = True # Prevent new requests immediately
+                    self.analysis_automatic = False # Clicks always get a fresh look
                     self._update_cat_state("thinking") # Show thinking state visually
                     self.cat_clicked_request_analysis.emit() # Signal main thread to start analysis
                 else:
-                    print("INFO: Analysis already in progress, click ignored.")
+                    logger.info("Analysis already in progress, click ignored.")
             else:
-                 print("DEBUG: Drag finished.") # Drag completed
+                 logger.debug("Drag finished.") # Drag completed
             # Reset dragging state regardless, ready for next press
             self.is_dragging = False
             self.click_press_pos = None # Clear recorded press position
@@ -394,11 +571,11 @@ class PetWindow(QWidget):
 
     def closeEvent(self, event):
         """Ensure speech bubble is also closed/cleaned up."""
-        print("DEBUG: PetWindow closeEvent.")
+        logger.debug("PetWindow closeEvent.")
         # Stop the auto screenshot timer if it exists
         if hasattr(self, 'auto_screenshot_timer'):
             self.auto_screenshot_timer.stop()
-            print("DEBUG: Auto screenshot timer stopped")
+            logger.debug("Auto screenshot timer stopped")
             
         self.speech_bubble.hide()
         self.speech_bubble.deleteLater() # Schedule bubble for deletion
@@ -413,72 +590,36 @@ class PetWindow(QWidget):
     @pyqtSlot(str) # Decorator REQUIRED for invokeMethod to find it
     def _update_cat_state(self, state: str): # Actual GUI update runs in GUI thread
         """Private slot to perform the actual state update."""
-        print(f"DEBUG: Updating cat state to: {state}")
+        logger.debug("Updating cat state to: %s", state)
         
-        # Load appropriate image based on state
+        # Swap in the pre-scaled sprite frames (no disk I/O or scaling here)
+        self.cat_state = state
         if state == "thinking":
-            thinking_pixmap = QPixmap("assets/cat_surprise.png")
-            if not thinking_pixmap.isNull():
-                scaled_pixmap = thinking_pixmap.scaledToWidth(
-                    config.PET_TARGET_WIDTH,
-                    Qt.TransformationMode.SmoothTransformation
-                )
-                self.cat_label.setPixmap(scaled_pixmap)
+            self._play_state_animation("thinking")
             self.cat_label.setToolTip("Hmm...")
         elif state == "talking":
-            talking_pixmap = QPixmap("assets/cat_talking.png")
-            if not talking_pixmap.isNull():
-                scaled_pixmap = talking_pixmap.scaledToWidth(
-                    config.PET_TARGET_WIDTH,
-                    Qt.TransformationMode.SmoothTransformation
-                )
-                self.cat_label.setPixmap(scaled_pixmap)
+            self._play_state_animation("talking")
             self.cat_label.setToolTip("Meow!")
         else: # idle
-            self.cat_label.setPixmap(self.pixmap) # Reset to original scaled idle pixmap
+            self._play_state_animation("idle")
             self.cat_label.setToolTip("")
 
-    def _update_favorability_display(self):
+    def _play_state_animation(self, state: str) -> bool:
+        """Play the cached frames for `state`; keeps the current image if it has none."""
+        frames = self.sprite_cache.frames(state)
+        if not frames:
+            return False
+        if not config.PET_ANIMATION_ENABLED:
+            frames = frames[:1]
+        fps = config.PET_ANIMATION_STATE_FPS.get(state, config.PET_ANIMATION_FPS)
+        self.animation.play("cat", FrameAnimation(
+            len(frames),
+            lambda index: self.cat_label.setPixmap(frames[index]),
+            fps
+        ))
+        return True
+
+    def _update_favorability_display(self, *args):
         """Update the favorability indicator display."""
-        current_level = self.favorability.get_current_level()
-        level_desc = self.favorability.get_level_description()
-        
-        # Show hearts based on level
-        if current_level >= 10:
-            hearts = "♥♥♥♥♥"
-        elif current_level >= 5:
-            hearts = "♥♥♥♥"
-        elif current_level >= 0:
-            hearts = "♥♥♥"
-        elif current_level >= -5:
-            hearts = "♥♥"
-        else:
-            hearts = "♥"
-            
-        self.favorability_label.setText(f"{hearts} {level_desc}")
-        self.favorability_label.adjustSize()  # Ensure label resizes to fit text
-        
-        # Update color based on level
-        if current_level >= 10:
-            bg_color = "rgba(255, 105, 180, 200)"  # Hot pink
-            text_color = "#8b0051"
-        elif current_level >= 5:
-            bg_color = "rgba(255, 182, 193, 200)"  # Light pink
-            text_color = "#d63384"
-        elif current_level >= 0:
-            bg_color = "rgba(255, 218, 185, 200)"  # Peach
-            text_color = "#cc5500"
-        else:
-            bg_color = "rgba(200, 200, 200, 200)"  # Gray
-            text_color = "#555555"
-            
-        self.favorability_label.setStyleSheet(f"""
-            QLabel {{
-                background-color: {bg_color};
-                color: {text_color};
-                border-radius: 12px;
-                padding: 4px 8px;
-                font-size: 12px;
-                font-weight: bold;
-            }}
-        """)
\ No newline at end of file
+        snapshot = state_service.favorability_snapshot()
+        self.favorability_label.set_level(snapshot["favorability"], snapshot["level_description"])
@@ -0,0 +1,181 @@
+# prompt_context.py
+import copy
+import logging
+import re
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, List, Mapping, Optional
+
+import config
+from keyword_matcher import keyword_matcher
+
+logger = logging.getLogger(__name__)
+
+# CJK ideographs, kana, hangul and full-width forms: roughly one token each
+_WIDE_CHARS = re.compile(r"[\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\ufe30-\ufe4f\uff00-\uffef]")
+# Leading run of a reply up to its first punctuation ("哇塞！..." -> "哇塞")
+_OPENING = re.compile(r"[^\s，。！？、,.!?~～…()（）\"“”'‘’]{1,4}")
+
+RECENT_HEADER = "\n\n【最近说过的话】请避免重复以下内容，要说些不同的话：\n"
+RECENT_FOOTER = "\n请确保你的回复与上述内容明显不同，换个话题或用不同的方式表达关心。"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count without a tokenizer: one per CJK character, one per ~4 other characters."""
+    wide = len(_WIDE_CHARS.findall(text))
+    return wide + (len(text) - wide + 3) // 4
+
+
+def _shorten(text: str, max_chars: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= max_chars else text[:max_chars - 1] + "…"
+
+
+class PromptContextManager:
+    """
+    Fits the conversational context of each prompt into a token budget.
+    The last few replies are quoted (shortened); older ones are folded, as
+    they leave that window, into a rolling summary of the topics the cat
+    keeps coming back to and the openings it overuses. Folding is O(1) per
+    message; the summary text is re-rendered every
+    PROMPT_SUMMARY_REFRESH_MESSAGES messages, and old counts decay at each
+    refresh so it follows the conversation. Sections (recent replies, then
+    the summary, then today's activity) are added in priority order only
+    while they fit, so prompt size stays flat however long history grows.
+    All state is one JSON-friendly dict, stored in recorded sessions so a
+    replay builds the same prompts.
+    """
+
+    def __init__(self, budget: int = config.PROMPT_TOKEN_BUDGET):
+        self.budget = budget
+        self.recent = deque(maxlen=config.PROMPT_RECENT_MESSAGES)  # (text, timestamp)
+        self.summary = self.new_summary()
+
+    @staticmethod
+    def new_summary() -> Dict:
+        return {
+            "messages": 0,    # Replies folded into the summary so far
+            "since": None,    # Timestamp of the oldest one
+            "topics": {},     # activity category / favorability reason -> decayed count
+            "openings": {},   # leading words -> decayed count
+            "pending": 0,     # Folded since the text was last rendered
+            "text": "",
+        }
+
+    # --- Updates ---
+    def seed(self, messages: Iterable[Mapping]):
+        """Build the state from stored history ({"text", "timestamp"} entries, oldest first)."""
+        for message in messages:
+            self.add_message(message["text"], message["timestamp"])
+        self._refresh()
+
+    def add_message(self, text: str, timestamp: str):
+        self._push(text, timestamp)
+        if self.summary["pending"] >= config.PROMPT_SUMMARY_REFRESH_MESSAGES:
+            self._refresh()
+
+    def _push(self, text: str, timestamp: str):
+        if len(self.recent) == self.recent.maxlen:
+            self._fold(*self.recent[0])
+        self.recent.append((text, timestamp))
+
+    def _fold(self, text: str, timestamp: str):
+        summary = self.summary
+        summary["messages"] += 1
+        summary["since"] = summary["since"] or timestamp
+        summary["pending"] += 1
+        hits = keyword_matcher.match(text)
+        topics = summary["topics"]
+        for label in hits.labels("activity") | hits.labels("favorability"):
+            topics[label] = topics.get(label, 0.0) + 1
+        opening = _OPENING.match(text.strip())
+        if opening:
+            openings = summary["openings"]
+            openings[opening.group()] = openings.get(opening.group(), 0.0) + 1
+
+    def _refresh(self):
+        summary = self.summary
+        decay = config.PROMPT_SUMMARY_DECAY
+        for key in ("topics", "openings"):
+            ranked = sorted(summary[key].items(), key=lambda item: item[1], reverse=True)
+            # Decay and keep only the head, so the counters stay small
+            summary[key] = {name: round(count * decay, 3) for name, count in ranked[:config.PROMPT_SUMMARY_KEEP]}
+        summary["pending"] = 0
+        summary["text"] = self._render_summary(summary)
+
+    @staticmethod
+    def _render_summary(summary: Dict) -> str:
+        if not summary["messages"]:
+            return ""
+        since = datetime.fromisoformat(summary["since"]).strftime("%m月%d日")
+        lines = [f"\n\n【更早的聊天摘要】从{since}到现在，喵喵还说过{summary['messages']}句话。"]
+        topics = [name for name, count in summary["topics"].items() if count >= 1][:4]
+        if topics:
+            lines.append(f"聊得最多的是：{'、'.join(topics)}，可以换个角度或者聊点别的。")
+        openings = [name for name, count in summary["openings"].items() if count >= 2][:3]
+        if openings:
+            lines.append(f"经常用{''.join(f'「{name}」' for name in openings)}开头，这次换个开场吧。")
+        return "\n".join(lines)
+
+    # --- Prompt assembly ---
+    def build(self, base_prompt: str, activity: Optional[Mapping] = None) -> str:
+        """`base_prompt` plus as much context as fits the budget; `activity` is a StateService activity snapshot."""
+        remaining = self.budget - estimate_tokens(base_prompt)
+        recent = self._recent_section(remaining)
+        remaining -= estimate_tokens(recent)
+        extras = []
+        for section in (self.summary["text"], self._activity_section(activity)):
+            cost = estimate_tokens(section)
+            if section and cost <= remaining:
+                extras.append(section)
+                remaining -= cost
+        prompt = base_prompt + "".join(extras) + recent
+        logger.debug("Prompt context: ~%s tokens (budget %s)", self.budget - remaining, self.budget)
+        return prompt
+
+    def _recent_section(self, budget: int) -> str:
+        """The latest replies, newest first, as many as fit."""
+        budget -= estimate_tokens(RECENT_HEADER + RECENT_FOOTER)
+        quoted: List[str] = []
+        for text, _ in reversed(self.recent):
+            line = _shorten(text, config.PROMPT_RECENT_MESSAGE_MAX_CHARS)
+            cost = estimate_tokens(line) + 1
+            if cost > budget:
+                break
+            quoted.append(line)
+            budget -= cost
+        if not quoted:
+            return ""
+        lines = [f"{i}. {line}" for i, line in enumerate(reversed(quoted), 1)]
+        return RECENT_HEADER + "\n".join(lines) + "\n" + RECENT_FOOTER
+
+    @staticmethod
+    def _activity_section(activity: Optional[Mapping]) -> str:
+        if not activity:
+            return ""
+        parts = []
+        today = activity.get("today") or {}
+        top = sorted(((cat, pct) for cat, pct in (today.get("percentages") or {}).items() if pct > 0),
+                     key=lambda item: item[1], reverse=True)[:2]
+        if today.get("count") and top:
+            shares = "、".join(f"{cat}{pct:.0f}%" for cat, pct in top)
+            parts.append(f"今天喵喵已经看了{today['count']}次屏幕，主要在{shares}")
+        trail = []
+        for entry in activity.get("recent_activities") or ():
+            breakdown = entry.get("breakdown") or {}
+            if breakdown:
+                category = max(breakdown.items(), key=lambda item: item[1])[0]
+                if not trail or trail[-1] != category:
+                    trail.append(category)
+        if trail:
+            parts.append(f"最近在：{' → '.join(trail[-3:])}")
+        return f"\n【今日活动】{'；'.join(parts)}" if parts else ""
+
+    # --- Session recording ---
+    def state(self) -> Dict:
+        return {"recent": [list(item) for item in self.recent], "summary": copy.deepcopy(self.summary)}
+
+    def restore(self, state: Dict):
+        self.recent.clear()
+        self.recent.extend(tuple(item) for item in state["recent"])
+        self.summary = copy.deepcopy(state["summary"])
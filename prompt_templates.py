@@ -1,6 +1,7 @@
 # prompt_templates.py
 import random
-from datetime import datetime
+import clock
+import config
 
 class PromptTemplateManager:
     """
@@ -9,6 +10,8 @@ class PromptTemplateManager:
     """
     
     def __init__(self):
+        # Own generator so a recorded session can reseed it and replay the same prompts
+        self.rng = random.Random()
         self.response_patterns = {
             "work_late": [
                 "撒娇求关注：想让你陪我玩",
@@ -70,7 +73,7 @@ class PromptTemplateManager:
     
     def get_time_context(self) -> str:
         """Get context based on current time."""
-        current_hour = datetime.now().hour
+        current_hour = clock.now().hour
         
         if 5 <= current_hour < 9:
             return "时间：清晨 - 喵喵刚醒来，有点迷糊但很开心见到你"
@@ -92,20 +95,20 @@ class PromptTemplateManager:
         contexts = []
         
         # Add jealousy context randomly
-        if random.random() < 0.1:
+        if self.rng.random() < 0.1:
             contexts.append("特殊状态：喵喵今天有点吃醋，需要更多关注")
         
         # Add playful mood randomly
-        if random.random() < 0.15:
+        if self.rng.random() < 0.15:
             contexts.append("特殊状态：喵喵今天心情特别好，想要撒娇")
         
         # Add worried state based on time
-        current_hour = datetime.now().hour
+        current_hour = clock.now().hour
         if current_hour >= 1 and current_hour <= 5:
             contexts.append("特殊状态：喵喵非常担心你的健康，会坚持让你休息")
         
         # Add special days
-        weekday = datetime.now().weekday()
+        weekday = clock.now().weekday()
         if weekday == 4:  # Friday
             contexts.append("特殊状态：周五了！喵喵期待周末和你一起度过")
         elif weekday == 0:  # Monday
@@ -113,7 +116,7 @@ class PromptTemplateManager:
         
         # Favorability-based special states
         if favorability_level >= 10:
-            if random.random() < 0.2:
+            if self.rng.random() < 0.2:
                 contexts.append("特殊状态：喵喵想要告诉你一个秘密...")
         
         return "\n".join(contexts) if contexts else "无特殊状态"
@@ -158,20 +161,37 @@ class PromptTemplateManager:
 """
         }
     
-    def generate_prompt(self, mood_state: str, favorability_level: int) -> str:
-        """Generate a complete prompt based on current context."""
+    def get_focus_context(self, focus: dict) -> str:
+        """Describe the ongoing focus session once it is long enough to be worth mentioning."""
+        if not focus or focus["minutes"] < config.FOCUS_PROMPT_MIN_MINUTES:
+            return ""
+        hours, minutes = divmod(int(focus["minutes"]), 60)
+        if hours == 0:
+            duration = f"{minutes}分钟"
+        elif minutes < 10:
+            duration = f"{hours}个小时"
+        else:
+            duration = f"{hours}小时{minutes}分钟"
+        return f"\n【专注时长】主人已经连续{focus['category']}大约{duration}了"
+    
+    def generate_prompt(self, mood_state: str, favorability_level: int, focus: dict = None) -> str:
+        """
+        Generate a complete prompt based on current context.
+        `focus` is the ongoing focus session from ActivityTracker.get_current_focus().
+        """
         time_context = self.get_time_context()
         special_context = self.get_special_context(favorability_level)
+        special_context += self.get_focus_context(focus)
         
         # Add random response pattern suggestion
-        current_hour = datetime.now().hour
+        current_hour = clock.now().hour
         if current_hour >= 21 or current_hour <= 5:
             # Late night, use work_late patterns
-            pattern = random.choice(self.response_patterns["work_late"])
+            pattern = self.rng.choice(self.response_patterns["work_late"])
             special_context += f"\n【建议回复方向】{pattern}"
         else:
             # Normal hours, use general patterns
-            pattern = random.choice(self.response_patterns["general"])
+            pattern = self.rng.choice(self.response_patterns["general"])
             special_context += f"\n【建议回复方向】{pattern}"
         
         return self.base_template.format(
@@ -4,18 +4,34 @@ import subprocess
 import os
 import time
 import glob
-import datetime
+import shutil
 from openai import OpenAI, APIError, APITimeoutError, RateLimitError
-from PIL import Image # Requires Pillow library: pip install Pillow
 import io
 import json
-from collections import deque
-from typing import Dict
+import logging
+from collections import Counter, deque
+import itertools
+import threading
+from typing import Dict, List
 import re
+import clock # Replaceable time source (faked during session replay)
 import config # Import settings from config.py
-from favorability_system import FavorabilitySystem  # Import favorability system
+from journal_store import JournalStore  # Append-only state storage
+from keyword_matcher import keyword_matcher  # Shared compiled keyword matcher
+from similarity_index import MinHashIndex, encode_signature, decode_signature  # Near-duplicate lookup
 from prompt_templates import PromptTemplateManager  # Import prompt templates
-from activity_tracker import ActivityTracker  # Import activity tracker
+from prompt_context import PromptContextManager  # Token-budgeted history/activity context
+from state_service import state_service  # Shared activity/favorability state
+from activity_tracker import ActivityTracker
+from tracing import tracer  # Stage timings for --profile runs
+from streaming_upload import HTTPX_AVAILABLE, StreamingVisionClient, UploadTooLargeError  # Low-memory image upload
+from session_recorder import SessionRecorder  # Cycle recording for offline replay
+from album_index import album_index  # Thumbnail/metadata index of archived screenshots
+from frame_buffer import FrameBuffer  # Sampled frames for batch mode
+from image_worker import image_workers  # Resize/encode in worker processes (off the GUI's GIL)
+from window_probe import CaptureGate, WindowInfo, window_probe, capture_gate, capture_region, activity_prior, blend_prior  # Focused-window metadata
+
+logger = logging.getLogger(__name__)
 
 # Configure the OpenAI client for DashScope
 # Ensure API_KEY and API_BASE_URL are correctly set in config.py / .env
@@ -23,15 +39,22 @@ client = OpenAI(
     api_key=config.API_KEY,
     base_url=config.API_BASE_URL,
 )
+# Same endpoint, but streams the screenshot into the request body from disk
+streaming_client = StreamingVisionClient(
+    api_key=config.API_KEY,
+    base_url=config.API_BASE_URL,
+)
 
-# Initialize favorability system
-favorability = FavorabilitySystem()
+# Shared state (same instances the GUI reads from)
+favorability = state_service.favorability
 prompt_manager = PromptTemplateManager()
-activity_tracker = ActivityTracker()
+activity_tracker = state_service.activity_tracker
+# Records cycle inputs/outputs while main.py runs with --record
+session_recorder = SessionRecorder(state_service)
 
 # Message history tracking
-MESSAGE_HISTORY_FILE = "/tmp/cat_message_history.json"
-MAX_HISTORY_SIZE = 20  # Keep track of last 20 messages
+MESSAGE_HISTORY_FILE = config.MESSAGE_HISTORY_FILE
+MAX_HISTORY_SIZE = 10000  # Messages remembered for de-duplication (lookups use an LSH index)
 
 class MessageHistory:
     """Tracks recent messages to avoid repetition."""
@@ -39,87 +62,137 @@ class MessageHistory:
     def __init__(self, history_file=MESSAGE_HISTORY_FILE, max_size=MAX_HISTORY_SIZE):
         self.history_file = history_file
         self.max_size = max_size
-        self.messages = deque(maxlen=max_size)
+        self.messages = deque()
+        self.index = MinHashIndex()
+        self._entries = {}  # Index key -> entry, to check candidates against their text
+        self._exact = Counter()  # Lowercased texts, for exact-repeat checks
+        self.journal = JournalStore(history_file)
         self._load_history()
     
     def _load_history(self):
-        """Load message history from file."""
-        if os.path.exists(self.history_file):
-            try:
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.messages = deque(data.get('messages', []), maxlen=self.max_size)
-            except Exception as e:
-                print(f"DEBUG: Could not load message history: {e}")
-                self.messages = deque(maxlen=self.max_size)
+        """Load message history snapshot and replay journaled messages."""
+        data, events = self.journal.load()
+        entries = data.get('messages', [])
+        entries += [event for event in events if event.get('type') == 'message']
+        for entry in entries[-self.max_size:]:
+            self._append(entry)
+        if events:
+            # Fold the replayed journal into a fresh snapshot
+            self._save_history()
     
     def _save_history(self):
-        """Save message history to file."""
-        try:
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump({'messages': list(self.messages)}, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"WARNING: Could not save message history: {e}")
+        """Compact message history into a snapshot file."""
+        self.journal.compact({'messages': list(self.messages)})
+    
+    def _append(self, entry: dict):
+        """Add an entry to the deque and the similarity index, evicting the oldest."""
+        entry = {'text': entry['text'], 'timestamp': entry['timestamp'], 'sig': entry.get('sig')}
+        if entry['sig'] is None:
+            # Messages saved before signatures existed
+            entry['sig'] = encode_signature(self.index.signature(entry['text']))
+        if len(self.messages) >= self.max_size:
+            old = self.messages.popleft()
+            self.index.remove(id(old))
+            del self._entries[id(old)]
+            self._exact[old['text'].lower().strip()] -= 1
+        self.messages.append(entry)
+        self.index.add(id(entry), decode_signature(entry['sig']))
+        self._entries[id(entry)] = entry
+        self._exact[entry['text'].lower().strip()] += 1
+        return entry
     
     def add_message(self, message: str):
         """Add a message to history."""
-        self.messages.append({
+        entry = self._append({
             'text': message,
-            'timestamp': datetime.datetime.now().isoformat()
+            'timestamp': clock.now().isoformat(),
+            'sig': encode_signature(self.index.signature(message))
         })
-        self._save_history()
+        # Append the message (O(1)); compact into a snapshot periodically
+        if self.journal.append({'type': 'message', **entry}):
+            self._save_history()
+        return entry
     
     def get_recent_messages(self, count: int = 5) -> list:
         """Get the most recent messages."""
-        return [msg['text'] for msg in list(self.messages)[-count:]]
+        recent = list(itertools.islice(reversed(self.messages), count))
+        return [msg['text'] for msg in reversed(recent)]
     
-    def contains_similar(self, message: str, threshold: float = 0.7) -> bool:
-        """Check if a similar message exists in recent history."""
-        # Simple similarity check - you could make this more sophisticated
-        message_lower = message.lower().strip()
-        for msg in self.messages:
-            msg_lower = msg['text'].lower().strip()
-            # Check for exact matches or very similar content
-            if msg_lower == message_lower:
-                return True
-            # Check if core content is the same (ignoring emojis/punctuation)
-            if self._similarity_ratio(msg_lower, message_lower) > threshold:
-                return True
-        return False
-    
-    def _similarity_ratio(self, s1: str, s2: str) -> float:
-        """Calculate simple similarity ratio between two strings."""
-        # Remove emojis and special characters for comparison
-        import re
-        s1_clean = re.sub(r'[^\w\s]', '', s1)
-        s2_clean = re.sub(r'[^\w\s]', '', s2)
-        
-        if not s1_clean or not s2_clean:
-            return 0.0
-        
-        # Simple word overlap ratio
-        words1 = set(s1_clean.split())
-        words2 = set(s2_clean.split())
-        
-        if not words1 or not words2:
-            return 0.0
-            
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
-        
-        return len(intersection) / len(union) if union else 0.0
+    def contains_similar(self, message: str, threshold: float = config.REPLY_SIMILARITY_THRESHOLD) -> bool:
+        """Check if a similar message exists in history (MinHash/LSH lookup)."""
+        # Exact repeat (also covers messages that are only emoji/punctuation)
+        if self._exact[message.lower().strip()] > 0:
+            return True
+        # Character-shingle similarity ignores emojis/punctuation and works for Chinese.
+        # LSH only proposes candidates; the MinHash estimate is too coarse for short
+        # replies (a few shingles each), so a candidate counts by its exact Jaccard score.
+        return any(self.index.similarity(message, self._entries[key]['text']) > threshold
+                   for key in self.index.candidates(self.index.signature(message)))
 
 # Initialize message history
 message_history = MessageHistory()
+# Prompt context (rolling summary of older replies) seeded from the stored history
+prompt_context = PromptContextManager()
+prompt_context.seed(message_history.messages)
+
+
+class AnalysisContext:
+    """
+    The per-pet state an analysis cycle reads and updates: activity and
+    favorability (through a StateService), reply history, prompt builders
+    and, for the desktop pet, the screenshot album and the capture gate
+    (see window_probe.CaptureGate). The desktop app uses
+    `default_context`; the fleet server keeps one per tenant and holds
+    `lock` for the duration of each of its cycles.
+    """
+
+    def __init__(self, state, history: MessageHistory, templates: PromptTemplateManager = None,
+                 context: PromptContextManager = None, album=None, gate: CaptureGate = None):
+        self.state = state
+        self.favorability = state.favorability
+        self.activity_tracker = state.activity_tracker
+        self.message_history = history
+        self.prompt_manager = templates or PromptTemplateManager()
+        if context is None:
+            context = PromptContextManager()
+            context.seed(history.messages)
+        self.prompt_context = context
+        self.album = album
+        self.capture_gate = gate
+        self.lock = threading.Lock()
+
+
+# The desktop pet's own state
+default_context = AnalysisContext(state_service, message_history, prompt_manager, prompt_context, album_index, capture_gate)
+# Frames sampled between analyses in batch mode; created on first use (see get_frame_buffer)
+_frame_buffer = None
+_frame_buffer_lock = threading.Lock()
+
+
+def get_frame_buffer() -> FrameBuffer:
+    """
+    The batch-mode frame buffer, created on first use so that nothing is
+    written to BATCH_FRAME_DIRECTORY unless batch mode actually runs.
+    """
+    global _frame_buffer
+    with _frame_buffer_lock:
+        if _frame_buffer is None:
+            _frame_buffer = FrameBuffer()
+        return _frame_buffer
+
+def start_session_recording(path: str):
+    """Start recording analysis cycles to `path` (see session_recorder.py)."""
+    session_recorder.start(path, list(message_history.messages), prompt_context.state())
+
 
 def ensure_screenshot_directory():
     """Ensures the screenshot directory exists."""
     if not os.path.exists(config.SCREENSHOT_DIRECTORY):
         try:
             os.makedirs(config.SCREENSHOT_DIRECTORY)
-            print(f"DEBUG: Created screenshot directory: {config.SCREENSHOT_DIRECTORY}")
+            logger.debug("Created screenshot directory: %s", config.SCREENSHOT_DIRECTORY)
         except OSError as e:
-            print(f"ERROR: Could not create screenshot directory: {e}")
+            logger.error("Could not create screenshot directory: %s", e)
             return False
     return True
 
@@ -143,30 +216,34 @@ def clean_old_screenshots():
             for file_path in files_to_delete:
                 try:
                     os.remove(file_path)
-                    print(f"DEBUG: Deleted old screenshot: {file_path}")
+                    logger.debug("Deleted old screenshot: %s", file_path)
                 except OSError as e:
-                    print(f"WARNING: Failed to delete old screenshot {file_path}: {e}")
+                    logger.warning("Failed to delete old screenshot %s: %s", file_path, e)
                     
-            print(f"DEBUG: Kept {config.MAX_SAVED_SCREENSHOTS} most recent screenshots")
+            logger.debug("Kept %s most recent screenshots", config.MAX_SAVED_SCREENSHOTS)
         else:
-            print(f"DEBUG: Only {len(screenshot_files)} screenshots stored, below limit of {config.MAX_SAVED_SCREENSHOTS}")
+            logger.debug("Only %s screenshots stored, below limit of %s", len(screenshot_files), config.MAX_SAVED_SCREENSHOTS)
     except Exception as e:
-        print(f"ERROR: Failed to clean old screenshots: {e}")
+        logger.error("Failed to clean old screenshots: %s", e)
 
 def get_timestamp_filename():
     """Generates a timestamped filename for the screenshot."""
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    timestamp = clock.now().strftime("%Y%m%d_%H%M%S")
     return config.SCREENSHOT_FILENAME_FORMAT.format(timestamp=timestamp)
 
-def capture_screenshot() -> str | None:
+@tracer.traced("screenshot")
+def capture_screenshot(window: WindowInfo = None) -> str | None:
     """
     Captures the main screen and saves it to a timestamped file path.
+    With CAPTURE_FOCUSED_WINDOW, only the area of the focused `window`
+    (padded) is captured; the full screen is the fallback.
     Returns the path to the saved screenshot or None if failed.
     """
-    print("DEBUG: Attempting screenshot capture...")
+    logger.debug("Attempting screenshot capture...")
     
     # For the analysis process, we still use the temp screenshot path
     screenshot_path = config.SCREENSHOT_PATH
+    region = capture_region(window, desktop=window_probe.desktop_bounds()) if config.CAPTURE_FOCUSED_WINDOW else None
     
     try:
         # Ensure the screenshot directory exists
@@ -175,104 +252,173 @@ def capture_screenshot() -> str | None:
             
         # Using /tmp/, usually writable without special permissions
         command = ['screencapture', '-x', screenshot_path]
-        print(f"DEBUG: Running command: {' '.join(command)}")
+        if region:
+            # -R x,y,w,h in screen points: just the focused window
+            command[2:2] = ['-R', ','.join(str(v) for v in region)]
+        logger.debug("Running command: %s", ' '.join(command))
         # Run the command. check=True raises CalledProcessError on non-zero exit.
-        subprocess.run(command, check=True, timeout=10) # 10 second timeout
-        print(f"DEBUG: Screenshot saved to {screenshot_path}")
+        with tracer.span("capture", region="window" if region else "screen"):
+            subprocess.run(command, check=True, timeout=10) # 10 second timeout
+        logger.debug("Screenshot saved to %s", screenshot_path)
         
         # Verify file exists immediately after command returns
         if os.path.exists(screenshot_path):
-            print("DEBUG: Screenshot file verified.")
+            logger.debug("Screenshot file verified.")
             
             # For permanent storage, save a copy with timestamp to the storage directory
             timestamp_filename = get_timestamp_filename()
             permanent_path = os.path.join(config.SCREENSHOT_DIRECTORY, timestamp_filename)
             
-            try:
-                # Copy the file to permanent storage
-                Image.open(screenshot_path).save(permanent_path)
-                print(f"DEBUG: Saved permanent copy to {permanent_path}")
+            with tracer.span("archive_copy"):
+                try:
+                    # Copy the file to permanent storage (byte copy, no PNG decode/re-encode on this process)
+                    shutil.copyfile(screenshot_path, permanent_path)
+                    logger.debug("Saved permanent copy to %s", permanent_path)
+                    album_index.register_capture(permanent_path)
                 
-                # Clean up old screenshots if we have too many
-                clean_old_screenshots()
-            except Exception as e:
-                print(f"WARNING: Failed to save permanent copy: {e}")
+                    # Clean up old screenshots if we have too many
+                    clean_old_screenshots()
+                except Exception as e:
+                    logger.warning("Failed to save permanent copy: %s", e)
             
             return screenshot_path
         else:
             # This case is unlikely if check=True didn't raise error, but good sanity check
-            print("ERROR: Screenshot command ran but file not found immediately after!")
+            logger.error("Screenshot command ran but file not found immediately after!")
             return None
     except FileNotFoundError:
         # Handle case where screencapture command itself isn't found
-        print(f"ERROR: 'screencapture' command not found. Is this macOS and is it in the PATH?")
+        logger.error("'screencapture' command not found. Is this macOS and is it in the PATH?")
         return None
     except subprocess.CalledProcessError as e:
+        if region:
+            # e.g. the window moved off-screen since it was probed
+            logger.warning("Window capture failed (%s), capturing the full screen instead", e)
+            return capture_screenshot()
         # screencapture command returned a non-zero exit code
-        print(f"ERROR: Screenshot command failed with exit code {e.returncode} - {e}")
+        logger.error("Screenshot command failed with exit code %s - %s", e.returncode, e)
         return None
     except subprocess.TimeoutExpired:
         # Command took longer than the timeout
-        print("ERROR: Screenshot command timed out")
+        logger.error("Screenshot command timed out")
         return None
     except Exception as e:
         # Catch any other unexpected exceptions
-        print(f"ERROR: Unexpected error during screenshot capture: {e}")
+        logger.error("Unexpected error during screenshot capture: %s", e)
         return None
 
-def encode_image_to_base64(image_path: str) -> str | None:
+def capture_frame(path: str) -> bool:
+    """Grab the screen into `path` without archiving it (batch-mode sampling)."""
+    try:
+        with tracer.span("capture"):
+            subprocess.run(['screencapture', '-x', path], check=True, timeout=10)
+        return os.path.exists(path)
+    except FileNotFoundError:
+        logger.error("'screencapture' command not found. Is this macOS and is it in the PATH?")
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        logger.warning("Frame capture failed: %s", e)
+    return False
+
+@tracer.traced("encode")
+def encode_image_to_base64(image_path: str, image_format: str = "png") -> str | None:
     """Reads an image file and encodes it to base64 data URL."""
-    print(f"DEBUG: Attempting to encode image: {image_path}")
+    logger.debug("Attempting to encode image: %s", image_path)
     try:
-        # Assume png format from screencapture. Could add logic to detect format if needed.
-        image_format = "png"
+        # png from screencapture; buffered batch frames are jpeg
         with open(image_path, "rb") as image_file:
             # Read the binary data
-            binary_data = image_file.read()
+            with tracer.span("read_file"):
+                binary_data = image_file.read()
             # Encode to base64 bytes, then decode to utf-8 string
-            base64_encoded_string = base64.b64encode(binary_data).decode('utf-8')
-            print(f"DEBUG: Image encoded successfully. Base64 string length: {len(base64_encoded_string)}")
+            with tracer.span("base64", input_bytes=len(binary_data)):
+                base64_encoded_string = base64.b64encode(binary_data).decode('utf-8')
+            logger.debug("Image encoded successfully. Base64 string length: %s", len(base64_encoded_string))
             # Construct the data URI
             return f"data:image/{image_format};base64,{base64_encoded_string}"
     except FileNotFoundError:
-        print(f"ERROR: Encoding failed - File not found at {image_path}")
+        logger.error("Encoding failed - File not found at %s", image_path)
         return None
     except Exception as e:
-        print(f"ERROR: Encoding failed - {e}")
+        logger.error("Encoding failed - %s", e)
         return None
 
-def compress_image(image_path: str, max_size=(1920, 1920)): # Default max dimensions
+def image_format(image_path: str) -> str:
+    """"jpeg" or "png", from the file's signature (fleet uploads are JPEG; screencapture writes PNG)."""
+    with open(image_path, "rb") as image_file:
+        return "jpeg" if image_file.read(3) == b"\xff\xd8\xff" else "png"
+
+# Screenshots are resized to fit this before analysis
+ANALYSIS_MAX_SIZE = (1920, 1920)
+
+@tracer.traced("compress")
+def compress_image(image_path: str, max_size=ANALYSIS_MAX_SIZE): # Default max dimensions
     """
     Resizes image proportionally to fit within max_size using Pillow
     and saves it back as an optimized PNG, overwriting the original file.
+    Runs in an image worker process when the pool is started (see image_worker.py).
     """
     try:
-        print(f"DEBUG: Resizing image to fit within {max_size}: {image_path}")
-        # Open the image using Pillow
-        img = Image.open(image_path)
-        original_size = img.size
-        print(f"DEBUG: Original image size: {original_size}")
-
-        # thumbnail modifies the image object in-place, maintaining aspect ratio
-        img.thumbnail(max_size, Image.Resampling.LANCZOS) # LANCZOS is high quality filter
-
-        # Save the resized image back to the *same path* as an optimized PNG
-        img.save(image_path, "PNG", optimize=True)
+        logger.debug("Resizing image to fit within %s: %s", max_size, image_path)
+        # Resize (LANCZOS) + optimized PNG encode, written back to the *same path*
+        with tracer.span("resize_encode", worker=image_workers.running) as span:
+            sizes = image_workers.run("resize_png", image_path, list(max_size))
+            original_size, new_size = tuple(sizes["source"]), tuple(sizes["result"])
+            span.set(source=f"{original_size[0]}x{original_size[1]}", result=f"{new_size[0]}x{new_size[1]}")
         # Verify size after saving (optional)
         final_size_bytes = os.path.getsize(image_path)
-        print(f"DEBUG: Image resized from {original_size} to {img.size}. Final file size: {final_size_bytes / 1024:.1f} KB.")
+        logger.debug("Image resized from %s to %s. Final file size: %.1f KB.", original_size, new_size, final_size_bytes / 1024)
     except FileNotFoundError:
-         print(f"ERROR: Cannot compress/resize - File not found: {image_path}")
+         logger.error("Cannot compress/resize - File not found: %s", image_path)
          # Indicate failure? For now, just log error. Subsequent steps might fail.
     except Exception as e:
         # Log a warning if compression/resize fails, but allow the process to continue.
         # The original (potentially large) image will be used if this fails.
-        print(f"WARNING: Could not compress/resize image {image_path}: {e}")
+        logger.warning("Could not compress/resize image %s: %s", image_path, e)
+
 
+def create_vision_completion(prompt: str, image_path: str, base64_image_url: str | None, timeout: float):
+    """
+    One prompt + screenshot chat completion.
+    With base64_image_url=None the image is streamed from image_path instead
+    of being embedded in an in-memory request body.
+    """
+    if not session_recorder.active:
+        return _request_vision_completion(prompt, image_path, base64_image_url, timeout)
+    start = time.perf_counter()
+    try:
+        completion = _request_vision_completion(prompt, image_path, base64_image_url, timeout)
+    except Exception as e:
+        session_recorder.record_call(prompt, None, time.perf_counter() - start, error=e)
+        raise
+    session_recorder.record_call(prompt, completion, time.perf_counter() - start)
+    return completion
+
+def _request_vision_completion(prompt: str, image_path: str, base64_image_url: str | None, timeout: float):
+    if base64_image_url is None:
+        return streaming_client.create(config.MODEL_NAME, prompt, image_path, timeout=timeout,
+                                       mime_type=f"image/{image_format(image_path)}")
+    return client.chat.completions.create(
+        model=config.MODEL_NAME,
+        messages=[
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {"type": "image_url", "image_url": {"url": base64_image_url}}
+                ]
+            }
+        ],
+        timeout=timeout # Pass timeout if supported by library version
+    )
 
-def analyze_activities_with_qwen(base64_image_url: str) -> Dict[str, float]:
+# A JSON object with at most one level of nested objects, inside other text
+_JSON_OBJECT = re.compile(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', re.DOTALL)
+
+def analyze_activities_with_qwen(image_path: str, base64_image_url: str | None = None,
+                                 window: WindowInfo = None) -> Dict[str, float]:
     """
     Analyze screenshot for activity categories using Qwen.
+    `window` (the focused window when the screen was captured) is given to the model as a hint.
     Returns dictionary of category -> percentage.
     """
     activity_prompt = """
@@ -304,268 +450,474 @@ def analyze_activities_with_qwen(base64_image_url: str) -> Dict[str, float]:
   "其他": 0
 }
 """
+    if window is not None:
+        activity_prompt += f"\n参考信息：截图时的前台窗口是{window.describe()}。\n"
     
     try:
-        completion = client.chat.completions.create(
-            model=config.MODEL_NAME,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": activity_prompt},
-                        {"type": "image_url", "image_url": {"url": base64_image_url}}
-                    ]
-                }
-            ],
-            timeout=10  # Shorter timeout for activity analysis
-        )
+        with tracer.span("api_call", purpose="activity"):
+            # Shorter timeout for activity analysis
+            completion = create_vision_completion(activity_prompt, image_path, base64_image_url, timeout=10)
         
         if completion.choices and completion.choices[0].message and completion.choices[0].message.content:
             response_text = completion.choices[0].message.content.strip()
-            print(f"DEBUG: Activity analysis response: {response_text}")
+            logger.debug("Activity analysis response: %s", response_text)
             
             # Try to parse JSON response
             try:
                 # Remove any non-JSON content
-                json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', response_text, re.DOTALL)
-                if json_match:
-                    activity_data = json.loads(json_match.group())
+                with tracer.span("json_parse"):
+                    json_match = _JSON_OBJECT.search(response_text)
+                    activity_data = json.loads(json_match.group()) if json_match else None
+                if activity_data is not None:
                     # Validate and normalize
-                    valid_categories = activity_tracker.ACTIVITY_CATEGORIES
+                    valid_categories = ActivityTracker.ACTIVITY_CATEGORIES
                     result = {}
                     for cat in valid_categories:
                         result[cat] = float(activity_data.get(cat, 0))
                     return result
             except Exception as e:
-                print(f"WARNING: Could not parse activity JSON: {e}")
+                logger.warning("Could not parse activity JSON: %s", e)
     
     except Exception as e:
-        print(f"WARNING: Activity analysis failed: {e}")
+        logger.warning("Activity analysis failed: %s", e)
     
     # Fallback: use keyword-based analysis from the main response
     return {}
 
-def analyze_screenshot_with_qwen(image_path: str) -> tuple:
+@tracer.traced("prompt_build")
+def build_comment_prompt(context: AnalysisContext) -> str:
+    """The persona prompt for `context`'s mood, level and focus, plus history/activity context."""
+    favorability = context.favorability
+    # Get favorability modifier and generate dynamic prompt
+    mood_modifier = favorability.get_mood_modifier()
+    current_level = favorability.get_current_level()
+
+    # Generate dynamic prompt using the template manager
+    enhanced_prompt = context.prompt_manager.generate_prompt(
+        mood_state=mood_modifier,
+        favorability_level=current_level,
+        focus=context.activity_tracker.get_current_focus()
+    )
+
+    # Recent replies, a summary of older ones and today's activity, within the token budget
+    return context.prompt_context.build(enhanced_prompt, context.state.activity_snapshot())
+
+def _completion_content(completion) -> str | None:
+    """Text of the first choice, or None if the response has none."""
+    if completion.choices and completion.choices[0].message and completion.choices[0].message.content:
+        return completion.choices[0].message.content
+    return None
+
+def _finish_reply(context: AnalysisContext, text: str | None) -> str:
+    """
+    The cat's reply after the empty and repetition checks; real replies
+    (not error placeholders) are added to the pet's history.
+    `text` is the stripped reply, or None if the response had no content.
+    """
+    if text is None:
+         # Handle cases where response structure is wrong or content is missing
+         logger.error("Qwen response structure unexpected or content missing/empty.")
+         text = "喵~ （API 的回应有点奇怪...）"
+    elif not text:
+         logger.warning("API returned an empty content string.")
+         text = "喵~ （API 好像没说话... 内容是空的。）"
+    else:
+         logger.debug("Analysis result extracted: '%s'", text)
+         # Check if the response is too similar to recent messages
+         if context.message_history.contains_similar(text):
+             logger.debug("Response too similar to recent messages, requesting variety...")
+             # Add a note to regenerate with more variety
+             text = "喵喵想想...还能说什么呢？"  # Fallback while we implement retry logic
+
+    # Add successful response to history (but not error messages)
+    if not any(error_phrase in text for error_phrase in ["API", "错误", "失败", "内容是空的"]):
+        entry = context.message_history.add_message(text)
+        context.prompt_context.add_message(entry['text'], entry['timestamp'])
+        logger.debug("Added message to history. Total messages tracked: %s", len(context.message_history.messages))
+    return text
+
+def api_error_result(e: Exception) -> tuple:
+    """(cat-style message, favorability change) for a failed model call."""
+    if isinstance(e, APITimeoutError):
+         logger.error("Qwen API request timed out after %s seconds.", config.ANALYSIS_TIMEOUT_SECONDS)
+         return f"喵... （反应太慢了... Timeout! {config.ANALYSIS_TIMEOUT_SECONDS}s）", -1  # Slight negative for timeout
+    if isinstance(e, UploadTooLargeError):
+         logger.error("Streaming upload aborted: %s", e)
+         return "喵~ （图片还是太大了，API不喜欢...）", 0
+    if isinstance(e, RateLimitError):
+         logger.error("Qwen API rate limit exceeded. %s", e)
+         return "喵~ 让我歇会儿！（Rate Limit）", 0
+    if isinstance(e, APIError): # Catch other DashScope/OpenAI specific API errors
+         logger.error("Qwen API returned an error. Status Code: %s, Body: %s, Message: %s", getattr(e, "status_code", None), e.body, e)
+         # Try to extract a meaningful message from the error body for the user
+         if isinstance(e.body, dict):
+              # Look for common error message fields
+              error_body_msg = e.body.get('message', e.body.get('msg', str(e.body)))
+         elif e.body: # If body is not a dict but exists
+              error_body_msg = str(e.body)
+         else: # Fallback to the string representation of the error
+             error_body_msg = str(e)
+         # Specific check for the size error we encountered before
+         if "max bytes per data-uri item" in error_body_msg:
+             logger.error("Received data-uri size limit error from API again.")
+             return "喵~ （图片还是太大了，API 不收...）", 0 # More specific message
+         # Prepend our cat prefix
+         return f"喵呜！API 出错了：{error_body_msg}", 0
+    # Any other unexpected exception (network, library bugs, etc.)
+    logger.error("Unexpected error during API call: %s", e)
+    return "喵？！发生了一些奇怪的事情...", 0
+
+@tracer.traced("analyze")
+def analyze_screenshot_with_qwen(image_path: str, context: AnalysisContext = None,
+                                 window: WindowInfo = None) -> tuple:
     """
     Encodes the image, sends it to Qwen-VL model for analysis via DashScope API.
+    `context` is the pet whose state is used and updated (default: the desktop pet).
+    `window` is the focused window at capture time; its app is a strong prior for the activity breakdown.
     Returns tuple of (analysis_text, favorability_change)
     """
-    print("DEBUG: analyze_screenshot_with_qwen called.")
+    logger.debug("analyze_screenshot_with_qwen called.")
+    context = context or default_context
+    favorability = context.favorability
+    activity_tracker = context.activity_tracker
     analysis_result_text = "喵？（内部处理时有点问题...）" # Default fallback message
     favorability_change = 0
 
     # --- Pre-API Checks ---
     if not config.API_KEY:
-         print("ERROR: API Key is missing in analyze_screenshot_with_qwen.")
+         logger.error("API Key is missing in analyze_screenshot_with_qwen.")
          return "喵？（主人没给我钥匙欸... API Key missing!）", 0 # Return error tuple
 
     if not os.path.exists(image_path):
-        print(f"ERROR: Image file not found before encoding: {image_path}")
+        logger.error("Image file not found before encoding: %s", image_path)
         return "喵？（图片在处理前就消失了欸...）", 0 # Return error tuple
 
     # --- Encode Image ---
-    print("DEBUG: Encoding image for API...")
-    base64_image_url = encode_image_to_base64(image_path)
-    if not base64_image_url:
-        print("ERROR: Failed to encode image for API.")
-        # Try to delete the file even if encoding failed, as analysis won't proceed
-        if os.path.exists(image_path):
-             try: os.remove(image_path); print("DEBUG: Cleaned up file after encoding failure.")
-             except OSError as e: print(f"WARNING: Failed to cleanup file after encoding failure: {e}")
-        return "喵？图片好像编码失败了...", 0 # Return error tuple
-
-    # --- Check Encoded Size BEFORE API Call (Approximate) ---
-    # Calculate approximate size in bytes (Base64 string length * 3/4)
-    approx_bytes = len(base64_image_url) * 0.75
-    # Limit from API error was 10 * 1024 * 1024 bytes
-    api_limit_bytes = 10 * 1024 * 1024
-    print(f"DEBUG: Approximate Base64 data size: {approx_bytes / (1024*1024):.2f} MB")
-    if approx_bytes > api_limit_bytes:
-         print(f"ERROR: Estimated Base64 size ({approx_bytes / (1024*1024):.2f} MB) exceeds API limit ({api_limit_bytes / (1024*1024)} MB) even after resize attempt!")
+    if config.STREAMING_UPLOAD_ENABLED and HTTPX_AVAILABLE:
+        # Encoded chunk by chunk during each upload; only the size is needed now
+        base64_image_url = None
+        data_bytes = streaming_client.image_data_size(image_path)
+    else:
+        logger.debug("Encoding image for API...")
+        base64_image_url = encode_image_to_base64(image_path, image_format(image_path))
+        if not base64_image_url:
+            logger.error("Failed to encode image for API.")
+            # Try to delete the file even if encoding failed, as analysis won't proceed
+            if os.path.exists(image_path):
+                 try: os.remove(image_path); logger.debug("Cleaned up file after encoding failure.")
+                 except OSError as e: logger.warning("Failed to cleanup file after encoding failure: %s", e)
+            return "喵？图片好像编码失败了...", 0 # Return error tuple
+        data_bytes = len(base64_image_url)
+
+    # --- Check Encoded Size BEFORE API Call ---
+    # The API limits the bytes of each data-URI item
+    api_limit_bytes = config.API_MAX_IMAGE_BYTES
+    logger.debug("Base64 data size: %.2f MB", data_bytes / (1024*1024))
+    if data_bytes > api_limit_bytes:
+         logger.error("Base64 size (%.2f MB) exceeds API limit (%s MB) even after resize attempt!", data_bytes / (1024*1024), api_limit_bytes / (1024*1024))
          # Delete the file as analysis won't proceed
          if os.path.exists(image_path):
-              try: os.remove(image_path); print("DEBUG: Cleaned up oversized file.")
-              except OSError as e: print(f"WARNING: Failed to cleanup oversized file: {e}")
+              try: os.remove(image_path); logger.debug("Cleaned up oversized file.")
+              except OSError as e: logger.warning("Failed to cleanup oversized file: %s", e)
          return "喵~ （图片还是太大了，API不喜欢...）", 0 # Return specific error tuple
 
-    # Get favorability modifier and generate dynamic prompt
-    mood_modifier = favorability.get_mood_modifier()
-    current_level = favorability.get_current_level()
-    
-    # Generate dynamic prompt using the template manager
-    enhanced_prompt = prompt_manager.generate_prompt(
-        mood_state=mood_modifier,
-        favorability_level=current_level
-    )
-    
-    # Add recent message history to prompt to avoid repetition
-    recent_messages = message_history.get_recent_messages(count=5)
-    if recent_messages:
-        enhanced_prompt += "\n\n【最近说过的话】请避免重复以下内容，要说些不同的话：\n"
-        for i, msg in enumerate(recent_messages, 1):
-            enhanced_prompt += f"{i}. {msg}\n"
-        enhanced_prompt += "\n请确保你的回复与上述内容明显不同，换个话题或用不同的方式表达关心。"
+    enhanced_prompt = build_comment_prompt(context)
 
     # --- Call API ---
-    print("DEBUG: Sending request to Qwen API...")
-    start_time = time.time()
+    logger.debug("Sending request to Qwen API...")
+    start_time = clock.timestamp()
     try:
-        completion = client.chat.completions.create(
-            model=config.MODEL_NAME,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": enhanced_prompt},
-                        {"type": "image_url", "image_url": {"url": base64_image_url}}
-                    ]
-                }
-            ],
-            timeout=config.ANALYSIS_TIMEOUT_SECONDS # Pass timeout if supported by library version
-        )
-        end_time = time.time()
-        print(f"DEBUG: Qwen response received in {end_time - start_time:.2f} seconds.")
+        with tracer.span("api_call", purpose="comment"):
+            completion = create_vision_completion(
+                enhanced_prompt, image_path, base64_image_url, timeout=config.ANALYSIS_TIMEOUT_SECONDS
+            )
+        end_time = clock.timestamp()
+        logger.debug("Qwen response received in %.2f seconds.", end_time - start_time)
 
         # --- Process Response ---
-        if completion.choices and completion.choices[0].message and completion.choices[0].message.content:
-             analysis_result_text = completion.choices[0].message.content.strip()
-             print(f"DEBUG: Analysis result extracted: '{analysis_result_text}'")
-             # Ensure result is not empty string
-             if not analysis_result_text:
-                  print("WARNING: API returned an empty content string.")
-                  analysis_result_text = "喵~ （API 好像没说话... 内容是空的。）"
-             else:
-                  # Check if the response is too similar to recent messages
-                  if message_history.contains_similar(analysis_result_text, threshold=0.6):
-                      print("DEBUG: Response too similar to recent messages, requesting variety...")
-                      # Add a note to regenerate with more variety
-                      analysis_result_text = "喵喵想想...还能说什么呢？"  # Fallback while we implement retry logic
-        else:
-             # Handle cases where response structure is wrong or content is missing
-             print("ERROR: Qwen response structure unexpected or content missing/empty.")
-             print(f"DEBUG: Full API Response object for inspection: {completion}")
-             analysis_result_text = "喵~ （API 的回应有点奇怪...）"
-
-        # Add successful response to history (but not error messages)
-        if not any(error_phrase in analysis_result_text for error_phrase in ["API", "错误", "失败", "内容是空的"]):
-            message_history.add_message(analysis_result_text)
-            print(f"DEBUG: Added message to history. Total messages tracked: {len(message_history.messages)}")
-
+        content = _completion_content(completion)
+        if content is None:
+             logger.debug("Full API Response object for inspection: %s", completion)
+        analysis_result_text = _finish_reply(context, content.strip() if content else content)
+
+        # Scan the reply for keywords once; both scorers reuse the hits
+        with tracer.span("keyword_match"):
+            keyword_hits = keyword_matcher.match(analysis_result_text)
+        
         # Analyze activities from the screenshot
-        print("DEBUG: Analyzing activities from screenshot...")
-        activity_breakdown = analyze_activities_with_qwen(base64_image_url)
+        logger.debug("Analyzing activities from screenshot...")
+        activity_breakdown = analyze_activities_with_qwen(image_path, base64_image_url, window)
         
+        # The focused app says a lot about the activity; it also stands in when the model gave no breakdown
+        prior = activity_prior(window)
+        if prior:
+            activity_breakdown = blend_prior(activity_breakdown, prior)
         # If activity analysis failed, try keyword-based fallback
-        if not activity_breakdown or all(v == 0 for v in activity_breakdown.values()):
-            print("DEBUG: Using keyword-based activity analysis as fallback...")
-            activity_breakdown = activity_tracker.analyze_screenshot_for_activities(analysis_result_text)
+        elif not activity_breakdown or all(v == 0 for v in activity_breakdown.values()):
+            logger.debug("Using keyword-based activity analysis as fallback...")
+            activity_breakdown = activity_tracker.analyze_screenshot_for_activities(analysis_result_text, keyword_hits)
         
         # Record the activity
         if activity_breakdown:
-            activity_tracker.record_activity(activity_breakdown, analysis_result_text)
-            print(f"DEBUG: Recorded activity breakdown: {activity_breakdown}")
+            with tracer.span("record_activity"):
+                context.state.record_activity(activity_breakdown, analysis_result_text)
+            logger.debug("Recorded activity breakdown: %s", activity_breakdown)
+            # The album shows the comment and breakdown with the archived screenshot
+            if context.album is not None:
+                context.album.annotate_capture(analysis_result_text, activity_breakdown)
 
         # Calculate favorability change based on the analysis
-        favorability_change = favorability.analyze_screen_content(analysis_result_text)
+        favorability_change = favorability.analyze_screen_content(analysis_result_text, keyword_hits)
+        if context.capture_gate is not None:
+            context.capture_gate.analyzed(window, activity_breakdown)
         
     # --- Handle Specific API/Network Errors ---
-    except APITimeoutError:
-         print(f"ERROR: Qwen API request timed out after {config.ANALYSIS_TIMEOUT_SECONDS} seconds.")
-         analysis_result_text = f"喵... （反应太慢了... Timeout! {config.ANALYSIS_TIMEOUT_SECONDS}s）"
-         favorability_change = -1  # Slight negative for timeout
-    except RateLimitError as e:
-         print(f"ERROR: Qwen API rate limit exceeded. {e}")
-         analysis_result_text = "喵~ 让我歇会儿！（Rate Limit）"
-         favorability_change = 0
-    except APIError as e: # Catch other DashScope/OpenAI specific API errors
-         print(f"ERROR: Qwen API returned an error. Status Code: {e.status_code}, Response: {e.response}, Body: {e.body}, Message: {e}")
-         # Try to extract a meaningful message from the error body for the user
-         error_body_msg = "Unknown API Error"
-         if isinstance(e.body, dict):
-              # Look for common error message fields
-              error_body_msg = e.body.get('message', e.body.get('msg', str(e.body)))
-         elif e.body: # If body is not a dict but exists
-              error_body_msg = str(e.body)
-         else: # Fallback to the string representation of the error
-             error_body_msg = str(e)
-         # Prepend our cat prefix
-         analysis_result_text = f"喵呜！API 出错了：{error_body_msg}"
-         favorability_change = 0
-         # Specific check for the size error we encountered before
-         if "max bytes per data-uri item" in error_body_msg:
-             print("ERROR: Received data-uri size limit error from API again.")
-             analysis_result_text = "喵~ （图片还是太大了，API 不收...）" # More specific message
-
-    except Exception as e: # Catch any other unexpected exceptions (network, library bugs, etc.)
-         print(f"ERROR: Unexpected error during API call: {e}")
-         analysis_result_text = "喵？！发生了一些奇怪的事情..."
-         favorability_change = 0
+    except Exception as e:
+         analysis_result_text, favorability_change = api_error_result(e)
 
     # --- File Cleanup (runs regardless of API success/failure) ---
-    if os.path.exists(image_path) and image_path == config.SCREENSHOT_PATH:
-        try:
-            os.remove(image_path)
-            print(f"DEBUG: Temporary screenshot {image_path} deleted after analysis attempt.")
-        except OSError as e:
-            print(f"WARNING: Error deleting temp screenshot {image_path} after analysis attempt: {e}")
-    else:
-         # This shouldn't happen if capture worked, but check anyway
-         print(f"WARNING: Temp screenshot {image_path} not found for deletion after analysis attempt.")
+    # Frames passed in from elsewhere (fleet uploads) are cleaned up by their owner
+    if image_path == config.SCREENSHOT_PATH:
+        if os.path.exists(image_path):
+            try:
+                os.remove(image_path)
+                logger.debug("Temporary screenshot %s deleted after analysis attempt.", image_path)
+            except OSError as e:
+                logger.warning("Error deleting temp screenshot %s after analysis attempt: %s", image_path, e)
+        else:
+             # This shouldn't happen if capture worked, but check anyway
+             logger.warning("Temp screenshot %s not found for deletion after analysis attempt.", image_path)
 
 
     # --- Return Result ---
     # Ensure we always return a non-empty string
     if not isinstance(analysis_result_text, str) or not analysis_result_text:
-        print(f"WARNING: Final analysis result was invalid ('{analysis_result_text}'). Using fallback.")
+        logger.warning("Final analysis result was invalid ('%s'). Using fallback.", analysis_result_text)
         analysis_result_text = "喵？（嗯... 最后有点小混乱。）"
 
     return analysis_result_text, favorability_change
 
 
-def run_analysis_cycle() -> tuple: # Ensure it always returns a tuple
+def _apply_favorability_change(context: AnalysisContext, analysis_result: str, favorability_change: int) -> str:
+    """Apply the cycle's favorability change; returns the result with any level-up line appended."""
+    # Update favorability if there's a change
+    if favorability_change != 0:
+        with tracer.span("update_favorability"):
+            new_level, level_changed = context.state.update_favorability(
+                favorability_change, 
+                "屏幕活动分析"
+            )
+        logger.debug("Favorability updated: %+d -> Level %s", favorability_change, new_level)
+        
+        # Add special responses at certain levels
+        if level_changed:
+            special_responses = context.favorability.get_special_responses()
+            if special_responses:
+                # Append a special response to the analysis
+                analysis_result += f"\n{special_responses[0]}"
+    return analysis_result
+
+
+@tracer.traced("analysis_cycle")
+def run_analysis_cycle(capture=None, context: AnalysisContext = None, automatic: bool = False,
+                       compress: bool = True) -> tuple: # Ensure it always returns a tuple
     """
     Performs one cycle of capture, resize/compress, and analysis.
+    `capture` replaces capture_screenshot (session replay supplies recorded frames,
+    the fleet server uploaded ones); `context` selects the pet (default: the desktop pet).
+    `compress=False` sends the captured file as is (an upload that already fits ANALYSIS_MAX_SIZE).
+    `automatic` cycles (timer-triggered) are skipped while the focused window is
+    unchanged and was analyzed recently; they then return (None, 0).
     Returns tuple of (analysis_result, favorability_change)
     """
-    print("DEBUG: --- Starting Analysis Cycle (Triggered) ---")
-    screenshot_file = capture_screenshot()
+    logger.debug("--- Starting Analysis Cycle (Triggered) ---")
+    context = context or default_context
+    # Only the desktop pet's cycles are recorded
+    recording = session_recorder.active and context is default_context
+    # Only the desktop pet's own captures are probed; not while recording, as replay has no window to probe
+    window = window_probe.probe() if capture is None and context is default_context and not recording else None
+    gate = context.capture_gate
+    if automatic and gate and gate.should_skip(window):
+        logger.info("Focused window unchanged (%s), skipping capture", window.app)
+        if gate.last_breakdown:
+            # Time on the same window extends the current activity, without counting an analysis
+            context.state.record_continuation(gate.last_breakdown)
+        return None, 0
+    if recording:
+        context.prompt_manager.rng.seed(session_recorder.begin_cycle())
+    screenshot_file = capture() if capture else capture_screenshot(window)
     analysis_result = "喵？（开始就出错了...）" # Default error if capture fails
     favorability_change = 0
 
     if screenshot_file:
+        if recording:
+            # Before compression, so replay resizes from the original resolution
+            session_recorder.record_frame(screenshot_file)
+
         # ---- RESIZE/COMPRESS THE IMAGE before analysis ----
         # Use a reasonable size limit; adjust if needed
-        compress_image(screenshot_file, max_size=(1920, 1920))
+        if compress:
+            compress_image(screenshot_file)
         # --------------------------------------------------
 
         # Proceed with analysis using the (potentially resized) image file
         # analyze_screenshot_with_qwen handles its own errors and returns a tuple
-        analysis_result, favorability_change = analyze_screenshot_with_qwen(screenshot_file)
+        analysis_result, favorability_change = analyze_screenshot_with_qwen(screenshot_file, context, window)
 
-        # Update favorability if there's a change
-        if favorability_change != 0:
-            new_level, level_changed = favorability.update_favorability(
-                favorability_change, 
-                "屏幕活动分析"
-            )
-            print(f"DEBUG: Favorability updated: {favorability_change:+d} -> Level {new_level}")
-            
-            # Add special responses at certain levels
-            if level_changed:
-                special_responses = favorability.get_special_responses()
-                if special_responses:
-                    # Append a special response to the analysis
-                    analysis_result += f"\n{special_responses[0]}"
+        analysis_result = _apply_favorability_change(context, analysis_result, favorability_change)
 
         # Final check if analysis returned None/empty (shouldn't happen with current logic)
         if not isinstance(analysis_result, str) or not analysis_result:
-             print("ERROR: Analysis function returned invalid result even after checks. Using fallback.")
+             logger.error("Analysis function returned invalid result even after checks. Using fallback.")
              analysis_result = "喵？（分析步骤出错了...）"
     else:
         # capture_screenshot failed, set specific error message
-        print("ERROR: Screenshot capture failed in cycle.")
+        logger.error("Screenshot capture failed in cycle.")
         analysis_result = "喵？（截图失败了欸...）"
 
 
-    print(f"DEBUG: Analysis cycle finished. Result to be returned: '{analysis_result}'")
-    return analysis_result, favorability_change # Always return a tuple
\ No newline at end of file
+    if recording:
+        session_recorder.end_cycle(analysis_result, favorability_change)
+    logger.debug("Analysis cycle finished. Result to be returned: '%s'", analysis_result)
+    return analysis_result, favorability_change # Always return a tuple
+
+# --- Batch mode ---
+BATCH_PROMPT = """
+
+【连续截图】下面是最近{minutes}分钟里按时间顺序截取的{count}张屏幕截图（{times}），最后一张是主人现在的屏幕。
+请先针对主人现在的状态（也可以提到这段时间里的变化）用1-2句话自然地回应，然后另起一行，只输出如下格式的JSON。
+frames 里按截图顺序每张一项，给出各类别的百分比（每项总和为100），类别：{categories}
+{{"frames": [{{"工作编程": 70, "学习研究": 30}}]}}
+"""
+
+def parse_batch_reply(text: str, frame_count: int) -> tuple:
+    """
+    (comment, per-frame breakdowns) from a batch reply: the comment is the
+    text around the JSON; breakdowns is None unless there is exactly one
+    valid entry per frame.
+    """
+    json_match = _JSON_OBJECT.search(text)
+    if not json_match:
+        return text.strip(), None
+    comment = (text[:json_match.start()] + text[json_match.end():]).replace("```json", "").replace("```", "").strip()
+    try:
+        frames = json.loads(json_match.group()).get("frames")
+        if not isinstance(frames, list) or len(frames) != frame_count:
+            logger.warning("Batch reply has %s frame entries for %s frames", len(frames) if isinstance(frames, list) else 0, frame_count)
+            return comment, None
+        breakdowns = [{cat: float(frame.get(cat, 0)) for cat in ActivityTracker.ACTIVITY_CATEGORIES} for frame in frames]
+    except (ValueError, TypeError, AttributeError) as e:
+        logger.warning("Could not parse batch activity JSON: %s", e)
+        return comment, None
+    return comment, breakdowns
+
+def create_batch_completion(prompt: str, image_urls: List[str], timeout: float):
+    """One chat completion over several (small, already encoded) images."""
+    content = [{"type": "text", "text": prompt}]
+    content += [{"type": "image_url", "image_url": {"url": url}} for url in image_urls]
+    return client.chat.completions.create(
+        model=config.MODEL_NAME,
+        messages=[{"role": "user", "content": content}],
+        timeout=timeout
+    )
+
+@tracer.traced("analyze_batch")
+def analyze_frames_with_qwen(frames: List, keyframes: List, context: AnalysisContext,
+                             window: WindowInfo = None) -> tuple:
+    """
+    One request for a window of buffered frames: the keyframes go to the
+    model, which answers with a comment and a breakdown per keyframe; every
+    buffered frame is recorded with its own capture time and the breakdown
+    of the keyframe that represents it. `window` is the focused window at
+    the latest frame, for the capture gate.
+    Returns tuple of (analysis_text, favorability_change)
+    """
+    if not config.API_KEY:
+         logger.error("API Key is missing in analyze_frames_with_qwen.")
+         return "喵？（主人没给我钥匙欸... API Key missing!）", 0
+
+    image_urls = [encode_image_to_base64(frame.path, "jpeg") for frame in keyframes]
+    if not all(image_urls):
+        return "喵？图片好像编码失败了...", 0
+
+    prompt = build_comment_prompt(context) + BATCH_PROMPT.format(
+        minutes=max(1, round((frames[-1].timestamp - frames[0].timestamp).total_seconds() / 60)),
+        count=len(keyframes),
+        times="、".join(frame.timestamp.strftime("%H:%M:%S") for frame in keyframes),
+        categories="、".join(ActivityTracker.ACTIVITY_CATEGORIES),
+    )
+    try:
+        with tracer.span("api_call", purpose="batch", images=len(keyframes)):
+            completion = create_batch_completion(prompt, image_urls, timeout=config.ANALYSIS_TIMEOUT_SECONDS)
+        content = _completion_content(completion)
+        comment, breakdowns = parse_batch_reply(content, len(keyframes)) if content else (content, None)
+        analysis_result_text = _finish_reply(context, comment)
+
+        with tracer.span("keyword_match"):
+            keyword_hits = keyword_matcher.match(analysis_result_text)
+        if breakdowns is None:
+            # No usable per-frame answer: one keyword-based breakdown for the whole window
+            logger.debug("Using keyword-based activity analysis as fallback...")
+            fallback = context.activity_tracker.analyze_screenshot_for_activities(analysis_result_text, keyword_hits)
+            breakdowns = [fallback] * len(keyframes) if fallback else None
+
+        if breakdowns:
+            samples = [
+                (breakdown, analysis_result_text, frame.timestamp)
+                for frame, breakdown in zip(frames, FrameBuffer.assign(frames, keyframes, breakdowns))
+                if any(v > 0 for v in breakdown.values())
+            ]
+            if samples:
+                with tracer.span("record_activity", samples=len(samples)):
+                    context.state.record_activities(samples)
+                logger.debug("Recorded %s activity samples from %s keyframes", len(samples), len(keyframes))
+            if context.album is not None:
+                context.album.annotate_capture(analysis_result_text, breakdowns[-1])
+
+        favorability_change = context.favorability.analyze_screen_content(analysis_result_text, keyword_hits)
+        if context.capture_gate is not None:
+            context.capture_gate.analyzed(window, breakdowns[-1] if breakdowns else None)
+    except Exception as e:
+        analysis_result_text, favorability_change = api_error_result(e)
+    return analysis_result_text, favorability_change
+
+@tracer.traced("batch_cycle")
+def run_batch_cycle(context: AnalysisContext = None, automatic: bool = False) -> tuple:
+    """
+    Batch-mode counterpart of run_analysis_cycle(): adds the current screen
+    to the frame buffer, then analyzes the whole buffered window in one
+    request (see analyze_frames_with_qwen). `automatic` cycles are gated on
+    the focused window like run_analysis_cycle()'s; a skip drops the
+    buffered frames and returns (None, 0).
+    Returns tuple of (analysis_result, favorability_change)
+    """
+    context = context or default_context
+    frame_buffer = get_frame_buffer()
+    window = window_probe.probe() if context is default_context else None
+    gate = context.capture_gate
+    if automatic and gate and gate.should_skip(window):
+        logger.info("Focused window unchanged (%s), skipping batch", window.app)
+        frame_buffer.discard(frame_buffer.drain())
+        if gate.last_breakdown:
+            context.state.record_continuation(gate.last_breakdown)
+        return None, 0
+    screenshot_file = capture_screenshot(window)  # Also archived for the album, like a normal cycle
+    if screenshot_file:
+        frame_buffer.add(screenshot_file)
+        try:
+            os.remove(screenshot_file)
+        except OSError as e:
+            logger.warning("Error deleting temp screenshot %s: %s", screenshot_file, e)
+    frames = frame_buffer.drain()
+    if not frames:
+        logger.error("No frames captured for this window.")
+        return "喵？（截图失败了欸...）", 0
+
+    keyframes = FrameBuffer.select_keyframes(frames)
+    logger.debug("Batch window: %s frames, %s keyframes", len(frames), len(keyframes))
+    try:
+        analysis_result, favorability_change = analyze_frames_with_qwen(frames, keyframes, context, window)
+    finally:
+        frame_buffer.discard(frames)
+    analysis_result = _apply_favorability_change(context, analysis_result, favorability_change)
+    return analysis_result, favorability_change
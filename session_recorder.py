@@ -0,0 +1,305 @@
+# session_recorder.py
+import base64
+import gzip
+import io
+import json
+import logging
+import os
+import random
+import threading
+from collections import deque
+from typing import Dict, Iterator, List, Tuple
+
+from openai import APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+from openai.types.chat import ChatCompletion
+from PIL import Image
+
+import clock
+import config
+from streaming_upload import HTTPX_AVAILABLE, UploadTooLargeError, encoded_size
+
+logger = logging.getLogger(__name__)
+
+SESSION_FORMAT_VERSION = 1
+
+
+def open_session_file(path: str, mode: str):
+    """Text handle on a session file; paths ending in .gz are gzip-compressed."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def read_session(path: str) -> Tuple[Dict, Iterator[Dict]]:
+    """(header, iterator over cycle records) of a recorded session."""
+    f = open_session_file(path, "r")
+    header = json.loads(f.readline())
+    if header.get("type") != "session" or header.get("version") != SESSION_FORMAT_VERSION:
+        f.close()
+        raise ValueError(f"{path} is not a version {SESSION_FORMAT_VERSION} session file")
+
+    def cycles() -> Iterator[Dict]:
+        with f:
+            for line in f:
+                # A session cut short by a crash may end in a torn line
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("Ignoring unreadable line at the end of %s", path)
+                    return
+                if record.get("type") == "cycle":
+                    yield record
+
+    return header, cycles()
+
+
+# --- Errors ---
+def describe_error(error: Exception) -> Dict:
+    """JSON-safe description of an API call failure, enough to raise it again on replay."""
+    if isinstance(error, APITimeoutError):
+        kind = "timeout"
+    elif isinstance(error, APIConnectionError):
+        kind = "connection"
+    elif isinstance(error, RateLimitError):
+        kind = "rate_limit"
+    elif isinstance(error, APIStatusError):
+        kind = "status"
+    elif isinstance(error, UploadTooLargeError):
+        kind = "too_large"
+    else:
+        kind = "other"
+    described = {"kind": kind, "message": str(error)}
+    if isinstance(error, APIStatusError):
+        described["status_code"] = error.status_code
+        try:
+            json.dumps(error.body)
+            described["body"] = error.body
+        except (TypeError, ValueError):
+            described["body"] = str(error.body)
+    return described
+
+
+def rebuild_error(described: Dict) -> Exception:
+    """The exception describe_error() recorded, as the live client would have raised it."""
+    import httpx  # Only needed to replay errors; installed with openai
+    kind = described["kind"]
+    request = httpx.Request("POST", config.API_BASE_URL.rstrip("/") + "/chat/completions")
+    if kind == "timeout":
+        return APITimeoutError(request=request)
+    if kind == "connection":
+        return APIConnectionError(request=request)
+    if kind in ("rate_limit", "status"):
+        response = httpx.Response(described.get("status_code", 500), request=request)
+        error_class = RateLimitError if kind == "rate_limit" else APIStatusError
+        return error_class(described["message"], response=response, body=described.get("body"))
+    if kind == "too_large":
+        return UploadTooLargeError(described["message"])
+    return RuntimeError(described["message"])
+
+
+# --- Frames ---
+def encode_frame(image_path: str) -> Dict:
+    """Downsampled JPEG copy of a screenshot plus its original size."""
+    with Image.open(image_path) as img:
+        size = img.size
+        img.draft("RGB", config.SESSION_FRAME_MAX_SIZE)  # Cheap JPEG decode if the source is one
+        frame = img.convert("RGB")
+    frame.thumbnail(config.SESSION_FRAME_MAX_SIZE, Image.Resampling.BILINEAR)
+    buffer = io.BytesIO()
+    frame.save(buffer, "JPEG", quality=config.SESSION_FRAME_QUALITY)
+    return {"size": list(size), "jpeg": base64.b64encode(buffer.getvalue()).decode("ascii")}
+
+
+def restore_frame(frame: Dict, image_path: str) -> str:
+    """Write a recorded frame back out as a PNG screenshot at its original size."""
+    with Image.open(io.BytesIO(base64.b64decode(frame["jpeg"]))) as img:
+        # Scaled back up so the resize/encode stages see the original pixel count
+        img.resize(tuple(frame["size"]), Image.Resampling.BILINEAR).save(image_path, "PNG")
+    return image_path
+
+
+class SessionRecorder:
+    """
+    Records the inputs and outputs of each analysis cycle to a session file.
+    The file is JSON lines (gzip-compressed for .gz paths): a header with
+    the state the session started from, then one record per cycle holding
+    the downsampled frame, the prompt RNG seed, every model call's prompt,
+    response (or error) and latency, the final message, and the resulting
+    activity and favorability deltas. ReplayClient and
+    benchmarks/replay_session.py feed a session back through
+    run_analysis_cycle() without network access.
+    Disabled unless main.py runs with --record; hooks cost one flag check.
+    """
+
+    def __init__(self, state):
+        self.state = state  # StateService, for before/after deltas
+        self.active = False
+        self.path = None
+        self.cycles_recorded = 0
+        self._file = None
+        self._cycle = None
+        self._lock = threading.Lock()
+
+    def start(self, path: str, recent_messages: List[Dict], prompt_context: Dict = None):
+        """
+        Open `path` and write the session header; `recent_messages` seeds
+        replay's history and `prompt_context` its PromptContextManager state.
+        """
+        fav = self.state.favorability
+        header = {
+            "type": "session",
+            "version": SESSION_FORMAT_VERSION,
+            "started": clock.now().isoformat(),
+            "model": config.MODEL_NAME,
+            "streaming_upload": config.STREAMING_UPLOAD_ENABLED and HTTPX_AVAILABLE,
+            "favorability": {
+                "favorability": fav.get_current_level(),
+                "mood": fav.data.get("mood", "normal"),
+                "last_interaction": fav.data.get("last_interaction"),
+                "special_unlocks": list(fav.data.get("special_unlocks", [])),
+            },
+            "focus_sessions": self.state.activity_tracker.get_focus_state(),
+            # Today's count/shares and the recent trail in each prompt's activity section
+            "activity_context": self.state.activity_tracker.get_context_state(),
+            "recent_messages": [
+                {"text": m["text"], "timestamp": m["timestamp"]}
+                for m in recent_messages[-config.SESSION_SEED_MESSAGES:]
+            ],
+            "prompt_context": prompt_context,
+        }
+        with self._lock:
+            self._file = open_session_file(path, "w")
+            self._write(header)
+            self.path = path
+            self.cycles_recorded = 0
+            self.active = True
+        logger.info("Recording analysis cycles to %s", path)
+
+    def stop(self):
+        with self._lock:
+            self.active = False
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        if self.path:
+            logger.info("Recorded %s cycles to %s", self.cycles_recorded, self.path)
+
+    def _write(self, record: Dict):
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    # --- Cycle hooks (analysis thread) ---
+    def begin_cycle(self) -> int:
+        """Start a cycle record; returns the seed to use for the prompt RNG."""
+        seed = random.getrandbits(32)
+        self._cycle = {
+            "type": "cycle",
+            "index": self.cycles_recorded,
+            "time": clock.now().isoformat(),
+            "seed": seed,
+            "frame": None,
+            "calls": [],
+            "_favorability_before": self.state.favorability_snapshot()["favorability"],
+            "_analyses_before": self.state.activity_snapshot()["total_analyses"],
+        }
+        return seed
+
+    def record_frame(self, image_path: str):
+        if self._cycle is None:
+            return
+        try:
+            self._cycle["frame"] = encode_frame(image_path)
+        except Exception as e:
+            logger.warning("Could not record frame %s: %s", image_path, e)
+
+    def record_call(self, prompt: str, completion, latency: float, error: Exception = None):
+        """One model call: the prompt, the reply text (or the error) and its latency in seconds."""
+        if self._cycle is None:
+            return
+        call = {"prompt": prompt, "latency": round(latency, 3)}
+        if error is not None:
+            call["error"] = describe_error(error)
+        else:
+            choices = getattr(completion, "choices", None)
+            call["response"] = choices[0].message.content if choices and choices[0].message else None
+        self._cycle["calls"].append(call)
+
+    def end_cycle(self, result: str, favorability_change: int):
+        cycle, self._cycle = self._cycle, None
+        if cycle is None:
+            return
+        activity = None
+        if self.state.activity_snapshot()["total_analyses"] > cycle.pop("_analyses_before"):
+            activity = self.state.activity_tracker.get_recent_activities(1)[0]["breakdown"]
+        favorability_after = self.state.favorability_snapshot()["favorability"]
+        cycle.update({
+            "result": result,
+            "favorability_change": favorability_change,
+            "favorability_delta": favorability_after - cycle.pop("_favorability_before"),
+            "favorability_after": favorability_after,
+            "activity": activity,
+        })
+        with self._lock:
+            if not self.active:
+                return
+            try:
+                self._write(cycle)
+                self.cycles_recorded += 1
+            except OSError as e:
+                logger.error("Could not write session record: %s", e)
+
+
+class ReplayClient:
+    """
+    Offline stand-in for both API clients (the SDK client and the streaming
+    client) that answers each call from the current cycle's recorded calls,
+    in order. Each answer advances the fake clock by the recorded latency.
+    Prompts that differ from the recorded ones are counted, not rejected.
+    """
+
+    def __init__(self, fake_clock):
+        self.clock = fake_clock
+        self._calls = deque()
+        self.prompt_mismatches = 0
+        self.unexpected_calls = 0
+        # SDK-shaped entry point: client.chat.completions.create(...)
+        self.chat = self
+        self.completions = self
+
+    def load_cycle(self, calls: List[Dict]):
+        self._calls = deque(calls)
+        self.prompt_mismatches = 0
+        self.unexpected_calls = 0
+
+    @property
+    def calls_left(self) -> int:
+        return len(self._calls)
+
+    def image_data_size(self, image_path: str) -> int:
+        return encoded_size(os.path.getsize(image_path))
+
+    def create(self, model: str = None, prompt: str = None, image_path: str = None,
+               timeout: float = None, messages: List[Dict] = None, **kwargs) -> ChatCompletion:
+        if messages is not None:
+            prompt = messages[0]["content"][0]["text"]
+        if not self._calls:
+            self.unexpected_calls += 1
+            raise RuntimeError("Replay has no recorded response left for this call")
+        call = self._calls.popleft()
+        self.clock.advance(call["latency"])
+        if call["prompt"] != prompt:
+            self.prompt_mismatches += 1
+        if "error" in call:
+            raise rebuild_error(call["error"])
+        content = call.get("response")
+        choices = []
+        if content is not None:
+            choices.append({"index": 0, "finish_reason": "stop",
+                            "message": {"role": "assistant", "content": content}})
+        return ChatCompletion.model_construct(
+            id="replay", object="chat.completion", created=int(self.clock.timestamp()),
+            model=model or config.MODEL_NAME, choices=choices,
+        )
+
+    def close(self):
+        pass
@@ -0,0 +1,112 @@
+# similarity_index.py
+import base64
+import random
+import re
+import struct
+import zlib
+from typing import Dict, Hashable, List, Set
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Drop punctuation, emoji, kaomoji and whitespace before shingling
+_NON_WORD = re.compile(r'[^\w]+')
+
+
+def encode_signature(signature: List[int]) -> str:
+    """Pack a signature of 32-bit values into a compact base64 string for storage."""
+    return base64.b64encode(struct.pack(f"<{len(signature)}I", *signature)).decode('ascii')
+
+
+def decode_signature(encoded: str) -> List[int]:
+    raw = base64.b64decode(encoded)
+    return list(struct.unpack(f"<{len(raw) // 4}I", raw))
+
+
+class MinHashIndex:
+    """
+    Near-duplicate lookup for short texts (works for CJK, which has no spaces).
+    Texts are reduced to character n-gram shingles; a MinHash signature
+    estimates the Jaccard similarity of two shingle sets, and LSH banding
+    buckets signatures so a lookup only compares against likely matches
+    instead of every stored text.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, ngram: int = 2, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.ngram = ngram
+        # Fixed seed: signatures are persisted and must be stable across runs
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+                       for _ in range(num_perm)]
+        self._buckets: List[Dict[tuple, Set[Hashable]]] = [{} for _ in range(bands)]
+        self._signatures: Dict[Hashable, List[int]] = {}
+
+    def normalize(self, text: str) -> str:
+        return _NON_WORD.sub('', text.lower())
+
+    def shingles(self, text: str) -> Set[str]:
+        text = self.normalize(text)
+        if len(text) <= self.ngram:
+            return {text} if text else set()
+        return {text[i:i + self.ngram] for i in range(len(text) - self.ngram + 1)}
+
+    def signature(self, text: str) -> List[int]:
+        """MinHash signature of `text` (empty list if nothing is left after normalizing)."""
+        hashes = [zlib.crc32(s.encode('utf-8')) for s in self.shingles(text)]
+        if not hashes:
+            return []
+        return [min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+                for a, b in self._perms]
+
+    def similarity(self, text1: str, text2: str) -> float:
+        """Exact Jaccard similarity of the two texts' shingle sets."""
+        s1, s2 = self.shingles(text1), self.shingles(text2)
+        if not s1 or not s2:
+            return 0.0
+        return len(s1 & s2) / len(s1 | s2)
+
+    @staticmethod
+    def estimate_similarity(sig1: List[int], sig2: List[int]) -> float:
+        """Estimated Jaccard similarity of the two shingle sets."""
+        if not sig1 or not sig2 or len(sig1) != len(sig2):
+            return 0.0
+        return sum(1 for x, y in zip(sig1, sig2) if x == y) / len(sig1)
+
+    def _band_keys(self, signature: List[int]):
+        for band in range(self.bands):
+            yield band, tuple(signature[band * self.rows:(band + 1) * self.rows])
+
+    def add(self, key: Hashable, signature: List[int]):
+        if not signature:
+            return
+        self._signatures[key] = signature
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band].setdefault(band_key, set()).add(key)
+
+    def remove(self, key: Hashable):
+        signature = self._signatures.pop(key, None)
+        if not signature:
+            return
+        for band, band_key in self._band_keys(signature):
+            bucket = self._buckets[band].get(band_key)
+            if bucket:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band][band_key]
+
+    def candidates(self, signature: List[int]) -> Set[Hashable]:
+        """Keys sharing at least one LSH band with `signature` (likely, not certain, matches)."""
+        candidates = set()
+        if signature:
+            for band, band_key in self._band_keys(signature):
+                candidates.update(self._buckets[band].get(band_key, ()))
+        return candidates
+
+    def query(self, signature: List[int], threshold: float) -> List[Hashable]:
+        """Keys whose estimated similarity to `signature` exceeds `threshold`."""
+        return [key for key in self.candidates(signature)
+                if self.estimate_similarity(signature, self._signatures[key]) > threshold]
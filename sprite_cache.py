@@ -0,0 +1,120 @@
+# sprite_cache.py
+import logging
+import os
+from typing import Dict, List, Optional
+from PyQt6.QtCore import Qt, QSize, QRect, QRectF
+from PyQt6.QtGui import QImage, QPixmap, QPainter
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class SpriteCache:
+    """
+    Decoded and pre-scaled cat sprites, one frame list per state.
+    Asset files are decoded once; scaled pixmaps are rendered for the
+    current target width and device pixel ratio and only rebuilt when
+    either changes, so a state switch is just a pixmap lookup.
+    A state uses its sprite sheet (config.PET_ANIMATION_SHEETS, a
+    horizontal strip of square frames) when present, otherwise its static
+    image, optionally with a synthesized "breathing" loop.
+    """
+
+    STATE_ASSETS = {
+        "idle": "assets/cat_idle.png",
+        "thinking": "assets/cat_surprise.png",
+        "talking": "assets/cat_talking.png",
+    }
+
+    # Vertical squash factors for the synthesized loop when no sheet exists
+    BREATHING_PROFILE = (1.0, 0.985, 0.97, 0.985)
+
+    def __init__(self, target_width: int, device_pixel_ratio: float = 1.0):
+        self._sources: Dict[str, List[QImage]] = {}
+        for state, path in self.STATE_ASSETS.items():
+            frames = self._load_sheet(config.PET_ANIMATION_SHEETS.get(state))
+            if frames:
+                self._sources[state] = frames
+                continue
+            image = QImage(path)
+            if image.isNull():
+                logger.error("Could not load cat image '%s'", path)
+            else:
+                self._sources[state] = [image]
+        self._key = None
+        self._frames: Dict[str, List[QPixmap]] = {}
+        self.ensure(target_width, device_pixel_ratio)
+
+    def _load_sheet(self, path: Optional[str]) -> List[QImage]:
+        """Split a horizontal sprite sheet of square frames into images."""
+        if not config.PET_ANIMATION_ENABLED or not path or not os.path.exists(path):
+            return []
+        sheet = QImage(path)
+        if sheet.isNull() or sheet.height() == 0:
+            logger.warning("Could not load sprite sheet '%s'", path)
+            return []
+        size = sheet.height()
+        count = max(1, sheet.width() // size)
+        logger.debug("Loaded sprite sheet '%s' with %s frames", path, count)
+        return [sheet.copy(QRect(i * size, 0, size, size)) for i in range(count)]
+
+    def ensure(self, target_width: int, device_pixel_ratio: float) -> bool:
+        """Rebuild the scaled sprites if width or scale changed. Returns True if rebuilt."""
+        key = (target_width, round(device_pixel_ratio, 2))
+        if key == self._key:
+            return False
+        self._key = key
+        self._frames = {}
+        for state, images in self._sources.items():
+            # Render at device resolution so sprites stay sharp on HiDPI screens
+            scaled = [
+                image.scaledToWidth(
+                    max(1, round(target_width * device_pixel_ratio)),
+                    Qt.TransformationMode.SmoothTransformation
+                )
+                for image in images
+            ]
+            if len(scaled) == 1 and config.PET_ANIMATION_ENABLED and config.PET_ANIMATION_SYNTHESIZE:
+                scaled = self._breathing_frames(scaled[0])
+            frames = []
+            for image in scaled:
+                pixmap = QPixmap.fromImage(image)
+                pixmap.setDevicePixelRatio(device_pixel_ratio)
+                frames.append(pixmap)
+            self._frames[state] = frames
+        logger.debug("Sprite cache built for width=%s, dpr=%s", target_width, device_pixel_ratio)
+        return True
+
+    def _breathing_frames(self, image: QImage) -> List[QImage]:
+        """A gentle squash loop from one still image, bottom-aligned so the cat stays seated."""
+        frames = []
+        for factor in self.BREATHING_PROFILE:
+            if factor == 1.0:
+                frames.append(image)
+                continue
+            frame = QImage(image.size(), QImage.Format.Format_ARGB32_Premultiplied)
+            frame.fill(Qt.GlobalColor.transparent)
+            painter = QPainter(frame)
+            painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+            height = image.height() * factor
+            painter.drawImage(QRectF(0, image.height() - height, image.width(), height), image)
+            painter.end()
+            frames.append(frame)
+        return frames
+
+    def frames(self, state: str) -> List[QPixmap]:
+        """Pre-scaled animation frames for `state` (empty if its asset is missing)."""
+        return self._frames.get(state, [])
+
+    def get(self, state: str) -> Optional[QPixmap]:
+        """First pre-scaled frame for `state`, or None if its asset is missing."""
+        frames = self._frames.get(state)
+        return frames[0] if frames else None
+
+    def logical_size(self, state: str = "idle") -> Optional[QSize]:
+        """Size of the sprite in device-independent pixels."""
+        pixmap = self.get(state)
+        if pixmap is None:
+            return None
+        return pixmap.deviceIndependentSize().toSize()
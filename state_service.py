@@ -0,0 +1,136 @@
+# state_service.py
+import threading
+from types import MappingProxyType
+from datetime import datetime
+from typing import Dict, List, Mapping, Optional, Tuple
+from PyQt6.QtCore import QObject, pyqtSignal
+
+import clock
+from activity_tracker import ActivityTracker
+from favorability_system import FavorabilitySystem
+
+
+def _freeze(value):
+    """Recursively convert dicts/lists into read-only mappings/tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class StateService(QObject):
+    """
+    Single owner of the pet's persistent state (activity + favorability).
+    Writers go through this service and are serialized by one lock.
+    Readers get immutable snapshots without taking any lock: every write
+    builds a fresh snapshot and swaps the reference (copy-on-write).
+    """
+
+    # Emitted (from the writer's thread) with the new immutable snapshot
+    activity_changed = pyqtSignal(object)
+    favorability_changed = pyqtSignal(object)
+
+    def __init__(self, activity_tracker: ActivityTracker = None,
+                 favorability: FavorabilitySystem = None):
+        super().__init__()
+        self._write_lock = threading.RLock()
+        self.activity_tracker = activity_tracker or ActivityTracker()
+        self.favorability = favorability or FavorabilitySystem()
+
+        self._activity_snapshot_day = None  # Date "today"/"this_week" in the snapshot refer to
+        self._activity_snapshot = self._build_activity_snapshot()
+        self._favorability_snapshot = self._build_favorability_snapshot()
+
+    # --- Snapshots (lock-free reads) ---
+    def activity_snapshot(self) -> Mapping:
+        """Current activity statistics as an immutable mapping."""
+        if clock.now().date() != self._activity_snapshot_day:
+            # Past midnight since the last write: "today" would still be yesterday
+            with self._write_lock:
+                if clock.now().date() != self._activity_snapshot_day:
+                    self._activity_snapshot = self._build_activity_snapshot()
+        return self._activity_snapshot
+
+    def favorability_snapshot(self) -> Mapping:
+        """Current favorability state as an immutable mapping."""
+        return self._favorability_snapshot
+
+    def _build_activity_snapshot(self) -> Mapping:
+        tracker = self.activity_tracker
+        self._activity_snapshot_day = clock.now().date()
+        stats = tracker.get_statistics()
+        # Rollup queries are constant-time bucket lookups
+        stats["today"] = tracker.get_today()
+        stats["this_week"] = tracker.get_this_week()
+        stats["hour_of_day_profile"] = tracker.get_hour_of_day_profile()
+        # Maintained incrementally as activities are recorded
+        stats["focus_sessions"] = tracker.get_focus_summary()
+        stats["current_focus"] = tracker.get_current_focus()
+        return _freeze(stats)
+
+    def _build_favorability_snapshot(self) -> Mapping:
+        fav = self.favorability
+        return _freeze({
+            "favorability": fav.get_current_level(),
+            "level_description": fav.get_level_description(),
+            "mood": fav.data.get("mood", "normal"),
+            "last_interaction": fav.data.get("last_interaction", ""),
+        })
+
+    # --- Writers ---
+    def record_activity(self, activity_breakdown: Dict[str, float], screenshot_analysis: str = "",
+                        timestamp: datetime = None):
+        """Record an activity and publish a new activity snapshot."""
+        self.record_activities([(activity_breakdown, screenshot_analysis, timestamp)])
+
+    def record_activities(self, samples: List[Tuple[Dict[str, float], str, Optional[datetime]]]):
+        """Record (breakdown, analysis text, capture time) samples in order; publishes one snapshot."""
+        with self._write_lock:
+            for activity_breakdown, screenshot_analysis, timestamp in samples:
+                self.activity_tracker.record_activity(activity_breakdown, screenshot_analysis, timestamp)
+            snapshot = self._build_activity_snapshot()
+            self._activity_snapshot = snapshot
+        self.activity_changed.emit(snapshot)
+
+    def record_continuation(self, activity_breakdown: Dict[str, float]):
+        """Extend the current activity without counting an analysis; publishes a new activity snapshot."""
+        with self._write_lock:
+            self.activity_tracker.record_continuation(activity_breakdown)
+            snapshot = self._build_activity_snapshot()
+            self._activity_snapshot = snapshot
+        self.activity_changed.emit(snapshot)
+
+    def sync_favorability(self, level: int, mood: str, reason: str):
+        """Move favorability to `level` and set `mood` (a fleet server's state); publishes a new snapshot."""
+        with self._write_lock:
+            fav = self.favorability
+            if level != fav.get_current_level():
+                fav.update_favorability(level - fav.get_current_level(), reason)
+            fav.data["mood"] = mood
+            snapshot = self._build_favorability_snapshot()
+            self._favorability_snapshot = snapshot
+        self.favorability_changed.emit(snapshot)
+
+    def restore_activity(self, context_state: Dict, focus_state: Dict = None):
+        """Seed activity state from a recorded session header (replay); publishes a new activity snapshot."""
+        with self._write_lock:
+            self.activity_tracker.restore_context_state(context_state)
+            if focus_state:
+                self.activity_tracker.restore_focus_state(focus_state)
+            snapshot = self._build_activity_snapshot()
+            self._activity_snapshot = snapshot
+        self.activity_changed.emit(snapshot)
+
+    def update_favorability(self, change: int, reason: str) -> Tuple[int, bool]:
+        """Apply a favorability change and publish a new favorability snapshot."""
+        with self._write_lock:
+            new_level, level_changed = self.favorability.update_favorability(change, reason)
+            snapshot = self._build_favorability_snapshot()
+            self._favorability_snapshot = snapshot
+        self.favorability_changed.emit(snapshot)
+        return new_level, level_changed
+
+
+# Global instance shared by the GUI and the analysis thread
+state_service = StateService()
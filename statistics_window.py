@@ -1,32 +1,236 @@
 # statistics_window.py
-from PyQt6.QtWidgets import QDialog, QVBoxLayout, QTextEdit, QPushButton, QLabel
-from PyQt6.QtCore import Qt, QTimer
-from PyQt6.QtGui import QFont
-from activity_tracker import activity_tracker
+from typing import List, Tuple
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QPushButton, QLabel, QWidget, QListView
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QRectF
+from PyQt6.QtGui import QFont, QFontMetrics, QPainter, QColor, QStaticText
+from state_service import state_service
+from stats_view_model import StatsViewModel, StatsViewModelBuilder, StatsViewModelService
+from album_window import AlbumWindow
 import config
 
+
+class ActivityBarChart(QWidget):
+    """
+    Horizontal bar chart of category percentages, painted directly.
+    Label layouts are prepared once per category and colors come from a
+    fixed palette, so an update is one repaint.
+    """
+    ROW_HEIGHT = 22
+    LABEL_WIDTH = 80
+    VALUE_WIDTH = 50
+    PALETTE = [
+        QColor("#ff6b6b"), QColor("#4dabf7"), QColor("#51cf66"), QColor("#fcc419"), QColor("#cc5de8"),
+        QColor("#20c997"), QColor("#ff922b"), QColor("#845ef7"), QColor("#f06595"), QColor("#adb5bd"),
+    ]
+
+    def __init__(self, categories: List[str], parent=None):
+        super().__init__(parent)
+        self.font = QFont()
+        self.font.setPixelSize(12)
+        self._colors = {cat: self.PALETTE[i % len(self.PALETTE)] for i, cat in enumerate(categories)}
+        self._labels = {}  # category -> prepared QStaticText
+        self._bars: List[Tuple[str, float]] = []
+        self.empty_text = QStaticText("还没有活动数据记录哦~ 多使用一会儿吧！")
+        self.setFixedHeight(self.ROW_HEIGHT * len(categories))
+
+    def set_bars(self, bars: List[Tuple[str, float]]):
+        if bars == self._bars:
+            return
+        self._bars = list(bars)
+        self.update()
+
+    def _label(self, category: str) -> QStaticText:
+        label = self._labels.get(category)
+        if label is None:
+            label = QStaticText(category)
+            label.prepare(font=self.font)
+            self._labels[category] = label
+        return label
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setFont(self.font)
+        if not self._bars:
+            painter.setPen(QColor("#868e96"))
+            painter.drawStaticText(0, 0, self.empty_text)
+            painter.end()
+            return
+
+        text_offset = (self.ROW_HEIGHT - QFontMetrics(self.font).height()) / 2
+        bar_width = max(1, self.width() - self.LABEL_WIDTH - self.VALUE_WIDTH)
+        for row, (category, percentage) in enumerate(self._bars):
+            y = row * self.ROW_HEIGHT
+            painter.setPen(QColor("#212529"))
+            painter.drawStaticText(0, int(y + text_offset), self._label(category))
+
+            # Track, then the filled share
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(QColor("#e9ecef"))
+            track = QRectF(self.LABEL_WIDTH, y + 5, bar_width, self.ROW_HEIGHT - 10)
+            painter.drawRoundedRect(track, 4, 4)
+            painter.setBrush(self._colors.get(category, self.PALETTE[-1]))
+            filled = QRectF(track)
+            filled.setWidth(bar_width * min(percentage, 100.0) / 100.0)
+            painter.drawRoundedRect(filled, 4, 4)
+
+            painter.setPen(QColor("#212529"))
+            painter.drawText(
+                QRectF(self.LABEL_WIDTH + bar_width, y, self.VALUE_WIDTH, self.ROW_HEIGHT),
+                Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter,
+                f"{percentage:.1f}%"
+            )
+        painter.end()
+
+
+class FocusHistogramChart(QWidget):
+    """
+    Focus session lengths per category: one row of small columns per
+    category (one column per length bin) with its session count and
+    longest session, painted directly like ActivityBarChart.
+    """
+    HEADER_HEIGHT = 14
+    ROW_HEIGHT = 26
+    LABEL_WIDTH = 80
+    CAPTION_WIDTH = 110
+
+    def __init__(self, max_rows: int, parent=None):
+        super().__init__(parent)
+        self.font = QFont()
+        self.font.setPixelSize(11)
+        self._bins: List[str] = []
+        self._rows: List[Tuple[str, List[int], str]] = []
+        self.empty_text = QStaticText("还没有完整的专注时段哦~")
+        self.setFixedHeight(self.HEADER_HEIGHT + self.ROW_HEIGHT * max_rows)
+
+    def set_histograms(self, bins: List[str], rows: List[Tuple[str, List[int], str]]):
+        if bins == self._bins and rows == self._rows:
+            return
+        self._bins = list(bins)
+        self._rows = list(rows)
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setFont(self.font)
+        if not self._rows:
+            painter.setPen(QColor("#868e96"))
+            painter.drawStaticText(0, 0, self.empty_text)
+            painter.end()
+            return
+
+        plot_width = max(1, self.width() - self.LABEL_WIDTH - self.CAPTION_WIDTH)
+        column_width = plot_width / len(self._bins)
+        # Bin labels (minutes) above the columns
+        painter.setPen(QColor("#868e96"))
+        for i, label in enumerate(self._bins):
+            painter.drawText(
+                QRectF(self.LABEL_WIDTH + i * column_width, 0, column_width, self.HEADER_HEIGHT),
+                Qt.AlignmentFlag.AlignCenter, label
+            )
+
+        for row, (category, counts, caption) in enumerate(self._rows):
+            top = self.HEADER_HEIGHT + row * self.ROW_HEIGHT
+            painter.setPen(QColor("#212529"))
+            painter.drawText(QRectF(0, top, self.LABEL_WIDTH, self.ROW_HEIGHT),
+                             Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, category)
+            painter.drawText(QRectF(self.LABEL_WIDTH + plot_width, top, self.CAPTION_WIDTH, self.ROW_HEIGHT),
+                             Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter, caption)
+
+            # Columns scaled to this row's busiest bin
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(ActivityBarChart.PALETTE[row % len(ActivityBarChart.PALETTE)])
+            peak = max(counts) or 1
+            usable = self.ROW_HEIGHT - 6
+            for i, count in enumerate(counts):
+                if count:
+                    height = max(2.0, usable * count / peak)
+                    painter.drawRoundedRect(
+                        QRectF(self.LABEL_WIDTH + i * column_width + 3, top + 3 + usable - height,
+                               column_width - 6, height), 2, 2
+                    )
+        painter.end()
+
+
+class RecentActivityModel(QAbstractListModel):
+    """
+    Recent activity rows (newest first) for a QListView.
+    Rows are preformatted by the view model; new entries are inserted at the
+    top and trimmed at the bottom instead of resetting the whole list.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows: List[Tuple[str, str]] = []  # (timestamp key, display text)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and index.isValid():
+            return self._rows[index.row()][1]
+        return None
+
+    def set_rows(self, rows: List[Tuple[str, str]]):
+        old = self._rows
+        new_count = self._count_new_rows(old, rows)
+        if new_count is None:
+            self.beginResetModel()
+            self._rows = list(rows)
+            self.endResetModel()
+            return
+        if new_count:
+            self.beginInsertRows(QModelIndex(), 0, new_count - 1)
+            self._rows = list(rows[:new_count]) + old
+            self.endInsertRows()
+        if len(self._rows) > len(rows):
+            self.beginRemoveRows(QModelIndex(), len(rows), len(self._rows) - 1)
+            del self._rows[len(rows):]
+            self.endRemoveRows()
+
+    @staticmethod
+    def _count_new_rows(old, new):
+        """How many rows were prepended to `old` to get `new`, or None if it isn't a prepend."""
+        if not old:
+            return None
+        newest_key = old[0][0]
+        for i, row in enumerate(new):
+            if row[0] == newest_key:
+                # Everything after the match must be the old rows, possibly trimmed
+                kept = len(new) - i
+                if kept <= len(old) and new[-1][0] == old[kept - 1][0]:
+                    return i
+                return None
+        return None
+
+
 class StatisticsWindow(QDialog):
-    """Window to display activity statistics."""
-    
+    """
+    Window to display activity statistics.
+    The view model is rebuilt on a worker thread whenever activity is
+    recorded (no polling) and only while the window is visible.
+    """
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("喵喵的活动统计 ?")
         self.setModal(False)  # Non-modal so it doesn't block the pet
         self.setWindowFlags(
-            Qt.WindowType.Window | 
+            Qt.WindowType.Window |
             Qt.WindowType.WindowStaysOnTopHint |
             Qt.WindowType.WindowTitleHint |
             Qt.WindowType.WindowCloseButtonHint
         )
-        
+
         # Set size
-        self.setFixedSize(400, 500)
-        
+        self.setFixedSize(400, 720)
+
         # Layout
         layout = QVBoxLayout(self)
         layout.setContentsMargins(20, 20, 20, 20)
-        layout.setSpacing(15)
-        
+        layout.setSpacing(10)
+
         # Title
         title_label = QLabel("? 喵喵的活动统计")
         title_font = QFont()
@@ -35,22 +239,49 @@ class StatisticsWindow(QDialog):
         title_label.setFont(title_font)
         title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(title_label)
-        
-        # Statistics display
-        self.stats_display = QTextEdit()
-        self.stats_display.setReadOnly(True)
-        self.stats_display.setFont(QFont("Courier", 12))
-        self.stats_display.setStyleSheet("""
-            QTextEdit {
+
+        # Totals
+        self.summary_label = QLabel("")
+        self.summary_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.summary_label)
+
+        # Category breakdown
+        activity_tracker = state_service.activity_tracker
+        self.bar_chart = ActivityBarChart(activity_tracker.ACTIVITY_CATEGORIES)
+        layout.addWidget(self.bar_chart)
+
+        # Focus sessions: lengths per dominant category, plus the ongoing one
+        layout.addWidget(QLabel("专注时段:"))
+        self.focus_chart = FocusHistogramChart(StatsViewModelBuilder.FOCUS_ROWS)
+        layout.addWidget(self.focus_chart)
+        self.current_focus_label = QLabel("")
+        self.current_focus_label.setStyleSheet("color: #495057;")
+        layout.addWidget(self.current_focus_label)
+
+        # Recent activities (virtualized: only visible rows are laid out)
+        layout.addWidget(QLabel("? 最近的活动记录:"))
+        self.recent_model = RecentActivityModel(self)
+        self.recent_list = QListView()
+        self.recent_list.setModel(self.recent_model)
+        self.recent_list.setUniformItemSizes(True)
+        self.recent_list.setEditTriggers(QListView.EditTrigger.NoEditTriggers)
+        self.recent_list.setSelectionMode(QListView.SelectionMode.NoSelection)
+        self.recent_list.setStyleSheet("""
+            QListView {
                 background-color: #f8f9fa;
                 border: 2px solid #dee2e6;
                 border-radius: 8px;
-                padding: 10px;
+                padding: 4px;
                 color: #212529;
             }
         """)
-        layout.addWidget(self.stats_display)
-        
+        layout.addWidget(self.recent_list, 1)
+
+        self.updated_label = QLabel("")
+        self.updated_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.updated_label.setStyleSheet("color: #868e96;")
+        layout.addWidget(self.updated_label)
+
         # Refresh button
         self.refresh_button = QPushButton("? 刷新统计")
         self.refresh_button.setStyleSheet("""
@@ -72,7 +303,26 @@ class StatisticsWindow(QDialog):
         """)
         self.refresh_button.clicked.connect(self.refresh_statistics)
         layout.addWidget(self.refresh_button)
-        
+
+        # Album of archived screenshots (created on demand)
+        self.album_window = None
+        self.album_button = QPushButton("回忆相册")
+        self.album_button.setStyleSheet("""
+            QPushButton {
+                background-color: #4dabf7;
+                color: white;
+                border: none;
+                border-radius: 6px;
+                padding: 8px 16px;
+                font-size: 14px;
+            }
+            QPushButton:hover {
+                background-color: #339af0;
+            }
+        """)
+        self.album_button.clicked.connect(self.show_album)
+        layout.addWidget(self.album_button)
+
         # Close button
         self.close_button = QPushButton("关闭")
         self.close_button.setStyleSheet("""
@@ -90,40 +340,52 @@ class StatisticsWindow(QDialog):
         """)
         self.close_button.clicked.connect(self.close)
         layout.addWidget(self.close_button)
-        
+
+        # Background view model builds, pushed on data changes
+        self.view_model_service = StatsViewModelService(activity_tracker, self)
+        self.view_model_service.ready.connect(self._apply_view_model)
+        self._stale = True
+        state_service.activity_changed.connect(self._on_activity_changed)
+
         # Initial load
         self.refresh_statistics()
-        
-        # Auto-refresh timer (every 30 seconds while window is open)
-        self.auto_refresh_timer = QTimer()
-        self.auto_refresh_timer.timeout.connect(self.refresh_statistics)
-        self.auto_refresh_timer.start(30000)  # 30 seconds
-    
-    def refresh_statistics(self):
-        """Refresh the statistics display."""
-        stats_text = activity_tracker.get_formatted_statistics()
-        self.stats_display.setPlainText(stats_text)
-        
-        # Also show recent activities if available
-        stats = activity_tracker.get_statistics()
-        if stats["recent_activities"]:
-            self.stats_display.append("\n\n? 最近的活动记录:")
-            self.stats_display.append("-" * 30)
-            
-            for i, activity in enumerate(reversed(stats["recent_activities"][:5]), 1):
-                time_str = activity_tracker._format_time(activity["timestamp"])
-                top_categories = sorted(
-                    activity["breakdown"].items(), 
-                    key=lambda x: x[1], 
-                    reverse=True
-                )[:2]  # Top 2 categories
-                
-                if top_categories:
-                    cat_str = ", ".join([f"{cat}: {pct:.0f}%" for cat, pct in top_categories if pct > 0])
-                    self.stats_display.append(f"\n{i}. {time_str}")
-                    self.stats_display.append(f"   主要活动: {cat_str}")
-    
-    def closeEvent(self, event):
-        """Stop the auto-refresh timer when window is closed."""
-        self.auto_refresh_timer.stop()
-        event.accept() 
\ No newline at end of file
+
+    def refresh_statistics(self, *args):
+        """Rebuild the statistics from the current snapshot (in the background)."""
+        self._stale = False
+        self.view_model_service.request(state_service.activity_snapshot())
+
+    def show_album(self, *args):
+        """Open the screenshot album next to this window."""
+        if self.album_window is None:
+            self.album_window = AlbumWindow(self)
+        self.album_window.show()
+        self.album_window.raise_()
+        self.album_window.activateWindow()
+
+    def _on_activity_changed(self, snapshot):
+        if self.isVisible():
+            self._stale = False
+            self.view_model_service.request(snapshot)
+        else:
+            # Rebuilt when the window is shown again
+            self._stale = True
+
+    def _apply_view_model(self, model: StatsViewModel):
+        """Push a finished view model into the widgets (GUI thread)."""
+        if model.is_empty:
+            self.summary_label.setText("")
+        else:
+            self.summary_label.setText(
+                f"? 共分析 {model.total_analyses} 次   今天: {model.today_count} 次   本周: {model.week_count} 次"
+            )
+        self.bar_chart.set_bars(model.bars)
+        self.focus_chart.set_histograms(model.focus_bins, model.focus_rows)
+        self.current_focus_label.setText(model.current_focus)
+        self.recent_model.set_rows(model.recent_rows)
+        self.updated_label.setText("" if model.is_empty else f"最后更新: {model.last_updated}")
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._stale:
+            self.refresh_statistics()
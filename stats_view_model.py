@@ -0,0 +1,174 @@
+# stats_view_model.py
+import logging
+from datetime import datetime
+from typing import Dict, List, Mapping, Tuple
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from activity_tracker import ActivityTracker
+
+logger = logging.getLogger(__name__)
+
+
+class StatsViewModel:
+    """
+    Everything the statistics window shows, fully preformatted.
+    Built off the GUI thread, so painting and list scrolling only read
+    ready-made strings and numbers.
+    """
+
+    def __init__(self, total_analyses: int, bars: List[Tuple[str, float]], today_count: int,
+                 week_count: int, last_updated: str, recent_rows: List[Tuple[str, str]],
+                 focus_bins: List[str] = (), focus_rows: List[Tuple[str, List[int], str]] = (),
+                 current_focus: str = ""):
+        self.total_analyses = total_analyses
+        self.bars = bars  # (category, percentage), largest first, non-zero only
+        self.today_count = today_count
+        self.week_count = week_count
+        self.last_updated = last_updated
+        self.recent_rows = recent_rows  # (timestamp key, display text), newest first
+        self.focus_bins = list(focus_bins)  # Session length bin labels (minutes)
+        self.focus_rows = list(focus_rows)  # (category, count per bin, caption), most focused first
+        self.current_focus = current_focus  # e.g. "当前专注: 工作编程 45分钟", or ""
+
+    @property
+    def is_empty(self) -> bool:
+        return self.total_analyses == 0
+
+
+class StatsViewModelBuilder:
+    """
+    Turns an activity snapshot plus the recent history into a StatsViewModel.
+    History entries never change once written, so each entry's formatted row
+    is cached by timestamp and an update only formats the new entries.
+    """
+
+    FOCUS_ROWS = 3  # Categories shown in the focus session histogram
+
+    def __init__(self, tracker: ActivityTracker, max_rows: int = ActivityTracker.MAX_HISTORY):
+        self.tracker = tracker
+        self.max_rows = max_rows
+        self._row_cache: Dict[str, Tuple[str, str]] = {}
+
+    @staticmethod
+    def format_time(iso_time: str) -> str:
+        try:
+            return datetime.fromisoformat(iso_time).strftime("%Y-%m-%d %H:%M:%S")
+        except (TypeError, ValueError):
+            return str(iso_time)
+
+    @staticmethod
+    def format_minutes(minutes: float) -> str:
+        hours, minutes = divmod(int(minutes), 60)
+        return f"{hours}小时{minutes}分" if hours else f"{minutes}分钟"
+
+    def _focus(self, snapshot: Mapping) -> Tuple[List[str], List[Tuple[str, List[int], str]], str]:
+        sessions = snapshot.get("focus_sessions")
+        if not sessions:
+            return [], [], ""
+        totals = sessions["totals"]
+        top = sorted(totals, key=lambda cat: totals[cat]["minutes"], reverse=True)[:self.FOCUS_ROWS]
+        rows = [
+            (cat, list(sessions["histograms"][cat]),
+             f"{totals[cat]['count']} 次 · 最长 {self.format_minutes(totals[cat]['longest'])}")
+            for cat in top
+        ]
+        current = snapshot.get("current_focus")
+        current_text = f"当前专注: {current['category']} {self.format_minutes(current['minutes'])}" if current else ""
+        return list(sessions["bins"]), rows, current_text
+
+    def _row(self, activity: Mapping) -> Tuple[str, str]:
+        key = activity["timestamp"]
+        row = self._row_cache.get(key)
+        if row is None:
+            top_categories = sorted(activity["breakdown"].items(), key=lambda x: x[1], reverse=True)[:2]
+            summary = ", ".join(f"{cat}: {pct:.0f}%" for cat, pct in top_categories if pct > 0)
+            row = (key, f"{self.format_time(key)}   主要活动: {summary or '其他'}")
+            self._row_cache[key] = row
+        return row
+
+    def build(self, snapshot: Mapping) -> StatsViewModel:
+        history = self.tracker.get_recent_activities(self.max_rows)
+        rows = [self._row(activity) for activity in reversed(history)]
+        # Drop cached rows that have scrolled out of the kept history
+        if len(self._row_cache) > 2 * self.max_rows:
+            self._row_cache = {row[0]: row for row in rows}
+
+        bars = sorted(
+            ((cat, pct) for cat, pct in snapshot["percentages"].items() if pct > 0),
+            key=lambda x: x[1],
+            reverse=True
+        )
+        focus_bins, focus_rows, current_focus = self._focus(snapshot)
+        return StatsViewModel(
+            total_analyses=snapshot["total_analyses"],
+            bars=bars,
+            today_count=snapshot["today"]["count"] if "today" in snapshot else 0,
+            week_count=snapshot["this_week"]["count"] if "this_week" in snapshot else 0,
+            last_updated=self.format_time(snapshot["last_updated"]),
+            recent_rows=rows,
+            focus_bins=focus_bins,
+            focus_rows=focus_rows,
+            current_focus=current_focus,
+        )
+
+
+class _BuildSignals(QObject):
+    finished = pyqtSignal(int, object)  # (generation, StatsViewModel)
+
+
+class _BuildTask(QRunnable):
+    def __init__(self, builder: StatsViewModelBuilder, snapshot: Mapping, generation: int, signals: _BuildSignals):
+        super().__init__()
+        self.builder = builder
+        self.snapshot = snapshot
+        self.generation = generation
+        self.signals = signals
+
+    def run(self):
+        model = None
+        try:
+            model = self.builder.build(self.snapshot)
+        except Exception as e:
+            logger.error("Failed to build statistics view model: %s", e)
+        # Always report back so the service does not stay marked as busy
+        self.signals.finished.emit(self.generation, model)
+
+
+class StatsViewModelService(QObject):
+    """
+    Rebuilds the view model on the global thread pool when asked.
+    At most one build runs at a time; requests that arrive meanwhile are
+    coalesced into a single rebuild from the newest snapshot. `ready` is
+    delivered on the thread that owns this object (the GUI thread).
+    """
+
+    ready = pyqtSignal(object)  # StatsViewModel
+
+    def __init__(self, tracker: ActivityTracker, parent=None):
+        super().__init__(parent)
+        self.builder = StatsViewModelBuilder(tracker)
+        self._signals = _BuildSignals(self)
+        self._signals.finished.connect(self._on_finished)
+        self._generation = 0
+        self._running = False
+        self._pending_snapshot = None
+
+    def request(self, snapshot: Mapping):
+        """Schedule a rebuild from `snapshot` (an immutable StateService snapshot)."""
+        if self._running:
+            self._pending_snapshot = snapshot
+            return
+        self._start(snapshot)
+
+    def _start(self, snapshot: Mapping):
+        self._running = True
+        self._generation += 1
+        QThreadPool.globalInstance().start(_BuildTask(self.builder, snapshot, self._generation, self._signals))
+
+    def _on_finished(self, generation: int, model: StatsViewModel):
+        self._running = False
+        if self._pending_snapshot is not None:
+            snapshot, self._pending_snapshot = self._pending_snapshot, None
+            self._start(snapshot)
+        if model is not None and generation == self._generation:
+            self.ready.emit(model)
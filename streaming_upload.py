@@ -0,0 +1,155 @@
+# streaming_upload.py
+import base64
+import json
+import logging
+import os
+from typing import Iterator, Tuple
+
+from openai import APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+from openai.types.chat import ChatCompletion
+
+import config
+
+# --- Optional dependency: httpx (installed with openai); without it the SDK client uploads ---
+HTTPX_AVAILABLE = False
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+_IMAGE_PLACEHOLDER = "__STREAMED_IMAGE_DATA__"
+
+
+class UploadTooLargeError(Exception):
+    """The request body would exceed the configured size limit."""
+
+
+def encoded_size(raw_bytes: int) -> int:
+    """Length of the base64 encoding of `raw_bytes` bytes."""
+    return 4 * ((raw_bytes + 2) // 3)
+
+
+class StreamingVisionClient:
+    """
+    Chat-completions client for one-image vision requests that never holds
+    the encoded image in memory.
+    The JSON body is assembled around a placeholder; the image is read and
+    base64-encoded in chunks (multiples of 3 bytes, so chunks concatenate
+    into one valid base64 string) directly into the request stream. The
+    exact body length is known up front, so it is sent with a
+    Content-Length instead of chunked transfer encoding, and the size limit
+    is checked both before sending and while streaming.
+    Errors are raised as the same openai exception types the SDK client
+    raises, so callers handle both paths identically. Sending requires
+    httpx (HTTPX_AVAILABLE); building bodies does not.
+    """
+
+    def __init__(self, api_key: str, base_url: str,
+                 chunk_size: int = config.STREAMING_UPLOAD_CHUNK_BYTES,
+                 max_image_bytes: int = config.API_MAX_IMAGE_BYTES):
+        self.api_key = api_key
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        # Whole base64 quanta per chunk
+        self.chunk_size = max(3, chunk_size - chunk_size % 3)
+        self.max_image_bytes = max_image_bytes
+        self._http = httpx.Client() if HTTPX_AVAILABLE else None
+
+    # --- Body ---
+    def _envelope(self, model: str, prompt: str, mime_type: str) -> Tuple[bytes, bytes]:
+        """JSON bytes before and after the base64 image data."""
+        body = {
+            "model": model,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                        {"type": "image_url",
+                         "image_url": {"url": f"data:{mime_type};base64,{_IMAGE_PLACEHOLDER}"}}
+                    ]
+                }
+            ],
+        }
+        head, tail = json.dumps(body, ensure_ascii=False).split(_IMAGE_PLACEHOLDER)
+        return head.encode("utf-8"), tail.encode("utf-8")
+
+    def image_data_size(self, image_path: str) -> int:
+        """Size of the image's base64 data in the request (what the API limit applies to)."""
+        return encoded_size(os.path.getsize(image_path))
+
+    def iter_body(self, model: str, prompt: str, image_path: str,
+                  mime_type: str = "image/png") -> Tuple[int, Iterator[bytes]]:
+        """(exact body length, iterator over body chunks) for one request."""
+        data_size = self.image_data_size(image_path)
+        if data_size > self.max_image_bytes:
+            raise UploadTooLargeError(
+                f"Encoded image is {data_size} bytes, limit is {self.max_image_bytes}")
+        head, tail = self._envelope(model, prompt, mime_type)
+
+        def chunks() -> Iterator[bytes]:
+            yield head
+            sent = 0
+            with open(image_path, "rb") as image_file:
+                while True:
+                    raw = image_file.read(self.chunk_size)
+                    if not raw:
+                        break
+                    encoded = base64.b64encode(raw)
+                    sent += len(encoded)
+                    # The file may have grown since the length was computed
+                    if sent > data_size or sent > self.max_image_bytes:
+                        raise UploadTooLargeError("Image grew past the announced size while uploading")
+                    yield encoded
+            if sent != data_size:
+                raise UploadTooLargeError("Image changed size while uploading")
+            yield tail
+
+        return len(head) + data_size + len(tail), chunks()
+
+    # --- Request ---
+    def create(self, model: str, prompt: str, image_path: str, timeout: float,
+               mime_type: str = "image/png") -> ChatCompletion:
+        """Send one prompt + image and return the parsed ChatCompletion."""
+        if self._http is None:
+            raise RuntimeError("Streamed uploads require httpx")
+        length, body = self.iter_body(model, prompt, image_path, mime_type)
+        request = self._http.build_request(
+            "POST", self.url,
+            content=body,
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+                "Content-Length": str(length),
+            },
+            timeout=timeout,
+        )
+        logger.debug("Streaming %s byte request body to %s", length, self.url)
+        try:
+            response = self._http.send(request)
+        except httpx.TimeoutException as e:
+            raise APITimeoutError(request=request) from e
+        except httpx.TransportError as e:
+            raise APIConnectionError(request=request) from e
+
+        if response.status_code >= 400:
+            raise self._status_error(response)
+        return ChatCompletion.model_construct(**response.json())
+
+    @staticmethod
+    def _status_error(response: "httpx.Response") -> APIStatusError:
+        try:
+            body = response.json()
+        except ValueError:
+            body = response.text or None
+        error = body.get("error", body) if isinstance(body, dict) else body
+        message = error.get("message", str(error)) if isinstance(error, dict) else str(error)
+        message = f"Error code: {response.status_code} - {message}"
+        error_class: type = RateLimitError if response.status_code == 429 else APIStatusError
+        return error_class(message, response=response, body=error)
+
+    def close(self):
+        if self._http is not None:
+            self._http.close()
@@ -0,0 +1,8 @@
+# conftest.py
+import os
+import sys
+import tempfile
+
+# Modules live at the repository root; state files go to a scratch directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("PET_STATE_DIR", tempfile.mkdtemp(prefix="cat_pet_tests_"))
@@ -0,0 +1,55 @@
+# test_fleet_server.py
+import pytest
+
+import fleet_server
+from fleet_server import TokenBucket, hash_distance
+
+
+class Monotonic:
+    """Stands in for time.monotonic() so refills are deterministic."""
+
+    def __init__(self):
+        self.value = 1000.0
+
+    def __call__(self) -> float:
+        return self.value
+
+
+@pytest.fixture
+def monotonic(monkeypatch):
+    fake = Monotonic()
+    monkeypatch.setattr(fleet_server.time, "monotonic", fake)
+    return fake
+
+
+def test_burst_then_wait(monotonic):
+    bucket = TokenBucket(rate_per_minute=6, burst=3)
+    assert [bucket.take() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take() == pytest.approx(10.0)  # One token every 10 s
+    assert bucket.tokens == pytest.approx(0.0)  # A refused take spends nothing
+
+
+def test_refill_is_gradual_and_capped(monotonic):
+    bucket = TokenBucket(rate_per_minute=6, burst=3)
+    for _ in range(3):
+        bucket.take()
+    monotonic.value += 4
+    assert bucket.take() == pytest.approx(6.0)
+    monotonic.value += 6
+    assert bucket.take() == 0.0
+    monotonic.value += 3600
+    assert [bucket.take() for _ in range(4)][:3] == [0.0, 0.0, 0.0]
+    assert bucket.tokens == pytest.approx(0.0)
+
+
+def test_zero_rate_never_refills(monotonic):
+    bucket = TokenBucket(rate_per_minute=0, burst=1)
+    assert bucket.take() == 0.0
+    monotonic.value += 3600
+    assert bucket.take() == 60.0
+
+
+def test_hash_distance():
+    assert hash_distance("0000000000000000", "0000000000000000") == 0
+    assert hash_distance("0000000000000000", "000000000000000f") == 4
+    assert hash_distance("ffffffffffffffff", "0000000000000000") == 64
@@ -0,0 +1,89 @@
+# test_focus_sessions.py
+from datetime import datetime, timedelta
+
+import pytest
+
+import config
+from focus_sessions import FocusSessionizer
+
+START = datetime(2026, 10, 1, 9, 0)
+WORK, PLAY = "工作编程", "娱乐休闲"
+
+
+@pytest.fixture(autouse=True)
+def focus_config(monkeypatch):
+    monkeypatch.setattr(config, "FOCUS_GAP_TOLERANCE_MINUTES", 10)
+    monkeypatch.setattr(config, "FOCUS_MERGE_INTERRUPTION_MINUTES", 5)
+
+
+@pytest.fixture
+def sessions():
+    return FocusSessionizer(FocusSessionizer.new_state(), bins=[5, 15, 30, 60, 120, 240])
+
+
+def feed(sessions, samples):
+    """samples: (minutes after START, category)."""
+    for minute, category in samples:
+        sessions.add((START + timedelta(minutes=minute)).isoformat(), {category: 80.0, "其他": 20.0})
+
+
+def closed(sessions):
+    return {cat: total["count"] for cat, total in sessions.state["totals"].items()}
+
+
+def test_same_category_extends_one_session(sessions):
+    feed(sessions, [(m, WORK) for m in range(0, 40, 2)])
+    current = sessions.state["current"]
+    assert current["category"] == WORK and current["samples"] == 20
+    assert sessions.length(current) == 38
+    assert closed(sessions) == {}
+
+
+def test_gap_ends_the_session(sessions):
+    feed(sessions, [(0, WORK), (8, WORK), (30, WORK)])
+    assert closed(sessions) == {WORK: 1}
+    assert sessions.state["totals"][WORK]["minutes"] == 8
+    assert sessions.state["current"]["start"] == (START + timedelta(minutes=30)).isoformat()
+
+
+def test_brief_detour_is_merged(sessions):
+    feed(sessions, [(0, WORK), (5, WORK), (7, PLAY), (10, PLAY), (12, WORK), (20, WORK)])
+    current = sessions.state["current"]
+    assert current["category"] == WORK
+    assert current["start"] == START.isoformat() and current["samples"] == 6
+    assert sessions.state["previous"] is None
+
+
+def test_long_detour_is_its_own_session(sessions):
+    feed(sessions, [(0, WORK), (5, WORK), (7, PLAY), (14, PLAY), (16, WORK)])
+    assert sessions.state["current"]["category"] == WORK
+    assert sessions.state["previous"]["category"] == PLAY
+    assert closed(sessions) == {WORK: 1}
+
+
+def test_samples_without_a_dominant_category_are_ignored(sessions):
+    sessions.add(START.isoformat(), {})
+    sessions.add(START.isoformat(), {WORK: 0.0})
+    assert sessions.state == FocusSessionizer.new_state()
+
+
+def test_current_session_expires_after_the_gap(sessions):
+    feed(sessions, [(m, WORK) for m in range(0, 25, 5)])
+    live = sessions.current(START + timedelta(minutes=25))
+    assert live == {"category": WORK, "start": START.isoformat(), "minutes": 25.0}
+    assert sessions.current(START + timedelta(minutes=31)) is None  # Last seen at 20
+
+
+def test_summary_counts_open_sessions_without_closing_them(sessions):
+    feed(sessions, [(m, WORK) for m in range(0, 45, 5)] + [(50, PLAY), (56, PLAY)])
+    summary = sessions.summary()
+    assert summary["bins"] == ["<5", "5+", "15+", "30+", "1h+", "2h+", "4h+"]
+    assert summary["histograms"][WORK] == [0, 0, 0, 1, 0, 0, 0]  # 40 minutes
+    assert summary["histograms"][PLAY] == [0, 1, 0, 0, 0, 0, 0]  # 6 minutes
+    assert summary["totals"][WORK] == {"count": 1, "minutes": 40.0, "longest": 40.0}
+    assert sessions.state["histograms"] == {} and sessions.state["totals"] == {}
+
+
+@pytest.mark.parametrize("minutes, index", [(0, 0), (4.9, 0), (5, 1), (59, 3), (60, 4), (240, 6), (1000, 6)])
+def test_bin_index_edges(sessions, minutes, index):
+    assert sessions.bin_index(minutes) == index
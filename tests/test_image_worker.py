@@ -0,0 +1,96 @@
+# test_image_worker.py
+import os
+
+import pytest
+from PIL import Image
+
+import image_worker
+from image_worker import ImageWorkerError, ImageWorkerPool
+
+
+@pytest.fixture
+def pool():
+    pool = ImageWorkerPool()
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture
+def screenshot(tmp_path):
+    path = str(tmp_path / "screen.png")
+    Image.new("RGB", (800, 400), "white").save(path)
+    return path
+
+
+def kill_idle_worker(pool):
+    worker = pool._idle.queue[0]
+    worker.process.kill()
+    worker.process.wait()
+    return worker
+
+
+def test_jobs_run_inline_until_started(pool, screenshot):
+    assert pool.run("ping") == os.getpid()
+    assert pool.run("resize_png", screenshot, [200, 200]) == {"source": [800, 400], "result": [200, 100]}
+    assert Image.open(screenshot).size == (200, 100)
+    assert pool.stats["inline"] == 2
+
+
+def test_jobs_run_in_worker_processes(pool, screenshot):
+    pool.start(2, 1, 10)
+    assert pool.run("ping") != os.getpid()
+    assert pool.run("resize_png", screenshot, [400, 400])["result"] == [400, 200]
+    assert pool.stats["jobs"] == 2 and pool.stats["inline"] == 0
+
+
+def test_failing_job_keeps_its_worker(pool, tmp_path):
+    pool.start(1, 0, 10)
+    pid = pool.run("ping")
+    with pytest.raises(ImageWorkerError, match="FileNotFoundError"):
+        pool.run("resize_png", str(tmp_path / "missing.png"), [10, 10])
+    assert pool.run("ping") == pid
+    assert pool.stats["restarts"] == 0
+
+
+def test_dead_worker_is_replaced(pool):
+    pool.start(2, 1, 10)
+    dead = kill_idle_worker(pool)
+    with pytest.raises(ImageWorkerError):
+        pool.run("ping")
+    assert pool.stats["restarts"] == 1
+    assert dead not in pool._workers and dead not in pool._idle.queue
+    assert len(pool._workers) == 2 and pool._idle.qsize() == 2
+    assert {pool.run("ping"), pool.run("ping")}.isdisjoint({dead.process.pid, os.getpid()})
+
+
+def test_pool_shrinks_then_runs_inline_when_workers_cannot_restart(pool, monkeypatch):
+    pool.start(2, 1, 10)
+
+    def broken_worker():
+        raise OSError(24, "Too many open files")
+
+    monkeypatch.setattr(image_worker, "_Worker", broken_worker)
+    dead = kill_idle_worker(pool)
+    with pytest.raises(ImageWorkerError):
+        pool.run("ping")
+    assert pool.stats["lost"] == 1 and pool.running
+    assert dead not in pool._workers and dead not in pool._idle.queue
+
+    kill_idle_worker(pool)
+    with pytest.raises(ImageWorkerError):
+        pool.run("ping")
+    assert pool.stats["lost"] == 2 and not pool.running
+    assert not pool._workers and pool._idle.empty()
+    assert pool.run("ping") == os.getpid()
+
+
+def test_shutdown_closes_every_worker(pool):
+    pool.start(2, 0, 10)
+    busy = pool._idle.get()  # As if running a job
+    idle = pool._idle.queue[0]
+    pool.shutdown()
+    assert busy.process.poll() is not None and idle.process.poll() is not None
+    assert not pool._workers
+    pool._release(busy)  # The job finishing after shutdown must not requeue it
+    assert pool._idle.empty()
+    assert pool.run("ping") == os.getpid()
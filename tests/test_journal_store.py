@@ -0,0 +1,107 @@
+# test_journal_store.py
+import json
+
+import pytest
+
+from journal_store import JournalStore
+from persistence import PersistenceWriter
+
+
+@pytest.fixture
+def writer():
+    writer = PersistenceWriter(debounce_seconds=0)
+    yield writer
+    writer.shutdown()
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return str(tmp_path / "state.json")
+
+
+def write_lines(path, lines):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("".join(line + "\n" for line in lines))
+
+
+def test_append_and_reload(snapshot_path, writer):
+    store = JournalStore(snapshot_path, compact_every=10, writer=writer)
+    store.load()
+    for i in range(3):
+        assert store.append({"type": "tick", "n": i}) is False
+    writer.flush()
+
+    snapshot, events = JournalStore(snapshot_path, writer=writer).load()
+    assert snapshot == {}
+    assert events == [{"type": "tick", "n": 0}, {"type": "tick", "n": 1}, {"type": "tick", "n": 2}]
+
+
+def test_append_reports_when_compaction_is_due(snapshot_path, writer):
+    store = JournalStore(snapshot_path, compact_every=2, writer=writer)
+    store.load()
+    assert store.append({"n": 1}) is False
+    assert store.append({"n": 2}) is True
+
+
+def test_compact_truncates_journal(snapshot_path, writer):
+    store = JournalStore(snapshot_path, compact_every=10, writer=writer)
+    store.load()
+    store.append({"n": 1})
+    store.append({"n": 2})
+    store.compact({"total": 2})
+    store.append({"n": 3})
+    writer.flush()
+
+    with open(store.journal_path, encoding="utf-8") as f:
+        assert [json.loads(line)["seq"] for line in f] == [3]
+    reloaded = JournalStore(snapshot_path, writer=writer)
+    snapshot, events = reloaded.load()
+    assert snapshot == {"total": 2}
+    assert events == [{"n": 3}]
+    assert reloaded.seq == 3
+
+
+def test_torn_final_line_is_skipped_and_repaired(snapshot_path, writer):
+    store = JournalStore(snapshot_path, writer=writer)
+    write_lines(store.journal_path, ['{"n":1,"seq":1}', '{"n":2,"seq":2}', '{"n":3,"se'])
+
+    snapshot, events = store.load()
+    assert events == [{"n": 1}, {"n": 2}]
+    with open(store.journal_path, encoding="utf-8") as f:
+        assert f.read() == '{"n":1,"seq":1}\n{"n":2,"seq":2}\n'
+
+    # Appends after the repair start on a clean line
+    store.append({"n": 3})
+    writer.flush()
+    _, events = JournalStore(snapshot_path, writer=writer).load()
+    assert events == [{"n": 1}, {"n": 2}, {"n": 3}]
+
+
+def test_events_folded_into_snapshot_are_skipped(snapshot_path, writer):
+    # Crash between writing the snapshot and truncating the journal
+    store = JournalStore(snapshot_path, writer=writer)
+    with open(snapshot_path, "w", encoding="utf-8") as f:
+        json.dump({"total": 2, JournalStore.SEQ_KEY: 2}, f)
+    write_lines(store.journal_path, ['{"n":1,"seq":1}', '{"n":2,"seq":2}', '{"n":3,"seq":3}'])
+
+    snapshot, events = store.load()
+    assert snapshot == {"total": 2}
+    assert events == [{"n": 3}]
+    assert store.seq == 3
+
+
+def test_duplicated_lines_from_a_retried_flush_are_skipped(snapshot_path, writer):
+    store = JournalStore(snapshot_path, writer=writer)
+    write_lines(store.journal_path, ['{"n":1,"seq":1}', '{"n":2,"seq":2}', '{"n":2,"seq":2}', '{"n":3,"seq":3}'])
+
+    _, events = store.load()
+    assert events == [{"n": 1}, {"n": 2}, {"n": 3}]
+
+
+def test_unreadable_snapshot_is_moved_aside(snapshot_path, writer, tmp_path):
+    with open(snapshot_path, "w", encoding="utf-8") as f:
+        f.write("{not json")
+
+    snapshot, events = JournalStore(snapshot_path, writer=writer).load()
+    assert snapshot == {} and events == []
+    assert any(p.name.startswith("state.json.corrupt-") for p in tmp_path.iterdir())
@@ -0,0 +1,72 @@
+# test_keyword_matcher.py
+import random
+
+import pytest
+
+import config
+from keyword_matcher import KeywordMatcher, keyword_matcher
+
+
+def naive_keywords(tables, text):
+    """The per-keyword `in` checks the matcher replaced."""
+    text = text.lower()
+    return {keyword.lower() for labels in tables.values() for weighted in labels.values()
+            for keyword in weighted if keyword.lower() in text}
+
+
+def naive_scores(table, text):
+    text = text.lower()
+    scores = {}
+    for label, weighted in table.items():
+        for keyword, weight in weighted.items():
+            if keyword.lower() in text:
+                scores[label] = scores.get(label, 0.0) + weight
+    return scores
+
+
+OVERLAPPING = {
+    "t": {
+        "x": {"ab": 1.0, "abc": 2.0, "b": 0.5},
+        "y": {"bc": 1.0, "c": 0.25, "abcd": 3.0},
+        "z": {"编程": 1.0, "编": 0.5, "程序": 2.0},
+    }
+}
+
+
+@pytest.mark.parametrize("text", ["", "abcd", "xxabcxx", "ABC", "bcd", "编程序", "no match", "aab bc"])
+def test_overlapping_keywords_match_like_in(text):
+    matcher = KeywordMatcher(OVERLAPPING)
+    hits = matcher.match(text)
+    assert hits.keywords == naive_keywords(OVERLAPPING, text)
+    assert hits.scores("t") == pytest.approx(naive_scores(OVERLAPPING["t"], text))
+    assert bool(hits) == bool(hits.keywords)
+
+
+def test_random_texts_match_like_in():
+    rng = random.Random(7)
+    matcher = KeywordMatcher(OVERLAPPING)
+    alphabet = "abcd 编程序"
+    for _ in range(2000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randrange(0, 12)))
+        assert matcher.match(text).keywords == naive_keywords(OVERLAPPING, text), text
+
+
+def test_config_tables_match_like_in():
+    keywords = sorted({keyword for weighted in config.ACTIVITY_KEYWORDS.values() for keyword in weighted})
+    rng = random.Random(11)
+    for _ in range(300):
+        words = rng.sample(keywords, rng.randrange(0, 5))
+        text = "主人正在" + "，".join(w.upper() if rng.random() < 0.3 else w for w in words) + "喵"
+        hits = keyword_matcher.match(text)
+        assert hits.scores("activity") == pytest.approx(naive_scores(config.ACTIVITY_KEYWORDS, text)), text
+
+
+def test_favorability_labels():
+    hits = keyword_matcher.match("主人在写代码，还在看 Cat Video")
+    assert hits.labels("favorability") == {"一起工作", "看其他猫咪"}
+
+
+def test_empty_tables():
+    matcher = KeywordMatcher({"t": {}})
+    assert not matcher.match("anything")
+    assert matcher.match("anything").scores("t") == {}
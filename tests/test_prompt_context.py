@@ -0,0 +1,111 @@
+# test_prompt_context.py
+from datetime import datetime, timedelta
+
+import pytest
+
+import config
+from prompt_context import RECENT_HEADER, PromptContextManager, estimate_tokens
+
+BASE_PROMPT = "你是一只可爱的猫咪，请根据截图说一句话。" * 5
+START = datetime(2026, 10, 1, 9, 0)
+
+
+@pytest.fixture(autouse=True)
+def context_config(monkeypatch):
+    monkeypatch.setattr(config, "PROMPT_RECENT_MESSAGES", 3)
+    monkeypatch.setattr(config, "PROMPT_RECENT_MESSAGE_MAX_CHARS", 20)
+    monkeypatch.setattr(config, "PROMPT_SUMMARY_REFRESH_MESSAGES", 4)
+    monkeypatch.setattr(config, "PROMPT_SUMMARY_DECAY", 0.9)
+
+
+def messages(count):
+    replies = ["哇塞！主人在写代码呀，好厉害", "哇塞！又在玩游戏了喵", "喵~ 深夜了还在看动漫", "主人今天好忙"]
+    return [{"text": f"{replies[i % len(replies)]}（{i}）", "timestamp": (START + timedelta(minutes=i)).isoformat()}
+            for i in range(count)]
+
+
+ACTIVITY = {
+    "today": {"count": 12, "percentages": {"工作编程": 60.0, "游戏": 30.0, "其他": 10.0}},
+    "recent_activities": [{"breakdown": {"工作编程": 80}}, {"breakdown": {"工作编程": 70}}, {"breakdown": {"游戏": 90}}],
+}
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("喵喵喵") == 3
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("喵abcd") == 2
+
+
+def test_older_replies_fold_into_the_summary():
+    context = PromptContextManager()
+    context.seed(messages(10))
+    assert [text for text, _ in context.recent] == [m["text"] for m in messages(10)[-3:]]
+    summary = context.summary
+    assert summary["messages"] == 7
+    assert summary["since"] == START.isoformat()
+    assert summary["pending"] == 0
+    assert "一起工作" in summary["topics"] and "哇塞" in summary["openings"]
+    assert "喵喵还说过7句话" in summary["text"]
+    assert "「哇塞」" in summary["text"]
+
+
+def test_summary_refreshes_every_n_messages_and_decays():
+    context = PromptContextManager()
+    context.seed(messages(4))  # One folded, rendered by seed()
+    assert context.summary["openings"] == {"哇塞": 0.9}
+    for message in messages(8)[4:7]:
+        context.add_message(message["text"], message["timestamp"])
+    assert context.summary["pending"] == 3 and context.summary["openings"]["哇塞"] == pytest.approx(1.9)
+    context.add_message(*messages(8)[7].values())
+    assert context.summary["pending"] == 0 and context.summary["openings"]["哇塞"] == pytest.approx(2.61)
+
+
+@pytest.mark.parametrize("budget", [100, 130, 160, 200, 400, 900])
+def test_prompt_never_exceeds_the_budget(budget):
+    context = PromptContextManager(budget=budget)
+    context.seed(messages(50))
+    prompt = context.build(BASE_PROMPT, ACTIVITY)
+    assert prompt.startswith(BASE_PROMPT)
+    assert estimate_tokens(prompt) <= budget
+
+
+def test_sections_are_added_in_priority_order():
+    roomy = PromptContextManager(budget=900)
+    roomy.seed(messages(50))
+    full = roomy.build(BASE_PROMPT, ACTIVITY)
+    assert RECENT_HEADER in full and "【更早的聊天摘要】" in full
+    assert "今天喵喵已经看了12次屏幕，主要在工作编程60%、游戏30%" in full
+    assert "最近在：工作编程 → 游戏" in full
+
+    # Room for a reply or two: the summary and activity are dropped
+    tight = PromptContextManager(budget=estimate_tokens(BASE_PROMPT) + 85)
+    tight.restore(roomy.state())
+    prompt = tight.build(BASE_PROMPT, ACTIVITY)
+    assert RECENT_HEADER in prompt
+    assert "【更早的聊天摘要】" not in prompt and "【今日活动】" not in prompt
+
+
+def test_recent_replies_are_trimmed_oldest_first_and_shortened():
+    context = PromptContextManager(budget=estimate_tokens(BASE_PROMPT) + 105)
+    context.seed(messages(3) + [{"text": "很长的一句话" * 10, "timestamp": START.isoformat()}])
+    prompt = context.build(BASE_PROMPT)
+    assert "很长的一句话很长的一句话很长的一句话很…" in prompt
+    assert messages(3)[2]["text"] in prompt
+    assert messages(3)[1]["text"] not in prompt
+
+
+def test_no_room_for_context():
+    context = PromptContextManager(budget=10)
+    context.seed(messages(10))
+    assert context.build(BASE_PROMPT, ACTIVITY) == BASE_PROMPT
+
+
+def test_state_round_trip_builds_the_same_prompt():
+    context = PromptContextManager()
+    context.seed(messages(30))
+    restored = PromptContextManager()
+    restored.restore(context.state())
+    assert restored.build(BASE_PROMPT, ACTIVITY) == context.build(BASE_PROMPT, ACTIVITY)
+    restored.add_message("新的一句", START.isoformat())
+    assert context.summary["messages"] == 27  # Restored state is a copy
@@ -0,0 +1,65 @@
+# test_similarity_index.py
+import pytest
+
+from similarity_index import MinHashIndex, decode_signature, encode_signature
+
+
+@pytest.fixture
+def index():
+    return MinHashIndex()
+
+
+def test_bands_must_divide_permutations():
+    with pytest.raises(ValueError):
+        MinHashIndex(num_perm=64, bands=10)
+
+
+def test_shingles_ignore_punctuation_emoji_and_case(index):
+    assert index.shingles("喵~ 好困！😺") == index.shingles("喵好困") == {"喵好", "好困"}
+    assert index.shingles("AB") == {"ab"}
+    assert index.shingles("！！") == set()
+
+
+def test_signatures_are_stable_and_round_trip(index):
+    signature = index.signature("主人又在写代码了喵")
+    assert signature == MinHashIndex().signature("主人又在写代码了喵")  # Persisted, so must not vary per run
+    assert decode_signature(encode_signature(signature)) == signature
+    assert index.signature("~~~") == []
+
+
+def test_exact_similarity(index):
+    assert index.similarity("喵喵喵好无聊", "喵喵喵好无聊！") == 1.0
+    # {喵喵, 喵好, 好无, 无聊} vs {喵喵, 喵好, 好开, 开心}
+    assert index.similarity("喵喵喵好无聊", "喵喵喵好开心") == pytest.approx(2 / 6)
+    assert index.similarity("", "喵") == 0.0
+
+
+def test_estimate_tracks_exact_similarity(index):
+    a = "主人今天一直在写代码，休息一下陪陪喵喵吧"
+    b = "主人今天一直在写代码，休息一下陪陪我吧"
+    estimate = index.estimate_similarity(index.signature(a), index.signature(b))
+    assert estimate == pytest.approx(index.similarity(a, b), abs=0.2)
+    assert index.estimate_similarity([], index.signature(a)) == 0.0
+
+
+def test_query_finds_near_duplicates_only(index):
+    texts = {
+        1: "主人今天一直在写代码，休息一下陪陪喵喵吧",
+        2: "又在刷视频了，喵喵也要看！",
+        3: "深夜了还不睡，喵喵好担心你",
+    }
+    for key, text in texts.items():
+        index.add(key, index.signature(text))
+    near = index.signature("主人今天一直在写代码，休息一下陪陪喵喵吧~")
+    assert 1 in index.candidates(near)
+    assert index.query(near, 0.8) == [1]
+    assert index.query(index.signature("完全不同的一句话"), 0.5) == []
+
+
+def test_remove_drops_key_from_every_band(index):
+    signature = index.signature("又在刷视频了，喵喵也要看！")
+    index.add("a", signature)
+    index.remove("a")
+    assert index.candidates(signature) == set()
+    assert all(not buckets for buckets in index._buckets)
+    index.remove("a")  # Unknown keys are ignored
@@ -0,0 +1,187 @@
+# tracing.py
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class _NoopSpan:
+    """Shared do-nothing span returned while tracing is disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """One timed stage; nests under whatever span is open on the same thread."""
+    __slots__ = ("tracer", "name", "args", "start", "path")
+
+    def __init__(self, tracer: "Tracer", name: str, args: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start = 0.0
+        self.path = name
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        if stack:
+            self.path = f"{stack[-1].path}/{self.name}"
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        stack = self.tracer._stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer._record(self, end)
+        return False
+
+    def set(self, **args):
+        """Attach extra values (sizes, counts) shown in the trace viewer."""
+        self.args.update(args)
+
+
+class Tracer:
+    """
+    Collects nested stage timings for --profile runs.
+    Spans are only timed while enabled; otherwise span() hands back one
+    shared no-op object, so instrumented code costs a flag check. Finished
+    spans are kept in a bounded buffer and exported as Chrome trace_event
+    JSON (chrome://tracing, Perfetto) plus a per-stage summary table.
+    """
+
+    def __init__(self, max_events: int = config.TRACE_MAX_EVENTS):
+        self.enabled = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._events = deque(maxlen=max_events)
+        self._origin = time.perf_counter()
+
+    def enable(self):
+        self._origin = time.perf_counter()
+        with self._lock:
+            self._events.clear()
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def span(self, name: str, **args):
+        """Context manager timing one stage, e.g. `with tracer.span("resize"):`."""
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, args)
+
+    def traced(self, name: str = None):
+        """Decorator form of span(), named after the function by default."""
+        def decorator(func):
+            span_name = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _stack(self) -> List[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, span: Span, end: float):
+        thread = threading.current_thread()
+        event = (span.name, span.path, span.start, end, thread.ident, thread.name, span.args)
+        with self._lock:
+            self._events.append(event)
+
+    # --- Export ---
+    def chrome_trace(self) -> Dict:
+        """Recorded spans as a Chrome trace_event document."""
+        with self._lock:
+            events = list(self._events)
+        pid = os.getpid()
+        trace_events = []
+        thread_names = {}
+        for name, path, start, end, tid, thread_name, args in events:
+            thread_names[tid] = thread_name
+            trace_events.append({
+                "name": name,
+                "cat": path.split("/", 1)[0],
+                "ph": "X",
+                "ts": round((start - self._origin) * 1e6, 1),
+                "dur": round((end - start) * 1e6, 1),
+                "pid": pid,
+                "tid": tid,
+                "args": dict(args, path=path),
+            })
+        for tid, thread_name in thread_names.items():
+            trace_events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                                 "args": {"name": thread_name}})
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
+        logger.info("Wrote %s trace events to %s", len(self._events), path)
+
+    def summary(self) -> List[Dict]:
+        """Per-stage (span path) count and timing in milliseconds, slowest total first."""
+        with self._lock:
+            events = list(self._events)
+        stages: Dict[str, List[float]] = {}
+        for _, path, start, end, _, _, _ in events:
+            stages.setdefault(path, []).append((end - start) * 1000)
+        rows = []
+        for path, durations in stages.items():
+            durations.sort()
+            rows.append({
+                "stage": path,
+                "count": len(durations),
+                "total_ms": sum(durations),
+                "mean_ms": sum(durations) / len(durations),
+                "p95_ms": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+                "max_ms": durations[-1],
+            })
+        rows.sort(key=lambda row: row["total_ms"], reverse=True)
+        return rows
+
+    def format_summary(self) -> str:
+        rows = self.summary()
+        if not rows:
+            return "No spans recorded."
+        width = max(len("stage"), max(len(row["stage"]) for row in rows))
+        lines = [f"{'stage':<{width}}  {'count':>6}  {'total ms':>10}  {'mean ms':>9}  {'p95 ms':>9}  {'max ms':>9}"]
+        lines.append("-" * len(lines[0]))
+        for row in rows:
+            lines.append(f"{row['stage']:<{width}}  {row['count']:>6}  {row['total_ms']:>10.1f}  "
+                         f"{row['mean_ms']:>9.1f}  {row['p95_ms']:>9.1f}  {row['max_ms']:>9.1f}")
+        return "\n".join(lines)
+
+
+# Global instance; disabled unless main.py runs with --profile
+tracer = Tracer()
@@ -0,0 +1,348 @@
+# window_probe.py
+import logging
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, Optional, Tuple
+
+import clock
+import config
+
+logger = logging.getLogger(__name__)
+
+# --- Optional dependency: python-xlib (Linux); xprop is used without it ---
+XLIB_AVAILABLE = False
+try:
+    from Xlib import X, display as xdisplay
+    XLIB_AVAILABLE = True
+except ImportError:
+    X = xdisplay = None
+
+# --- Optional dependency: pyobjc (macOS); osascript is used without it ---
+QUARTZ_AVAILABLE = False
+try:
+    from AppKit import NSWorkspace
+    from Quartz import (CGDisplayBounds, CGGetActiveDisplayList, CGWindowListCopyWindowInfo,
+                        kCGNullWindowID, kCGWindowListOptionOnScreenOnly)
+    QUARTZ_AVAILABLE = True
+except ImportError:
+    NSWorkspace = None
+
+
+class WindowInfo:
+    """
+    The focused window: owning app (process name), title, WM_CLASS (X11),
+    pid, and bounds (x, y, width, height) in screen coordinates when known.
+    """
+    __slots__ = ("app", "title", "wm_class", "pid", "bounds")
+
+    def __init__(self, app: str, title: str = "", wm_class: str = "", pid: int = None,
+                 bounds: Optional[Tuple[int, int, int, int]] = None):
+        self.app = app
+        self.title = title
+        self.wm_class = wm_class
+        self.pid = pid
+        self.bounds = bounds
+
+    @property
+    def key(self) -> tuple:
+        """Identity used to tell whether the screen is probably unchanged."""
+        return (self.app, self.wm_class, self.title)
+
+    def describe(self) -> str:
+        return f"「{self.app}」，标题「{self.title}」" if self.title else f"「{self.app}」"
+
+    def __repr__(self):
+        return (f"WindowInfo(app={self.app!r}, title={self.title!r}, wm_class={self.wm_class!r}, "
+                f"pid={self.pid}, bounds={self.bounds})")
+
+
+def process_name(pid: Optional[int]) -> str:
+    """Command name of `pid` from /proc (empty where there is no /proc)."""
+    if not pid:
+        return ""
+    try:
+        with open(f"/proc/{pid}/comm", encoding="utf-8", errors="replace") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+class X11WindowProbe:
+    """
+    Reads _NET_ACTIVE_WINDOW from the root window, then that window's
+    _NET_WM_NAME, WM_CLASS and _NET_WM_PID (EWMH), and the owning process
+    name from /proc. Uses one persistent python-xlib connection when it is
+    installed (a few round trips, well under a millisecond), else xprop.
+    """
+
+    _XPROP_VALUE = re.compile(r"^(\w+)\([^)]*\)(?::|\s*=)\s*(.*)$")  # "NAME(TYPE) = value" or "NAME(TYPE): value"
+    _XWININFO_VALUE = re.compile(r"^\s*(Absolute upper-left X|Absolute upper-left Y|Width|Height):\s*(-?\d+)", re.MULTILINE)
+
+    def __init__(self):
+        self._display = None
+        if XLIB_AVAILABLE:
+            try:
+                self._display = xdisplay.Display()
+                self._atoms = {name: self._display.intern_atom(name) for name in
+                               ("_NET_ACTIVE_WINDOW", "_NET_WM_NAME", "_NET_WM_PID", "UTF8_STRING")}
+            except Exception as e:
+                logger.warning("Could not open X display with python-xlib, using xprop: %s", e)
+                self._display = None
+
+    def probe(self) -> Optional[WindowInfo]:
+        if self._display is not None:
+            return self._probe_xlib()
+        return self._probe_xprop()
+
+    def _probe_xlib(self) -> Optional[WindowInfo]:
+        atoms = self._atoms
+        root = self._display.screen().root
+        active = root.get_full_property(atoms["_NET_ACTIVE_WINDOW"], X.AnyPropertyType)
+        if not active or not active.value or not active.value[0]:
+            return None
+        window = self._display.create_resource_object("window", active.value[0])
+        name = window.get_full_property(atoms["_NET_WM_NAME"], atoms["UTF8_STRING"])
+        title = name.value.decode("utf-8", "replace") if name else (window.get_wm_name() or "")
+        wm_class = window.get_wm_class()
+        pid = window.get_full_property(atoms["_NET_WM_PID"], X.AnyPropertyType)
+        pid = int(pid.value[0]) if pid and pid.value else None
+        wm_class = wm_class[1] if wm_class else ""
+        geometry = window.get_geometry()
+        # Root origin in window coordinates is minus the window's position on screen
+        origin = window.translate_coords(root, 0, 0)
+        bounds = (-origin.x, -origin.y, geometry.width, geometry.height)
+        return WindowInfo(process_name(pid) or wm_class, title, wm_class, pid, bounds)
+
+    def _probe_xprop(self) -> Optional[WindowInfo]:
+        root = self._xprop("-root", "_NET_ACTIVE_WINDOW")
+        match = re.search(r"window id # (0x[0-9a-fA-F]+)", root.get("_NET_ACTIVE_WINDOW", ""))
+        if not match or int(match.group(1), 16) == 0:
+            return None
+        values = self._xprop("-id", match.group(1), "_NET_WM_NAME", "WM_CLASS", "_NET_WM_PID")
+        title = values.get("_NET_WM_NAME", "")
+        title = title[1:-1].replace('\\"', '"') if title.startswith('"') else ""
+        wm_class = re.findall(r'"([^"]*)"', values.get("WM_CLASS", ""))
+        wm_class = wm_class[-1] if wm_class else ""
+        pid = values.get("_NET_WM_PID", "")
+        pid = int(pid) if pid.isdigit() else None
+        return WindowInfo(process_name(pid) or wm_class, title, wm_class, pid, self._xwininfo_bounds("-id", match.group(1)))
+
+    def desktop_bounds(self) -> Optional[Tuple[int, int, int, int]]:
+        """The root window, which spans every monitor (RandR) from 0,0."""
+        if self._display is not None:
+            geometry = self._display.screen().root.get_geometry()
+            return (0, 0, geometry.width, geometry.height)
+        return self._xwininfo_bounds("-root")
+
+    def _xwininfo_bounds(self, *args) -> Optional[Tuple[int, int, int, int]]:
+        try:
+            output = subprocess.run(["xwininfo", *args], capture_output=True,
+                                    text=True, timeout=2, check=True).stdout
+        except (OSError, subprocess.SubprocessError):
+            return None
+        values = dict(self._XWININFO_VALUE.findall(output))
+        if len(values) < 4:
+            return None
+        return (int(values["Absolute upper-left X"]), int(values["Absolute upper-left Y"]),
+                int(values["Width"]), int(values["Height"]))
+
+    def _xprop(self, *args) -> Dict[str, str]:
+        output = subprocess.run(["xprop", *args], capture_output=True, text=True, timeout=2, check=True).stdout
+        values = {}
+        for line in output.splitlines():
+            match = self._XPROP_VALUE.match(line)
+            if match:
+                values[match.group(1)] = match.group(2).strip()
+        return values
+
+
+class MacWindowProbe:
+    """
+    Frontmost application from NSWorkspace and its front window's title
+    from the Quartz window list (pyobjc). Without pyobjc, osascript gives
+    the application name only.
+    """
+
+    _SCRIPT = 'tell application "System Events" to get {name, unix id} of first process whose frontmost is true'
+
+    def probe(self) -> Optional[WindowInfo]:
+        if not QUARTZ_AVAILABLE:
+            output = subprocess.run(["osascript", "-e", self._SCRIPT], capture_output=True,
+                                    text=True, timeout=2, check=True).stdout.strip()
+            name, _, pid = output.rpartition(", ")
+            return WindowInfo(name, pid=int(pid)) if pid.isdigit() else None
+        app = NSWorkspace.sharedWorkspace().frontmostApplication()
+        if app is None:
+            return None
+        pid = int(app.processIdentifier())
+        title, bounds = "", None
+        # Front-to-back order: the first normal-layer window of the app is its focused one
+        for window in CGWindowListCopyWindowInfo(kCGWindowListOptionOnScreenOnly, kCGNullWindowID) or ():
+            if window.get("kCGWindowOwnerPID") == pid and window.get("kCGWindowLayer") == 0:
+                title = window.get("kCGWindowName") or ""
+                rect = window.get("kCGWindowBounds") or {}
+                if rect:
+                    # Points, the unit screencapture -R takes
+                    bounds = tuple(int(rect[k]) for k in ("X", "Y", "Width", "Height"))
+                break
+        return WindowInfo(str(app.localizedName() or ""), str(title), str(app.bundleIdentifier() or ""), pid, bounds)
+
+    def desktop_bounds(self) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Union of the active displays' bounds in global points. Displays left
+        of or above the main one have negative origins.
+        """
+        if not QUARTZ_AVAILABLE:
+            return None
+        error, displays, count = CGGetActiveDisplayList(16, None, None)
+        if error or not count:
+            return None
+        rects = [CGDisplayBounds(display) for display in displays[:count]]
+        left = min(rect.origin.x for rect in rects)
+        top = min(rect.origin.y for rect in rects)
+        right = max(rect.origin.x + rect.size.width for rect in rects)
+        bottom = max(rect.origin.y + rect.size.height for rect in rects)
+        return (int(left), int(top), int(right - left), int(bottom - top))
+
+
+class StaticWindowProbe:
+    """Probe that reports whatever window it is told to (tests, benchmarks)."""
+
+    def __init__(self, info: Optional[WindowInfo] = None,
+                 desktop: Optional[Tuple[int, int, int, int]] = None):
+        self.info = info
+        self.desktop = desktop
+
+    def probe(self) -> Optional[WindowInfo]:
+        return self.info
+
+    def desktop_bounds(self) -> Optional[Tuple[int, int, int, int]]:
+        return self.desktop
+
+
+class WindowProbe:
+    """
+    Cheap look at the focused window before a capture (see CaptureGate).
+    Picks the platform probe once; any failure just means "unknown" (None),
+    never a failed analysis.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else self._platform_backend()
+
+    @staticmethod
+    def _platform_backend():
+        if not config.WINDOW_PROBE_ENABLED:
+            return None
+        if sys.platform == "darwin":
+            return MacWindowProbe()
+        if sys.platform.startswith("linux") and os.environ.get("DISPLAY"):
+            return X11WindowProbe()
+        return None
+
+    def probe(self) -> Optional[WindowInfo]:
+        if self.backend is None:
+            return None
+        try:
+            info = self.backend.probe()
+        except Exception as e:
+            logger.debug("Active window probe failed: %s", e)
+            return None
+        logger.debug("Active window: %s", info)
+        return info
+
+    def desktop_bounds(self) -> Optional[Tuple[int, int, int, int]]:
+        """(x, y, width, height) of the virtual desktop spanning all displays, or None if unknown."""
+        if self.backend is None:
+            return None
+        try:
+            return self.backend.desktop_bounds()
+        except Exception as e:
+            logger.debug("Desktop bounds lookup failed: %s", e)
+            return None
+
+
+def capture_region(info: Optional[WindowInfo], padding: int = config.CAPTURE_WINDOW_PADDING,
+                   desktop: Optional[Tuple[int, int, int, int]] = None) -> Optional[Tuple[int, int, int, int]]:
+    """
+    (x, y, width, height) to capture for the focused window, padded and
+    clipped to `desktop` (WindowProbe.desktop_bounds(); its origin may be
+    negative) when known; None means capture the full screen (no bounds,
+    the pet itself is focused, the window is tiny like a popup, or it lies
+    off the desktop).
+    """
+    if info is None or info.bounds is None or info.pid == os.getpid():
+        return None
+    x, y, width, height = info.bounds
+    min_width, min_height = config.CAPTURE_WINDOW_MIN_SIZE
+    if width < min_width or height < min_height:
+        return None
+    left, top, right, bottom = x - padding, y - padding, x + width + padding, y + height + padding
+    if desktop is not None:
+        desktop_x, desktop_y, desktop_width, desktop_height = desktop
+        left, top = max(left, desktop_x), max(top, desktop_y)
+        right, bottom = min(right, desktop_x + desktop_width), min(bottom, desktop_y + desktop_height)
+        if right <= left or bottom <= top:
+            return None
+    return (left, top, right - left, bottom - top)
+
+
+def activity_prior(info: Optional[WindowInfo]) -> Optional[str]:
+    """Activity category implied by the window: title keywords first (a video in a browser), then the app."""
+    if info is None:
+        return None
+    title = info.title.lower()
+    for keyword, category in config.WINDOW_TITLE_CATEGORIES.items():
+        if keyword in title:
+            return category
+    app = f"{info.app} {info.wm_class}".lower()
+    for keyword, category in config.WINDOW_APP_CATEGORIES.items():
+        if keyword in app:
+            return category
+    return None
+
+
+def blend_prior(breakdown: Dict[str, float], category: str,
+                weight: float = config.WINDOW_PRIOR_WEIGHT) -> Dict[str, float]:
+    """Give `weight` of the breakdown to `category`; an empty breakdown becomes all `category`."""
+    if not breakdown or not any(v > 0 for v in breakdown.values()):
+        return {category: 100.0}
+    blended = {cat: pct * (1 - weight) for cat, pct in breakdown.items()}
+    blended[category] = blended.get(category, 0.0) + 100.0 * weight
+    return blended
+
+
+class CaptureGate:
+    """
+    Skips automatic captures while the focused window is unchanged and the
+    last analysis of it is recent: the same app and title almost always
+    means the same kind of screen, so the previous activity just runs on
+    instead of capturing, uploading and asking the model. Manual clicks are
+    never gated. Held by the desktop pet's AnalysisContext only.
+    """
+
+    def __init__(self, max_age: float = config.WINDOW_GATE_MAX_AGE_SECONDS):
+        self.max_age = max_age
+        self.last_key = None
+        self.last_time = None
+        self.last_breakdown = None
+
+    def should_skip(self, info: Optional[WindowInfo]) -> bool:
+        if info is None or self.last_key is None:
+            return False
+        return info.key == self.last_key and clock.timestamp() - self.last_time < self.max_age
+
+    def analyzed(self, info: Optional[WindowInfo], breakdown: Optional[Dict[str, float]]):
+        """Note a completed analysis of the screen showing `info`."""
+        if info is None:
+            return
+        self.last_key = info.key
+        self.last_time = clock.timestamp()
+        self.last_breakdown = dict(breakdown) if breakdown else None
+
+
+# Global instances (the desktop pet's)
+window_probe = WindowProbe()
+capture_gate = CaptureGate()